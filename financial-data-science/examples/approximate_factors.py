@@ -91,6 +91,7 @@ show(stationary[stationary['different'] > 0],
 # Verify BaiNg implemention on published FRED-MD and FRED-QD reports
 qd_df, qd_codes = fred_qd(202004)
 md_df, md_codes = fred_md(201505)
+Z, samples, cols = {}, {}, {}
 for freq, df, transforms in [['monthly', md_df, md_codes['transform']],
                              ['quarterly', qd_df, qd_codes['transform']]]:    
     # Apply tcode transformations
@@ -100,38 +101,44 @@ for freq, df, transforms in [['monthly', md_df, md_codes['transform']],
                                          tcode=transforms[col],
                                          freq=freq[0]))
     data = pd.concat(transformed, axis=1).iloc[2:]
-    cols = list(data.columns)
+    cols[freq] = list(data.columns)
     sample = data.index[((np.count_nonzero(np.isnan(data), axis=1)==0)
                          | (data.index <= 20141231))
                         & (data.index >= 19600301)]
+    samples[freq] = sample
 
     # set missing and outliers in X to NaN
     X = data.loc[sample]
     X = remove_outliers(X)
 
-    # compute factors EM and auto select number of components, r
-    Z = factors_em(X, p=2, verbose=1)
-    r = select_bai_ng(Z, p=2)
-    
+    # compute factors EM
+    Z[freq] = factors_em(X, p=2, verbose=1)
+
+# auto select number of components, r, and marginal R2's, for all panels
+r = select_bai_ng(Z, p=2)
+mR2 = {freq: m.to_numpy() for freq, m in mrsq(Z, r).items()}
+
+for freq in Z:
     # show marginal R2's of series to each component
-    mR2 = mrsq(Z, r).to_numpy()
-    show(DataFrame({'selected': r,
-                    'variance explained': np.sum(np.mean(mR2[:, :r], axis=0)),
-                    'start': min(sample),
-                    'end': max(sample),
-                    'obs': Z.shape[0],
-                    'series': Z.shape[1]},
+    show(DataFrame({'selected': r[freq],
+                    'variance explained': np.sum(np.mean(mR2[freq][:, :r[freq]],
+                                                         axis=0)),
+                    'start': min(samples[freq]),
+                    'end': max(samples[freq]),
+                    'obs': Z[freq].shape[0],
+                    'series': Z[freq].shape[1]},
                    index=[f'factors']),
          caption=f"FRED-{freq[0].upper()}D {freq} series:", **SHOW)
 
-    for k in range(r):
-        args = np.argsort(-mR2[:, k])
-        show(DataFrame.from_dict({mR2[arg, k].round(4):
-                                  {'series': cols[arg],
-                                   'description': alf.header(cols[arg])}
+    for k in range(r[freq]):
+        args = np.argsort(-mR2[freq][:, k])
+        show(DataFrame.from_dict({mR2[freq][arg, k].round(4):
+                                  {'series': cols[freq][arg],
+                                   'description': alf.header(cols[freq][arg])}
                                   for arg in args[:10]},
                                  orient='index'),
-             caption=f"Factor:{1+k} Variance Explained={np.mean(mR2[:,k]):.4f}",
+             caption=(f"Factor:{1+k} Variance Explained="
+                      f"{np.mean(mR2[freq][:,k]):.4f}"),
              **SHOW)
 
 ## Sanity check Extract factors: SVD == PCA
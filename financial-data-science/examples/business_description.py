@@ -70,14 +70,15 @@ univ['naics'] = univ['naics'].where(sic_.isin([0, 9999]), naics_)
 # Retrieve business descriptions text; extract nouns from POS tags
 nlp = spacy.load("en_core_web_lg")   # Load a spaCy language pipeline
 if 'bus' not in store:   # store processed text if necessary
-    rows = DataFrame(ed.open(form=form, item=item))  # open bus10K archive
+    corpus = ed.pack_items(form=form, item=item)  # pack new bus10K items
+    rows = corpus.index
     bus = {}
     restart = 0
     for i, permno in tqdm(enumerate(univ.index)):
         found = rows[rows['permno'].eq(permno) &
                      rows['date'].between(20190101, 20190331)]
         if len(found) and i >= restart:
-            doc = nlp(ed[found.iloc[0]['pathname']][:nlp.max_length].lower())
+            doc = nlp(corpus.read(found.iloc[:1])[0][:nlp.max_length].lower())
             bus[permno] = " ".join([re.sub("[^a-zA-Z]+", "", token.lemma_)
                                     for token in doc if token.pos_ in ['NOUN']
                                     and len(token.lemma_) > 2])
@@ -21,7 +21,7 @@ from finds.database import SQL, Redis
 from finds.structured import CRSP, Signals, Benchmarks
 from finds.busday import BusDay
 from finds.backtesting import RiskPremium
-from finds.recipes import winsorize, least_squares
+from finds.recipes import winsorize, least_squares, fama_macbeth
 from finds.display import show
 from conf import credentials, VERBOSE, paths, CRSP_DATE
 
@@ -110,14 +110,12 @@ for period in periods:
                     .sort_values(['port', 'Date'], ignore_index=True)
         
             # run monthly Fama MacBeth cross-sectional regressions
-            fm = r.groupby(by='Date').apply(least_squares,
-                                            y=['ret'],
-                                            x=['BETA', 'BETA2', 'RES'])
+            fm = fama_macbeth(r, y='ret', x=['BETA', 'BETA2', 'RES'],
+                              date='Date')
 
             # time-series means and standard errors of the FM coefficients
-            sub = DataFrame({'mean': fm.mean(),
-                             'stderr': fm.sem(),
-                             'tstat': fm.mean() / fm.sem()}).T
+            sub = fm.summary[['mean', 'stderr', 'tvalue']]\
+                    .rename(columns={'tvalue': 'tstat'}).T
             sub.columns = pd.MultiIndex.from_tuples([(wt, col)
                                                      for col in sub.columns])
             sub.index = pd.MultiIndex.from_tuples([(asset, row)
@@ -160,12 +158,16 @@ rebalbeg=19640601
 rebalend=LAST_DATE
 rebaldates = crsp.bd.date_range(rebalbeg, rebalend, 'endmo')
 loadings = dict()
+annual = dict()
 for pordate in tqdm(rebaldates):           # retrieve signal values every month
     date = bd.june_universe(pordate)
-    univ = crsp.get_universe(date)
-    cap = np.sqrt(crsp.get_cap(date))
-    smb = -np.log(cap).rename('size')
-    hml = signals('hml', date, bd.endmo(date, -12))['hml'].rename('value')
+    if date not in annual:   # universe, size and value only change each June
+        univ = crsp.get_universe(date)
+        cap = np.sqrt(crsp.get_cap(date))
+        smb = -np.log(cap).rename('size')
+        hml = signals('hml', date, bd.endmo(date, -12))['hml'].rename('value')
+        annual[date] = (univ, smb, hml)
+    univ, smb, hml = annual[date]
     beta = signals('beta', pordate, bd.begmo(pordate))['beta']*2/3 + 1/3 #shrink
     mom = signals('mom', pordate)['mom'].rename('momentum')
     df = pd.concat((beta, hml, smb, mom),  # inner join of signals with univ
@@ -15,15 +15,11 @@ import pandas as pd
 from pandas import DataFrame, Series
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
-import sklearn.feature_extraction
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import CountVectorizer
-from tqdm import tqdm
 from finds.database import SQL, MongoDB, Redis
 from finds.structured import CRSP, Signals
 from finds.busday import BusDay
-from finds.unstructured import Unstructured
-from finds.recipes import weighted_average, fractiles
+from finds.unstructured import Unstructured, WordScores
+from finds.recipes import grouped_weighted_average, grouped_fractiles
 from finds.edgar import Edgar
 from finds.display import show
 from conf import VERBOSE, credentials, paths
@@ -56,63 +52,34 @@ wordlists = Unstructured(mongodb, 'WordLists')
 sentiments = {sent: wordlists['lm', sent] for sent in ['positive', 'negative']}
 
 
-# Pre-process with sklearn methods
-tf_vectorizer = CountVectorizer(
-    strip_accents='unicode',
-    lowercase=True,
-    #stop_words=stop_words,
-    # tokenizer=CustomTokenizer(),
-    token_pattern=r"\b[^\d\W][^\d\W][^\d\W]+\b")
-analyzer = tf_vectorizer.build_analyzer()
-
-
 # Construct sentiment feature all years for usual universe
 univs = {yr+1: crsp.get_universe(bd.endmo(yr*10000 + 1231)).assign(year=yr+1)
          for yr in range(1992, 2020)}
-rows = DataFrame(ed.open(form=form, item=item))  # open mda10K archive
-permnos = rows['permno'].unique().astype(int)
-
-tic = time.time()
-results = []
-for i, permno in tqdm(enumerate(permnos)):  # Loop over all permnos
-    
-    # retrieve all valid mda's for this permno by year
-    mdas = {}
-    dates = {}
-    files = rows[rows['permno'].eq(permno)].to_dict('records')
-    for i, f in enumerate(files):
-        year = int(f['date']) // 10000
-        if ((f['date'] // 100) % 100) <= 3:  # if filing date <= Mar
-            year = year - 1                  # then assign to previous year
-        if (year in univs and
-            (year not in mdas or f['date'] < dates[year])):
-            tokens = Series(analyzer(ed[f['pathname']]), dtype='object')
-            if len(tokens):
-                mdas[year] = tokens
-                dates[year] = f['date']
+corpus = ed.pack_items(form=form, item=item)  # pack new mda10K items
 
-    # compute sentiment (count frequency) scores for permno by year
-    sentiment = {year: (mda.isin(sentiments['positive']).sum()
-                        - mda.isin(sentiments['negative']).sum()) / len(mda)
-                 for year, mda in mdas.items()}  # compute sentiment by year
+# select earliest non-empty mda of each permno by year: if filed <= Mar,
+# previous year
+rows = corpus.index.copy()
+rows['year'] = rows['date'] // 10000 - ((rows['date'] // 100) % 100 <= 3)
+rows = rows[rows['year'].isin(list(univs)) & rows['length'].gt(0)]\
+    .sort_values(['permno', 'year', 'date'])\
+    .drop_duplicates(['permno', 'year'])
 
-    # derive sentiment change and similarity scores by year
-    for year in sorted(mdas.keys()):
-        result = {'year': year, 'permno': permno, 'date': dates[year]}
-        result['mdasent'] = sentiment[year]
-        result['currlen'] = len(mdas[year])
-        if year-1 in mdas:
-            result['prevlen'] = len(mdas[year-1])
-            result['mdachg'] = sentiment[year] - sentiment[year-1]
-            
-            corpus = [" ".join(mdas[year]), " ".join(mdas[year-1])]
-            cos = cosine_similarity(tf_vectorizer.fit_transform(corpus))
-            result['mdacos'] = cos[0, 1]
-            _print(i, int(time.time()-tic), result)
-        results.append(result)
+# count sentiment words and similarity with previous year, for all firms
+tic = time.time()
+scores = WordScores(sentiments)
+data = scores.score(rows, read=corpus.read)
+data = data[data['currlen'] > 0].copy()
+data['mdasent'] = (data['positive'] - data['negative']) / data['currlen']
+prev = data[['permno', 'year', 'mdasent']].assign(year=data['year'] + 1)
+data = data.merge(prev, on=['permno', 'year'], how='left',
+                  suffixes=('', '_prev'))
+data['mdachg'] = data['mdasent'] - data.pop('mdasent_prev')
+data['mdacos'] = data['cos'].where(data['mdachg'].notna())
+data = data.drop(columns=['positive', 'negative', 'cos'])
+_print(int(time.time()-tic), len(data))
 
 # save in signals database
-data = DataFrame.from_records(results)
 data['rebaldate'] = bd.offset(data['date'])
 print(signals.write(data, 'mdasent', overwrite=True),
       signals.write(data, 'mdachg', overwrite=True),
@@ -234,52 +201,34 @@ for i, sent in enumerate(['mdasent', 'mdachg', 'mdacos']):
 - same year filings [yr]0101:[yr]1231 = bd.begyr(caldate) to caldate
 - lagged [yr+1]0401:[yr+2]0331 = bd.begmo(caldate,4) - bd.endmo(caldate,15)
 """
-for ifig, key in enumerate(['mdasent', 'mdachg', 'mdacos']):
-    ret1 = {}   # to collect year-ahead spread returns
-    ret0 = {}   # to collect current-year spread returns
-    for year in sorted(np.unique(data['year'])):  # loop over years
-        
-        # compute current year spread returns
-        beg = bd.begyr(year)
-        end = bd.endyr(year)
+panels = {0: [], 1: []}  # current-year and year-ahead caps and returns
+for year in sorted(np.unique(data['year'])):  # loop over years
+    beg = bd.begyr(year)
+    end = bd.endyr(year)
+    windows = {0: (beg, end), 1: (bd.begmo(end, 4), bd.endmo(end, 15))}
+    for lag, (beg, end) in windows.items():
         univ = data[data['year'] == year]\
-                   .dropna(subset=[key])\
                    .set_index('permno')\
                    .join(crsp.get_cap(bd.offset(beg, -1)), how='inner')\
                    .join(crsp.get_ret(beg, end, delist=True), how='left')
-        if len(univ):
-            sub = fractiles(univ[key], [20, 80])
-            pos = weighted_average(univ.loc[sub==1, ['cap', 'ret']],
-                                   'cap')['ret']
-            neg = weighted_average(univ.loc[sub==3, ['cap', 'ret']],
-                                   'cap')['ret']
-            ret0[end] = {'ret': pos - neg,
-                         'npos': sum(sub==1),
-                         'nneg': sum(sub==3)}
-            _print(end, len(univ), pos, neg)
-            
-        # compute year ahead spread returns
-        beg = bd.begmo(end, 4)
-        end = bd.endmo(end, 15)
-        univ = data[data['year'] == year]\
-                   .dropna(subset=[key])\
-                   .set_index('permno')\
-                   .join(crsp.get_cap(bd.offset(beg, -1)), how='inner')\
-                   .join(crsp.get_ret(beg, end, delist=True), how='left')
-        if len(univ):
-            sub = fractiles(univ[key], [20, 80])
-            pos = weighted_average(univ.loc[sub==1, ['cap', 'ret']],
-                                   'cap')['ret']
-            neg = weighted_average(univ.loc[sub==3, ['cap', 'ret']],
-                                   'cap')['ret']
-            ret1[end] = {'ret': pos - neg,
-                         'npos': sum(sub==1),
-                         'nneg': sum(sub==3)}
-            _print(end, len(univ), pos, neg)
+        panels[lag].append(univ.assign(end=end))
+        _print(end, len(univ))
+panels = {lag: pd.concat(univ) for lag, univ in panels.items()}
 
-    r0 = DataFrame.from_dict(ret0, orient='index').sort_index()
+for ifig, key in enumerate(['mdasent', 'mdachg', 'mdacos']):
+    rets = []   # to collect current-year and year-ahead spread returns
+    for lag, panel in panels.items():
+        univ = panel.dropna(subset=[key])
+        sub = grouped_fractiles(univ[key], univ['end'], [20, 80])
+        pos = grouped_weighted_average(univ.loc[sub==1, ['end', 'cap', 'ret']],
+                                       'end', 'cap')['ret']
+        neg = grouped_weighted_average(univ.loc[sub==3, ['end', 'cap', 'ret']],
+                                       'end', 'cap')['ret']
+        rets.append(DataFrame({'ret': pos - neg,
+                               'npos': univ.loc[sub==1, 'end'].value_counts(),
+                               'nneg': univ.loc[sub==3, 'end'].value_counts()}))
+    r0, r1 = rets
     r0.index = r0.index // 10000
-    r1 = DataFrame.from_dict(ret1, orient='index').sort_index()
     r1.index = (r1.index // 10000) - 2
 
     fig, ax = plt.subplots(1, 1, clear=True, num=1+ifig, figsize=(10, 4))
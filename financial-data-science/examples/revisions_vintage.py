@@ -116,6 +116,12 @@ if imgdir:
 show(df[df.index > '2019-01-01'],
      caption=f"{series_id} Revisions, retrieved {today}", **SHOW)
 
+# INDPRO real-time panel: latest values as of each month-end vintage
+vintages = [int(d.strftime('%Y%m%d'))
+            for d in pd.date_range('2019-01-01', '2021-12-31', freq='M')]
+panel = alf.realtime_panel(series_id, vintages=vintages, start=20180101)
+print(panel.iloc[-6:, -6:])
+
 
 # Release dates of series in FRED-MD collection
 md_df, md_transform = fred_md()
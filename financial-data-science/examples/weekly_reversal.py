@@ -16,7 +16,7 @@ import matplotlib.pyplot as plt
 from finds.database import SQL, Redis
 from finds.busday import BusDay, WeeklyDay
 from finds.structured import CRSP, Benchmarks
-from finds.recipes import fractiles, lm
+from finds.recipes import fractiles, lm, breakpoints
 from finds.display import row_formatted, show
 from conf import credentials, VERBOSE, paths
 
@@ -178,6 +178,8 @@ for k,v in zip(sctest_r.slots['names'][:3], sctest_r[:3]): # significance values
     output[k] = PyR(v).values[0]
 output['mean(pre)'] = Y[df.index <= output['breakpoints']].mean() 
 output['mean(post)'] = Y[df.index > output['breakpoints']].mean()
+breaks, _ = breakpoints(Y.values, nbreaks=1)   # same break located in python
+output['breakpoints(py)'] = df.index[breaks[0] - 1]
 fstat = [0] + list(PyR(fstats_r[0]).values) + [0, 0]  # pad beyond from and to 
 
 show(DataFrame(output, index=['sctest']),
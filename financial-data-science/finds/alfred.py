@@ -29,9 +29,10 @@ import re
 import matplotlib.pyplot as plt
 from pandas.api import types
 import time
-from finds.database import requests_get
+import concurrent.futures
+from finds.database import requests_get, requests_session, RateLimiter
 from finds.busday import BusDay
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Any
 
 _VERBOSE = 0
 
@@ -56,6 +57,23 @@ def _date2int(date):
     else:
         return int(re.sub('\D', '', str(date)[:10]))
 
+def _period_end(dates: Series, freq: str = '') -> Series:
+    """helper method to shift datetimes to end of period of frequency"""
+    if freq:
+        if freq.upper()[0] in ['A']:
+            dates = dates + YearEnd(0)
+        if freq.upper()[0] in ['S']:
+            dates = dates + QuarterEnd(1)
+        if freq.upper()[0] in ['Q']:
+            dates = dates + QuarterEnd(0)
+        if freq.upper()[0] in ['M']:
+            dates = dates + MonthEnd(0)
+        if freq.upper()[0] in ['B']:
+            dates = dates + pd.DateOffset(days=13)
+        if freq.upper()[0] in ['W']:
+            dates = dates + pd.DateOffset(days=6)
+    return dates
+
 def multpl(page: str) -> DataFrame:
     """Helper method to retrieve shiller series by scraping multpl.com
 
@@ -124,9 +142,9 @@ def fred_md(vintage: int | str = 0, url: str = '',
     df.columns = df.columns.str.rstrip('x')
     meta = dict()
     for _, row in df.iloc[:5].iterrows():
-        if '/' not in row[0]:    # this row has metadata, e.g. transform codes
-            label = re.sub("[^a-z]", '', row[0].lower()) # simplify label str
-            meta[label] = row[1:].astype(int).to_dict()  # as dict of int codes
+        if '/' not in row.iloc[0]:    # this row has metadata, e.g. transform codes
+            label = re.sub("[^a-z]", '', row.iloc[0].lower()) # simplify label str
+            meta[label] = row.iloc[1:].astype(int).to_dict()  # as dict of int codes
     df = df[df.iloc[:, 0].str.find('/') > 0]      # keep rows with valid date
     df.index = BusDay.to_date(df.iloc[:, 0], format='%m/%d/%Y')
     df.index = BusDay.to_monthend(df.index)
@@ -157,14 +175,183 @@ def fred_qd(vintage: int | str = 0, url: str = '', verbose: int = 0):
     df.columns = df.columns.str.rstrip('x')
     meta = dict()
     for _, row in df.iloc[:5].iterrows():
-        if '/' not in row[0]:    # this row has metadata, e.g. transform codes
-            label = re.sub("[^a-z]", '', row[0].lower()) # simplify label str
-            meta[label] = row[1:].astype(int).to_dict()  # as dict of int codes
+        if '/' not in row.iloc[0]:    # this row has metadata, e.g. transform codes
+            label = re.sub("[^a-z]", '', row.iloc[0].lower()) # simplify label str
+            meta[label] = row.iloc[1:].astype(int).to_dict()  # as dict of int codes
     df = df[df.iloc[:, 0].str.find('/') > 0]      # keep rows with valid date
     df.index = BusDay.to_date(df.iloc[:, 0], format='%m/%d/%Y')
     df.index = BusDay.to_monthend(df.index)
     return df.iloc[:, 1:], DataFrame(meta)
-        
+
+
+class FredVintages:
+    """Local archive of parsed FRED-MD or FRED-QD vintages in parquet files
+
+    Args:
+        root: Directory to store archive in
+        dataset: 'md' for monthly FRED-MD, or 'qd' for quarterly FRED-QD
+        source: Base url, local directory or zipfile of vintage csv's,
+                laid out as on the McCracken site; '' for the site itself
+        workers: Number of threads to fetch missing vintages with
+        verbose: whether to echo debugging messages
+
+    Notes:
+
+    - each vintage is parsed once, and stored in long format (vintage,
+      date, series, value) in its own parquet file, with its transform
+      codes in a companion file
+    - a panel of any subset of vintages, series and dates is read from
+      all files in one call, with filters pushed down to the parquet reader
+
+    Examples:
+
+    >>> archive = FredVintages(paths['scratch'] / 'fred', dataset='md')
+    >>> archive.update(range(201501, 201513))  # fetch only missing vintages
+    >>> panel = archive.load(series=['INDPRO', 'UNRATE'], start=20000101)
+    """
+
+    def __init__(self, root: str, dataset: str = 'md', source: str = '',
+                 workers: int = 4, verbose: int = _VERBOSE):
+        assert dataset in ['md', 'qd']
+        self.root = str(root)
+        self.dataset = dataset
+        self.source = source
+        self.workers = workers
+        self._verbose = verbose
+        for folder in ['panel', 'codes']:
+            os.makedirs(self._path(folder), exist_ok=True)
+
+    def _print(self, *args, **kwargs):
+        if _VERBOSE + self._verbose > 0:
+            print(*args, **kwargs)
+
+    def _path(self, folder: str, vintage: int | None = None) -> str:
+        """helper to return path of folder, or of vintage file in folder"""
+        path = os.path.join(self.root, self.dataset, folder)
+        return path if vintage is None else os.path.join(path,
+                                                         f"{vintage}.parquet")
+
+    def vintages(self) -> List[int]:
+        """Return sorted list of YYYYMM vintages stored in archive"""
+        return sorted(int(f[:-8]) for f in os.listdir(self._path('panel'))
+                      if f.endswith('.parquet'))
+
+    def _fetch(self, vintage: int) -> Tuple[DataFrame, DataFrame] | None:
+        """helper to retrieve and parse one vintage, None if not available"""
+        url = self.source
+        if (not url and self.dataset == 'md' and vintage < 201500):
+            url = os.path.join(self.root, 'Historical_FRED-MD.zip')
+        try:
+            if self.dataset == 'md':
+                return fred_md(vintage, url=url)
+            return fred_qd(vintage, url=url)
+        except (OSError, KeyError, ValueError) as e:
+            self._print(vintage, e)
+            return None
+
+    def update(self, vintages: List[int]) -> List[int]:
+        """Fetch and store vintages which are missing from archive
+
+        Args:
+            vintages: List of YYYYMM vintages to keep in archive
+
+        Returns:
+            List of vintages newly stored
+
+        Notes:
+
+        - the historical FRED-MD zipfile of pre-2015 vintages is downloaded
+          once into root, instead of once for every vintage
+        """
+        stored = set(self.vintages())
+        missing = sorted(set(vintages).difference(stored))
+        zipname = os.path.join(self.root, 'Historical_FRED-MD.zip')
+        if (not self.source and self.dataset == 'md'
+            and any(v < 201500 for v in missing)
+            and not os.path.exists(zipname)):
+            r = requests_get(fred_md_url + 'Historical_FRED-MD.zip', delay=0,
+                             verbose=self._verbose)
+            if r is not None:
+                with open(zipname, 'wb') as f:
+                    f.write(r.content)
+        added = []
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch, v): v for v in missing}
+            for future in concurrent.futures.as_completed(futures):
+                vintage, result = futures[future], future.result()
+                if result is None:
+                    continue
+                df, meta = result
+                df = df.apply(pd.to_numeric, errors='coerce')
+                panel = DataFrame({
+                    'vintage': np.int32(vintage),
+                    'date': np.repeat(np.asarray(df.index, dtype=np.int32),
+                                      df.shape[1]),
+                    'series': np.tile(df.columns.astype(str), len(df)),
+                    'value': df.values.reshape(-1)})
+                codes = meta.rename_axis(index='series', columns='label')\
+                            .stack().rename('code').reset_index()
+                codes.insert(0, 'vintage', np.int32(vintage))
+                codes.to_parquet(self._path('codes', vintage), index=False)
+                panel.to_parquet(self._path('panel', vintage), index=False)
+                added.append(vintage)
+                self._print(vintage, len(panel))
+        return sorted(added)
+
+    def _filters(self, vintages: List[int] | None,
+                 series: List[str] | None) -> List[Tuple] | None:
+        """helper to construct parquet filters on vintages and series"""
+        filters = []
+        if vintages is not None:
+            filters.append(('vintage', 'in', [int(v) for v in vintages]))
+        if series is not None:
+            filters.append(('series', 'in', list(series)))
+        return filters or None
+
+    def load(self, vintages: List[int] | None = None,
+             series: List[str] | None = None, start: int = 0,
+             end: int = 99991231) -> DataFrame:
+        """Read panel of any subset of vintages, series and dates
+
+        Args:
+            vintages: List of YYYYMM vintages to read, None for all stored
+            series: List of series names to read, None for all
+            start, end: Range of end-of-period dates (inclusive) to read
+
+        Returns:
+            DataFrame indexed by (vintage, date), with series in columns
+        """
+        if not self.vintages():
+            return DataFrame()
+        filters = self._filters(vintages, series) or []
+        filters += [('date', '>=', start), ('date', '<=', end)]
+        df = pd.read_parquet(self._path('panel'), filters=filters)
+        columns = pd.unique(df['series'].astype(str))
+        return df.pivot(index=['vintage', 'date'], columns='series',
+                        values='value')\
+                 .reindex(columns=columns)\
+                 .rename_axis(columns=None)
+
+    def codes(self, vintages: List[int] | None = None,
+              series: List[str] | None = None) -> DataFrame:
+        """Read transform codes of any subset of vintages and series
+
+        Args:
+            vintages: List of YYYYMM vintages to read, None for all stored
+            series: List of series names to read, None for all
+
+        Returns:
+            DataFrame of int codes indexed by (vintage, series), with code
+            labels, e.g. 'transform', in columns
+        """
+        df = pd.read_parquet(self._path('codes'),
+                             filters=self._filters(vintages, series))
+        df['series'] = df['series'].astype(str)
+        return df.pivot(index=['vintage', 'series'], columns='label',
+                        values='code')\
+                 .rename_axis(columns=None)
+
 
 class Alfred:
     """Base class for Alfred/Fred access, and manipulating retrieved data series
@@ -175,6 +362,7 @@ class Alfred:
         _fred_url(): Formatter to construct FRED api query from key-value string
         _alfred_url(): Formatter to construct vintage FRED api query
         _category_url(): Formatter to construct FRED category api query
+        fred_url: Root of FRED api urls
     """
     _tcode = {1: {'diff': 0, 'log': 0},
               2: {'diff': 1, 'log': 0},
@@ -278,12 +466,13 @@ class Alfred:
         return df.shift(t['shift'])
 
     # Format input key-values to form fred api's
-    _alfred_url = ("https://api.stlouisfed.org/fred/{api}?series_id={series_id}"
+    fred_url = "https://api.stlouisfed.org/fred/"
+    _alfred_url = ("{root}{api}?series_id={series_id}"
                    "&realtime_start={start}&realtime_end={end}"
                    "&api_key={api_key}&file_type=json").format
-    _fred_url = ("https://api.stlouisfed.org/fred/{api}?series_id={series_id}"
+    _fred_url = ("{root}{api}?series_id={series_id}"
                  "&api_key={api_key}&file_type=json").format
-    _category_url = ("https://api.stlouisfed.org/fred/{api}?"
+    _category_url = ("{root}{api}?"
                     "category_id={category_id}&api_key={api_key}&"
                     "file_type=json{args}").format
 
@@ -305,7 +494,7 @@ class Alfred:
             return [self.header(s, column=column) for s in series_id]
         if series_id not in self._header:
             try:
-                if series_id not in self._cache:  # load via api if not in cache
+                if self[series_id] is None:  # load via api if not in cache
                     self.get_series(series_id)
                 self._header[series_id] = self[series_id]['series'].iloc[-1]
             except:
@@ -313,8 +502,12 @@ class Alfred:
         return self._header[series_id].get(column, f"*** {series_id} ***")
 
     def keys(self):
-        """Return id names of all loaded series data"""
-        return list(self._cache.keys())
+        """Return id names of all loaded series data, and in cachedir"""
+        keys = list(self._cache.keys())
+        if self.cachedir and os.path.isdir(self.cachedir):
+            keys += sorted(f[:-4] for f in os.listdir(self.cachedir)
+                           if f.endswith('.npz') and f[:-4] not in self._cache)
+        return keys
 
     def values(self, columns: List[str] = ['id',
                                            'observation_start',
@@ -332,19 +525,41 @@ class Alfred:
         Returns:
             DataFrame of latest headers of all series loaded
         """
-        df = pd.concat([v['series'].iloc[[-1]] for v in self._cache.values()],
+        df = pd.concat([self[k]['series'].iloc[[-1]] for k in self.keys()],
                        axis=0,
                        ignore_index=True)
         df = df.set_index('id', drop=False)
         return df[columns]
 
     def __init__(self, api_key: str, start: int = 17760704,
-                 end: int = 99991231, savefile: str = '', verbose=_VERBOSE):
-        """Create object, with api_key, for FRED access and data manipulation"""
+                 end: int = 99991231, savefile: str = '', cachedir: str = '',
+                 root: str = '', workers: int = 4, rate: float = 2.,
+                 verbose=_VERBOSE):
+        """Create object, with api_key, for FRED access and data manipulation
+
+        Args:
+            api_key: Credentials to FRED
+            start, end: Default realtime period of observations to request
+            savefile: Name of pickle file to dump and load all series
+            cachedir: Folder to save each series in, loaded when first used
+            root: Root of api urls, default FRED website
+            workers: Number of threads requesting a list of series
+            rate: Maximum number of requests per second, across threads
+
+        Notes:
+
+        - https://fred.stlouisfed.org/docs/api/fred/: current max request
+          rate is 120 requests per minute
+        """
         self.api_key = api_key
         self._start = start
         self._end = end
         self.savefile = savefile
+        self.cachedir = cachedir
+        self.root = root or Alfred.fred_url
+        self.workers = workers
+        self._limiter = RateLimiter(rate=rate)
+        self._session = None
         self._cache = dict()
         self._header = Alfred._header.copy()
         self._verbose = verbose
@@ -374,34 +589,124 @@ class Alfred:
         return self._cache.pop(series_id, None)
 
     def get_series(self, series_id: str | List[str], api_key: str ='',
-                   start: int = 0, end: int = 0) -> int:
+                   start: int = 0, end: int = 0,
+                   refresh: bool = True) -> int | List[int]:
         """Retrieve metadata and full observations of a series with FRED api
 
         Args:
-            series_id: list of ids of series to retrieve
+            series_id: id or list of ids of series to retrieve
+            refresh: If False, series already cached are not requested
 
         Returns:
-            length of observations dataframe
+            length of observations dataframe, or list of lengths
+
+        Notes:
+
+        - a list of series is requested by a pool of threads sharing one
+          session and token bucket
+        - if a series is cached and start and end are defaults, only its
+          metadata is requested when last_updated is unchanged; else only
+          observations with realtime_start after the cached maximum are
+          requested and appended
         """
-        if types.is_list_like(series_id):
-            return [self.get_series(s, start=start, end=end) for s in series_id]
-        series = self.request_series(series_id,
-                                     api_key=api_key,
-                                     start=start,
-                                     end=end,
-                                     verbose=self._verbose)
+        ids = list(series_id) if types.is_list_like(series_id) else [series_id]
+        if self._session is None:
+            self._session = requests_session(pool=self.workers)
+        cached = {}
+        for s in ids:
+            if (not start and not end) or not refresh:
+                cached[s] = self[s]
+        if not refresh:
+            ids = [s for s in ids if cached.get(s) is None]
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers) as pool:
+            futures = {pool.submit(self._fetch_series, s, cached.get(s),
+                                   api_key=api_key, start=start, end=end): s
+                       for s in ids}
+            for future in concurrent.futures.as_completed(futures):
+                s = futures[future]
+                data = future.result()
+                if data is not None:
+                    self._cache[s] = data
+                    if self.cachedir:
+                        self._save_series(s, data)
+        lengths = [len(self[s]['observations']) if self[s] is not None else 0
+                   for s in (series_id if types.is_list_like(series_id)
+                             else [series_id])]
+        return lengths if types.is_list_like(series_id) else lengths[0]
+
+    def _fetch_series(self, series_id: str, cached: Dict | None,
+                      api_key: str = '', start: int = 0,
+                      end: int = 0) -> Dict | None:
+        """Helper to request series, or its new observations if cached"""
+        get = dict(api_key=api_key, session=self._session,
+                   limiter=self._limiter, verbose=self._verbose)
+        series = self.request_series(series_id, start=start, end=end, **get)
         if series is None or series.empty:
-            return 0
-        self._cache[series_id] = {
-            'observations':
-            self.request_series_observations(series_id,
-                                             api_key=api_key,
-                                             start=start,
-                                             end=end,
-                                             alfred_mode=True,
-                                             verbose=self._verbose),
-            'series': series}
-        return len(self._cache[series_id]['observations'])
+            return None
+        if cached is not None:
+            if (series['last_updated'].iloc[-1]
+                == cached['series']['last_updated'].iloc[-1]):
+                return None         # unchanged since cached
+            old = cached['observations']
+            latest = old['realtime_start'].max()
+            new = self.request_series_observations(
+                series_id, start=_date2int(latest), **get)
+            if new.empty:   # failed: keep cached, so next refresh retries
+                return None
+            new = new[new['realtime_start'] > latest]
+            return {'observations': Alfred._append_observations(old, new),
+                    'series': series}
+        observations = self.request_series_observations(series_id,
+                                                        start=start,
+                                                        end=end,
+                                                        alfred_mode=True,
+                                                        **get)
+        if observations.empty:
+            return None
+        return {'observations': observations, 'series': series}
+
+    @staticmethod
+    def _append_observations(old: DataFrame, new: DataFrame) -> DataFrame:
+        """Helper to append newer vintages, closing superseded observations"""
+        if new.empty:
+            return old
+        old = old.copy()
+        first = new.groupby('date')['realtime_start'].min()
+        superseded = (old['date'].isin(first.index)
+                      & old['realtime_end'].eq('9999-12-31'))
+        old.loc[superseded, 'realtime_end'] = (
+            pd.to_datetime(old.loc[superseded, 'date'].map(first))
+            - pd.DateOffset(days=1)).dt.strftime('%Y-%m-%d').values
+        return pd.concat([old, new[old.columns]], ignore_index=True)\
+                 .sort_values(['date', 'realtime_start'], kind='stable')\
+                 .reset_index(drop=True)
+
+    def _save_series(self, series_id: str, data: Dict):
+        """Helper to save a series to cachedir, as columns in an npz file"""
+        os.makedirs(self.cachedir, exist_ok=True)
+        obs = data['observations']
+        columns = {'obs_' + c: obs[c].astype(str).to_numpy(dtype=str)
+                   for c in obs.columns}
+        filename = os.path.join(self.cachedir, series_id + '.npz')
+        with open(filename + '.tmp', 'wb') as f:
+            np.savez_compressed(f,
+                                series=np.array(
+                                    data['series'].to_json(orient='records')),
+                                **columns)
+        os.replace(filename + '.tmp', filename)
+
+    def _load_series(self, series_id: str) -> Dict | None:
+        """Helper to load a series from cachedir, if saved"""
+        filename = os.path.join(self.cachedir, series_id + '.npz')
+        if not self.cachedir or not os.path.exists(filename):
+            return None
+        with np.load(filename, allow_pickle=False) as f:
+            obs = DataFrame({k[4:]: f[k].astype(object) for k in f.files
+                             if k.startswith('obs_')})
+            series = pd.read_json(StringIO(str(f['series'])),
+                                  orient='records', dtype=False)
+        return {'observations': obs, 'series': series}
 
     @staticmethod
     def construct_series(observations: DataFrame, vintage: int = 99991231,
@@ -422,19 +727,7 @@ class Alfred:
         df['value'] = pd.to_numeric(observations['value'], errors='coerce')
         df['date'] = pd.to_datetime(df['date'])
         df = df.dropna().reset_index(drop=True)
-        if freq:
-            if freq.upper()[0] in ['A']:
-                df['date'] += YearEnd(0)
-            if freq.upper()[0] in ['S']:
-                df['date'] += QuarterEnd(1)
-            if freq.upper()[0] in ['Q']:
-                df['date'] += QuarterEnd(0)
-            if freq.upper()[0] in ['M']:
-                df['date'] += MonthEnd(0)
-            if freq.upper()[0] in ['B']:
-                df['date'] += pd.DateOffset(days=13)
-            if freq.upper()[0] in ['W']:
-                df['date'] += pd.DateOffset(days=6)
+        df['date'] = _period_end(df['date'], freq)
         if np.any(df['realtime_start'] <= _int2date(vintage)):
             df = df[df['realtime_start'] <= _int2date(vintage)]
         df['value'] = pd.to_numeric(df['value'], errors='coerce')
@@ -473,6 +766,99 @@ class Alfred:
                   & (df.index >= start)]
                  
 
+    @staticmethod
+    def construct_vintages(observations: DataFrame, vintages: List[int],
+                           release: int | pd.DateOffset = 0, start: int = 0,
+                           end: int = 99991231, freq: str = '') -> DataFrame:
+        """Construct real-time panel of a series' values at each vintage
+
+        Args:
+            observations: DataFrame from FRED 'series/observations' api call
+            vintages: Vintage dates, each the latest realtime_start allowed
+            release: release number, or latest up to maximum date offset; 
+                     0 for latest release as of each vintage
+            start, end: Start and end period dates (inclusive) to keep
+            freq: Shift period dates to end of period of this frequency
+
+        Returns:
+            DataFrame of values, indexed by vintage with period dates in
+            columns; NaN where not yet released as of the vintage
+
+        Notes:
+
+        - observations are sorted once by period and realtime_start, and
+          every (vintage, period) cell is located by one searchsorted over
+          the sorted keys, instead of calling construct_series per vintage
+        - a row of the panel equals construct_series(vintage=...), except
+          that a vintage before any release is all NaN
+        """
+        dates = _period_end(pd.to_datetime(observations['date']), freq)
+        df = DataFrame({'date': (dates.dt.year * 10000 + dates.dt.month * 100
+                                 + dates.dt.day).values,
+                        'realtime_start': observations['realtime_start']\
+                        .str.replace('-', '').astype(int).values,
+                        'value': pd.to_numeric(observations['value'],
+                                               errors='coerce').values})
+        df = df[df['date'].between(start, end)].dropna()
+        order = np.lexsort((df['realtime_start'].values, df['date'].values))
+        date = df['date'].values[order]
+        realtime = df['realtime_start'].values[order].astype(np.int64)
+        value = df['value'].values[order]
+        periods, first, counts = np.unique(date, return_index=True,
+                                           return_counts=True)
+        vintage = np.asarray(vintages, dtype=np.int64)[:, None]
+
+        if isinstance(release, int) and release > 0:   # exactly release number
+            pos = first + np.minimum(release, counts) - 1
+            valid = (release <= counts) & (realtime[pos] <= vintage)
+        else:    # latest release as of vintage, or up through date offset
+            cutoff = vintage
+            if not isinstance(release, int):
+                offset = pd.to_datetime(periods.astype(str)) + release
+                cutoff = np.minimum(vintage, (offset.year * 10000
+                                              + offset.month * 100
+                                              + offset.day).values)
+            scale = np.int64(10**8)    # sort key is (period, realtime_start)
+            group = np.arange(len(periods), dtype=np.int64) * scale
+            keys = np.repeat(group, counts) + realtime
+            pos = np.searchsorted(keys, group + cutoff, side='right') - 1
+            valid = pos >= first
+            pos = np.maximum(pos, 0)
+        valid &= periods <= vintage
+        return DataFrame(np.where(valid, value[pos], np.nan),
+                         index=pd.Index(vintages, name='vintage'),
+                         columns=pd.Index(periods, name='date'))
+
+    def realtime_panel(self, series_id: str | List[str], vintages: List[int],
+                       release: int | pd.DateOffset = 0, start: int = 0,
+                       end: int = 0,
+                       freq: str = '') -> DataFrame | Dict[str, DataFrame]:
+        """Return real-time panels of series, by vintage and period
+
+        Args:
+            series_id: id or list of ids of series
+            vintages: Vintage dates, each the latest realtime_start allowed
+            release: release number, or latest up to maximum date offset; 
+                     0 for latest release as of each vintage
+            start, end: Start and end period dates (inclusive) to keep
+            freq: Period frequency, else blank '' to use series' frequency
+
+        Returns:
+            DataFrame of values indexed by vintage with period dates in
+            columns, or dict of DataFrames keyed by series_id
+        """
+        ids = list(series_id) if is_list_like(series_id) else [series_id]
+        self.get_series([s for s in ids if self[s] is None])
+        panels = {s: Alfred.construct_vintages(
+            self[s]['observations'],
+            vintages=vintages,
+            release=release,
+            start=start or self._start,
+            end=end or self._end,
+            freq=freq or self.header(s, 'frequency_short'))
+                  for s in ids if self[s] is not None}
+        return panels if is_list_like(series_id) else panels.get(series_id)
+
     def __call__(self, series_id: str, start: int = 0, end: int = 0,
                  release: int | pd.DateOffset = 0, vintage: int = 99991231,
                  label: str = '', realtime: bool = False,
@@ -496,7 +882,7 @@ class Alfred:
             transformed values; name is set to label if provided else series_id
         """
         assert isinstance(series_id, str)
-        if (series_id not in self._cache and not self.get_series(series_id)):
+        if (self[series_id] is None and not self.get_series(series_id)):
             return None
         if not freq:
             freq = self.header(series_id, 'frequency_short')
@@ -516,23 +902,36 @@ class Alfred:
                      .rename(label or series_id)
 
     def __getitem__(self, series_id: str) -> Dict:
-        """Get observations and metadata for {series_id}"""
-        return self._cache.get(series_id, None)
+        """Get observations and metadata for {series_id}, loading if saved"""
+        if series_id not in self._cache:
+            data = self._load_series(series_id)
+            if data is None:
+                return None
+            self._cache[series_id] = data
+        return self._cache[series_id]
 
     def request_series(self, series_id: str, api_key: str = '', start: int = 0,
-                       end : int = 0, verbose: int = _VERBOSE) -> DataFrame:
+                       end : int = 0,
+                       session: requests.Session | None = None,
+                       limiter: RateLimiter | None = None,
+                       verbose: int = _VERBOSE) -> DataFrame:
         """Requests 'series' API for series metadata"""
-        url = self._alfred_url(api="series",
+        get = dict(session=session, limiter=limiter)
+        if limiter:
+            get['delay'] = 0
+        url = self._alfred_url(root=self.root,
+                               api="series",
                                series_id=series_id,
                                start=_int2date(start or self._start),
                                end=_int2date(end or self._end),
                                api_key=api_key or self.api_key)
-        r = requests_get(url, verbose=-1)
+        r = requests_get(url, verbose=-1, **get)
         if r is None:
-            url = self._fred_url(api="series",
+            url = self._fred_url(root=self.root,
+                                 api="series",
                                  series_id=series_id,
                                  api_key=api_key or self.api_key)
-            r = requests_get(url, verbose=verbose)
+            r = requests_get(url, verbose=verbose, **get)
             if r is None:
                 return DataFrame()
 #        else:
@@ -545,19 +944,26 @@ class Alfred:
     def request_series_observations(self, series_id: str, api_key: str = '',
                                     start: int = 0, end: int = 0,
                                     alfred_mode: bool = False,
+                                    session: requests.Session | None = None,
+                                    limiter: RateLimiter | None = None,
                                     verbose: int = _VERBOSE) -> DataFrame:
         """Request 'series/observations' API for full observations data"""
-        url = self._alfred_url(api="series/observations",
+        get = dict(session=session, limiter=limiter)
+        if limiter:
+            get['delay'] = 0
+        url = self._alfred_url(root=self.root,
+                               api="series/observations",
                                series_id=series_id,
                                start=_int2date(start or self._start),
                                end=_int2date(end or self._end),
                                api_key=api_key or self.api_key)
-        r = requests_get(url, verbose=-1)
+        r = requests_get(url, verbose=-1, **get)
         if r is None:
-            url = self._fred_url(api="series/observations",
+            url = self._fred_url(root=self.root,
+                                 api="series/observations",
                                  series_id=series_id,
                                  api_key=api_key or self.api_key)
-            r = requests_get(url, verbose=verbose)
+            r = requests_get(url, verbose=verbose, **get)
             if r is None:
                 return DataFrame()
 #        else:
@@ -612,7 +1018,8 @@ class Alfred:
                          **kwargs) -> Dict:
         """Request 'category' and related API for category data"""
         args = "&".join([f"{k}={v}" for k,v in kwargs.items()])
-        url = self._category_url(api=api,
+        url = self._category_url(root=self.root,
+                                 api=api,
                                  category_id=category_id,
                                  api_key=api_key or self.api_key,
                                  args="&" + args if args else '')
@@ -707,20 +1114,59 @@ def remove_outliers(X: DataFrame, method: str = 'iq10') -> DataFrame:
     return Z
 
 
-def mrsq(X: DataFrame, kmax: int) -> DataFrame:
+def _spectra(X: Dict[Any, DataFrame],
+             compute_uv: bool = True) -> Dict[Any, Tuple]:
+    """Helper to standardize and decompose panels, stacking equal shapes
+
+    Args:
+        X: Panels keyed by e.g. vintage, each with T rows and N columns
+        compute_uv: Whether to also return right singular vectors
+
+    Returns:
+        Dict of singular values, and vT if compute_uv, of each panel
+
+    Notes:
+
+    - panels with equal shapes are decomposed in one batched SVD call
+    """
+    shapes = {}
+    for key, df in X.items():
+        shapes.setdefault(df.shape, []).append(key)
+    out = {}
+    for keys in shapes.values():
+        Z = np.stack([X[key].to_numpy(dtype=float) for key in keys])
+        Z = (Z - Z.mean(axis=1, keepdims=True)) / Z.std(axis=1, ddof=0,
+                                                         keepdims=True)
+        if compute_uv:
+            _, s, vT = np.linalg.svd(Z, full_matrices=False)
+            out.update({key: (s[i], vT[i]) for i, key in enumerate(keys)})
+        else:
+            s = np.linalg.svd(Z, compute_uv=False)
+            out.update({key: (s[i],) for i, key in enumerate(keys)})
+    return out
+
+
+def mrsq(X: DataFrame | Dict[Any, DataFrame],
+         kmax: int | Dict[Any, int] = 0) -> DataFrame | Dict[Any, DataFrame]:
     """Return marginal R2 of each variable from incrementally adding factors
 
     Args:
-        X: T observations/samples in rows, N variables/features in columns
+        X: T observations/samples in rows, N variables/features in columns,
+           or dict of such panels keyed by e.g. vintage
         kmax: maximum number of factors.  If 0, set to rank from SVD
 
     Returns:
-        DataFrame with marginal R2 with component in each column
+        DataFrame with marginal R2 with component in each column, or dict
+        of DataFrames if X is a dict
 
     Notes:
 
     From matlab code, Bai and Ng (2002) and McCracken at
       https://research.stlouisfed.org/econ/mccracken/fred-databases/
+
+    - the projection of Z on component k is u_k s_k vT_k, whose mean square
+      in column j is (s_k vT_kj)**2 / T: so marginal R2 are computed from
+      squared loadings, without forming T x T projections u_k u_k.T
     """
     # pca.components_[i,:] is vT[i, :]
     # pca.explained_variance_ is s**2/(T-1)
@@ -728,26 +1174,59 @@ def mrsq(X: DataFrame, kmax: int) -> DataFrame:
     # beta = np.diag(pca.singular_values_) @ pca.components_  # "loadings"
     # x.T @ x = beta.T @ beta is covariance matrix
     
-    Z = (X - X.mean()) / X.std(ddof=0)
-    u, s, vT = np.linalg.svd(Z, full_matrices=False)
+    if isinstance(X, DataFrame):
+        return mrsq({0: X}, {0: kmax})[0]
+    if not isinstance(kmax, dict):
+        kmax = {key: kmax for key in X}
+    out = {}
+    for key, (s, vT) in _spectra(X).items():
+        loadings = (s[:, None] * vT)**2     # T times mean square of each k
+        k = kmax[key] or len(s)
+        out[key] = DataFrame((loadings[:k] / loadings.sum(axis=0)).T,
+                             index=X[key].columns)
+    return out
+
+
+def _bai_ng(eigval: np.ndarray, total: float, T: int, N: int, kmax: int,
+            p: int) -> int:
+    """Helper to select number of factors from leading eigenvalues
 
-    mrsq_ = pd.concat([np.mean((u[:,k-1:k] @ u[:,k-1:k].T @ Z)**2, axis=0)
-                       for k in np.arange(1, (kmax or len(s)) + 1)],
-                      axis=1)
-    return mrsq_.div(np.mean((u @ u.T @ Z)**2, axis=0), axis=0)
+    Args:
+        eigval: Leading squared singular values, at least kmax-1 of them
+        total: Sum of all squared singular values, i.e. squared Frobenius norm
+        T, N: Number of observations and variables
+        kmax: Maximum number of factors
+        p: int in [1, 2, 3] to use PCp1 or PCp2 or PCp3 penalty
+    """
+    NT = N * T
+    NT1 = N + T
+    GCT = min(N, T)    
+    CT = [np.log(NT/NT1) * (NT1/NT),
+          (NT1/NT) * np.log(GCT),
+          np.log(GCT) / GCT]
+    kmax = min(kmax, GCT)
+    CT = np.arange(kmax) * CT[p-1]
+    residual_variance = total - np.concatenate([[0],
+                                                eigval[:kmax-1].cumsum()])
+    sigma = np.maximum(residual_variance / total, np.finfo(float).tiny)
+    ic = np.log(sigma) + CT
+    return np.where((ic[:-1] - ic[1:]) < 0)[0][0]
 
 
-def select_bai_ng(X: DataFrame, kmax: int = 0, p: int = 2) -> int:
+def select_bai_ng(X: DataFrame | Dict[Any, DataFrame], kmax: int = 0,
+                  p: int = 2) -> int | Dict[Any, int]:
     """Determine number of factors based on Bai & Ng (2002) info criterion
 
     Args:
 
-        X: T observations/samples in rows, N variables/features in columns
+        X: T observations/samples in rows, N variables/features in columns,
+           or dict of such panels keyed by e.g. vintage
         p: int in [1, 2, 3] to use PCp1 or PCp2 or PCp3 penalty
         kmax: Maximum number of factors.  If 0, set to rank from SVD
 
     Returns:
-        best number of factors based on ICp{p} criterion, or 0 if not determined
+        best number of factors based on ICp{p} criterion, or 0 if not
+        determined; or dict of numbers of factors if X is a dict
 
     Notes:
 
@@ -758,23 +1237,49 @@ def select_bai_ng(X: DataFrame, kmax: int = 0, p: int = 2) -> int:
       prior bound on number of factors.
     """
     assert p > 0
-    Z = ((X - X.mean()) / X.std(ddof=0)).to_numpy()
+    if isinstance(X, DataFrame):
+        return select_bai_ng({0: X}, kmax=kmax, p=p)[0]
+    out = {}
+    for key, (s,) in _spectra(X, compute_uv=False).items():
+        T, N = X[key].shape
+        eigval = s**2
+        out[key] = _bai_ng(eigval, eigval.sum(), T=T, N=N,
+                           kmax=kmax or min(T, N), p=p)
+    return out
+
+
+def _svd(Z: np.ndarray, k: int, V: np.ndarray | None = None,
+         n_iter: int = 4, oversample: int = 10) -> Tuple:
+    """Helper for rank-k SVD by subspace iteration, warm-started from V
+
+    Args:
+        Z: Matrix to decompose
+        k: Number of singular values and vectors to return
+        V: Right singular vectors from previous call, else random start
+        n_iter: Number of power iterations
+        oversample: Number of extra vectors in subspace
+
+    Returns:
+        Tuple of u, s, vT truncated to rank k, and right vectors of the
+        whole subspace to warm-start the next call
+
+    Notes:
+
+    - if the subspace is not much smaller than Z, returns its thin SVD
+    """
     T, N = Z.shape
-    NT = N * T
-    NT1 = N + T
-    GCT = min(N, T)    
-    CT = [np.log(NT/NT1) * (NT1/NT),
-          (NT1/NT) * np.log(GCT),
-          np.log(GCT) / GCT]
-    CT = [i * CT[p-1] for i in range(GCT)]
-
-    u, s, vT = np.linalg.svd(Z, full_matrices=False)
-    eigval = s**2
-    residual_variance = np.roll(np.sum(eigval) - eigval.cumsum(), 1)
-    residual_variance[0] = sum(eigval)
-    sigma = residual_variance / sum(eigval)
-    ic = (np.log(sigma) + CT)[:(kmax or GCT)]
-    return np.where((ic[:-1] - ic[1:]) < 0)[0][0]
+    size = k + oversample
+    if 2 * size >= min(T, N):
+        u, s, vT = np.linalg.svd(Z, full_matrices=False)
+        return u[:, :k], s[:k], vT[:k, :], None
+    if V is None:
+        V = np.random.default_rng(0).standard_normal((N, size))
+    Q, _ = np.linalg.qr(Z @ V)
+    for _ in range(n_iter):
+        Q, _ = np.linalg.qr(Z.T @ Q)
+        Q, _ = np.linalg.qr(Z @ Q)
+    u, s, vT = np.linalg.svd(Q.T @ Z, full_matrices=False)
+    return (Q @ u)[:, :k], s[:k], vT[:k, :], vT.T
 
 
 def factors_em(X: DataFrame, kmax: int = 0, p: int = 2, max_iter: int = 50,
@@ -789,36 +1294,42 @@ def factors_em(X: DataFrame, kmax: int = 0, p: int = 2, max_iter: int = 50,
 
     Returns:
         DataFrame with missing values imputed with factor EM algorithm
+
+    Notes:
+
+    - each iteration computes a rank kmax SVD by subspace iteration, started
+      from the previous iteration's right singular vectors, and the same
+      singular values select the number of factors when p > 0
     """
-    Z = X.copy()          # passed by reference
+    Z = X.to_numpy(dtype=float, copy=True)
     Y = np.isnan(Z)       # missing entries
     assert(not np.any(np.all(Y, axis=1)))  # no row can be all missing
     assert(not np.any(np.all(Y, axis=0)))  # no column can be all missing
+    T, N = Z.shape
+    kmax = kmax or min(T, N) - 1
 
-    # identify cols with missing values, and initially fill with column mean
-    missing_cols = Z.isnull().sum().to_numpy().nonzero()[0]
-    for col in missing_cols:
-        Z.iloc[Y.iloc[:, col], col] = Z.iloc[:, col].mean()
+    # initially fill missing values with column mean
+    Z[Y] = np.broadcast_to(np.nanmean(Z, axis=0), Z.shape)[Y]
 
+    V = None
     for n_iter in range(max_iter):
         old_Z = Z.copy()
-        mean = Z.mean()
-        std = Z.std()
+        mean = Z.mean(axis=0)
+        std = Z.std(axis=0, ddof=1)
         Z = (Z - mean) / std             # standardize the data
 
         # "M" step: estimate factors
-        u, s, vT = np.linalg.svd(Z)
+        u, s, vT, V = _svd(Z, k=kmax, V=V)
 
         # auto-select number of factors if p>0 else fix number of factors
         if p:
-            r = select_bai_ng(Z, p=p, kmax=kmax or len(s) - 1)
+            r = _bai_ng(s**2, np.sum(Z**2), T=T, N=N, kmax=kmax, p=p)
         else:
-            r = kmax or len(s) - 1
+            r = kmax
 
         # "E" step: update missing entries
-        E = u[:, :r] @ np.diag(s[:r]) @ vT[:r, :]
-        for col in missing_cols:
-            Z.iloc[Y.iloc[:, col], col] = E[Y.iloc[:, col], col]
+        E = (u[:, :r] * s[:r]) @ vT[:r, :]
+        Z[Y] = E[Y]
 
         Z = (Z * std) + mean  # undo standardization
 
@@ -827,5 +1338,5 @@ def factors_em(X: DataFrame, kmax: int = 0, p: int = 2, max_iter: int = 50,
             print(f"{n_iter:4d} {delta:8.3g} {r}")
         if delta < tol:       # diff**2/prev**2
             break
-    return Z
+    return DataFrame(Z, index=X.index, columns=X.columns)
 
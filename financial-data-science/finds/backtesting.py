@@ -27,7 +27,7 @@ from sqlalchemy import Integer, String, Float, SmallInteger, Boolean, \
 from typing import Dict, Any, Tuple, List
 from finds.structured import Structured, Stocks, Benchmarks
 from finds.database import SQL
-from finds.recipes import least_squares, FFT, maximum_drawdown
+from finds.recipes import fama_macbeth, FFT, maximum_drawdown
 from finds.display import plot_date, plot_bands
 
 _VERBOSE = 1
@@ -410,7 +410,8 @@ class RiskPremium:
         self.end_ = end
 
     def __call__(self, stocks: Stocks, loadings: Dict[int, DataFrame],
-                 weights: str = "", standardize: List[str] = []) -> Series:
+                 weights: str = "", standardize: List[str] = [],
+                 haclags: int = 6) -> Series:
         """Estimate factor risk premiums with cross-sectional FM regressions
 
         Args:
@@ -418,13 +419,22 @@ class RiskPremium:
           loadings: dict keyed by rebalance date of loadings DataFrames
           standardize: List of columns to demean and rescale (eql-wtd std = 1)
           weights: List of weights for weighted least squares and demean
+          haclags: number of Newey-West lags for stderr of mean premiums
 
         Returns:
           Series of means and stderrs of FM cross-sectional regression
+
+        Notes:
+
+        - loadings joined with returns are stacked into one panel, and the
+          cross-sectional regressions of all dates are solved together
+        - periods with no more observations than regressors are skipped:
+          their dates are kept in skipped_, and holdrets is aligned to the
+          remaining periods of perf
         """
         pordates = sorted(list(loadings.keys()))
         self.holdrets = stocks.bd.date_tuples(pordates)
-        out = []
+        panel = []
         for pordate, holdrets in zip(pordates[:-1], self.holdrets):
             if holdrets in self.monthly_: 
                 rf = self.monthly_[holdrets]
@@ -441,16 +451,21 @@ class RiskPremium:
                 df[col] -= np.average(df[col], weights=w)
                 df[col] /= np.std(df[col])
             df = df.join(stocks.get_ret(*holdrets, delist=True)-rf, how='left')
-            p = least_squares(df.dropna(),
-                              x=x,
-                              y=['ret'],
-                              add_constant=False)
-            p.name = holdrets[1]
-            out.append(p)
-        self.perf = pd.concat(out, axis=1).T
-        self.results = {'mean': self.perf.mean(),
-                        'stderr': self.perf.sem(),
-                        'std': self.perf.std(),
+            panel.append(df.assign(_date=holdrets[1]))
+        fm = fama_macbeth(pd.concat(panel),
+                          y='ret',
+                          x=x,
+                          date='_date',
+                          add_constant=False,
+                          lags=haclags)
+        self.perf = fm.coefficients.rename_axis(None)
+        kept = set(self.perf.index)
+        self.skipped_ = [end for beg, end in self.holdrets if end not in kept]
+        self.holdrets = [h for h in self.holdrets if h[1] in kept]
+        self.results = {'mean': fm.summary['mean'],
+                        'stderr': fm.summary['stderr'],
+                        'stderr_nw': fm.summary['stderr_nw'],
+                        'std': fm.summary['std'],
                         'count': len(self.perf)}
         return DataFrame(self.results)
 
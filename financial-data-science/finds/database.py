@@ -22,6 +22,7 @@ import os
 import time
 import io
 import requests
+import threading
 import zipfile
 import gzip
 import csv
@@ -43,9 +44,63 @@ _headers = {'User-Agent':
             '(KHTML, like Gecko) Chrome/51.0.2704.106 Safari/537.36'
             'OPR/38.0.2220.41'}
 
+class RateLimiter:
+    """Token bucket to limit the rate of requests shared by threads
+
+    Args:
+        rate: Maximum number of requests per second
+        burst: Maximum number of requests allowed at once
+
+    Notes:
+
+    - each call to acquire() takes a token, first sleeping until one is
+      available; tokens are replenished continuously at the given rate
+    - a waiting thread reserves its token before sleeping outside the lock,
+      so that requests are released in order and evenly spaced
+    """
+    def __init__(self, rate: float = 10., burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.count = 0      # number of tokens acquired
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping if necessary: return seconds slept"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            self.count += 1
+            wait = max(0, -self.tokens / self.rate)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+def requests_session(pool: int = 10,
+                     headers: Dict = _headers) -> requests.Session:
+    """Return requests.Session with keep-alive connections shared by threads
+
+    Args:
+      pool: Maximum number of connections kept open per host
+      headers: User-Agent, Connection and other headers parameters
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool,
+                                            pool_maxsize=pool)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    return session
+
 def requests_get(url: str, params: Dict = None, retry: int = 7,
                  sleep: float = 2., timeout: float = 3., delay: float = 0.25,
                  trap: bool = False, headers: str = _headers,
+                 session: requests.Session | None = None,
+                 limiter: RateLimiter | None = None,
                  verbose: int = _VERBOSE) -> requests.Response | None:
     """Wrapper over requests.get, with retry loops and delays
 
@@ -58,6 +113,8 @@ def requests_get(url: str, params: Dict = None, retry: int = 7,
       sleep: Number of seconds to wait between retries
       trap: On timed-out: if True raise exception, else return False
       delay: Number of seconds to wait initially
+      session: Session to reuse connections from, else open a new connection
+      limiter: Token bucket shared with other threads to limit request rate
       verbose: Whether to display verbose debugging messages
 
     Returns:
@@ -73,10 +130,12 @@ def requests_get(url: str, params: Dict = None, retry: int = 7,
         time.sleep(delay + (delay * np.random.rand()))
     for i in range(retry):
         try:
-            r = requests.get(url,
-                             headers=headers,
-                             timeout=timeout,
-                             params=params)
+            if limiter:
+                limiter.acquire()
+            r = (session or requests).get(url,
+                                          headers=headers,
+                                          timeout=timeout,
+                                          params=params)
             assert(r.status_code >= 200 and r.status_code <= 404)
             break
         except Exception as e:
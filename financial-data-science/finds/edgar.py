@@ -9,7 +9,9 @@ MIT License
 """
 from typing import Any, Dict, List, Tuple
 import lxml
+from lxml import etree
 from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector, UnicodeDammit
 import pandas as pd
 from pandas import DataFrame, Series
 import os
@@ -17,6 +19,9 @@ import io
 import sys
 import time
 import zipfile
+import zlib
+import struct
+import sqlite3
 import gzip
 import re
 import csv
@@ -24,9 +29,11 @@ import json
 import unicodedata
 import requests
 import glob
+import bisect
+import concurrent.futures
 import numpy as np
 import matplotlib.pyplot as plt
-from finds.database import requests_get
+from finds.database import requests_get, requests_session, RateLimiter
 
 _VERBOSE = 1
 
@@ -34,6 +41,338 @@ def _print(*args, verbose=0, **kwargs):
     if max(_VERBOSE, verbose):
         print(*args, **kwargs)
 
+def _read_member(f, offset: int, size: int, crc: int, method: int) -> bytes:
+    """Read and decompress a zip archive member given its manifest entry"""
+    f.seek(offset)
+    header = f.read(zipfile.sizeFileHeader)
+    if header[:4] != zipfile.stringFileHeader:
+        raise Exception(f"bad zip member header at offset {offset}")
+    n, m = struct.unpack('<HH', header[26:30])  # file name and extra lengths
+    f.seek(offset + zipfile.sizeFileHeader + n + m)
+    data = f.read(size)
+    if method == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -15)
+    elif method != zipfile.ZIP_STORED:
+        raise Exception(f"unsupported zip compression method {method}")
+    if zlib.crc32(data) != crc:
+        raise Exception(f"bad CRC of zip member at offset {offset}")
+    return data
+
+def _index_date(d: int) -> int:
+    """Helper to convert date in daily index filename to YYYYMMDD"""
+    if d <= 129999:  # 070194->940701
+        d = (d%100)*10000 + (d//100)
+    if d <= 129999: # 091231->20011231
+        d += 20000000
+    if d <= 999999: # 970102->19970102
+        d += 19000000
+    return d
+
+
+class Corpus:
+    """Store of documents packed in compressed blocks, with an offset index
+
+    Args:
+        filename: Name of data file of blocks; index is saved in filename.db
+        blocksize: Minimum number of bytes of text compressed in each block
+        level: Compression level of zlib, from 1 (fastest) to 9
+        verbose: Whether to display verbose messages
+
+    Attributes:
+        index: DataFrame of permno, date, form, item and pathname of each
+               document, in storage order, with its block and byte range
+
+    Notes:
+
+    - documents are appended to the current block, which is compressed and
+      written when it reaches blocksize; the index is saved by close()
+    - read() decompresses each block once for a batch of documents, and
+      iteration yields documents in storage order, so that corpus-wide passes
+      read the data file sequentially
+    """
+    def __init__(self, filename: str, blocksize: int = 2**20, level: int = 6,
+                 verbose: int = _VERBOSE):
+        self.filename = filename
+        self.blocksize = blocksize
+        self.level = level
+        self.verbose = verbose
+        self.index = DataFrame(columns=['permno', 'date', 'form', 'item',
+                                        'pathname', 'block', 'start',
+                                        'length'])
+        self.blocks = DataFrame(columns=['offset', 'size'])
+        if os.path.exists(filename + '.db'):
+            con = sqlite3.connect(filename + '.db')
+            try:
+                self.index = pd.read_sql_query(
+                    "SELECT * FROM documents ORDER BY rowid", con)
+                self.blocks = pd.read_sql_query(
+                    "SELECT * FROM blocks ORDER BY block", con)\
+                                .set_index('block')
+            finally:
+                con.close()
+        self._pending = []      # documents of current block not yet written
+        self._added = []        # index rows of documents written
+        self._written = []      # offset and size of blocks written
+        self._writer = None     # data file, opened for appending
+        self._reader = None     # data file, opened for reading
+        self._cached = (-1, b'')  # last decompressed block
+
+    def _print(self, *args, **kwargs):
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.index) + len(self._added) + len(self._pending)
+
+    def add(self, text: str, permno: int, date: int, form: str, item: str,
+            pathname: str = ''):
+        """Append a document to the corpus
+
+        Args:
+            text: Text of document
+            permno: Identifier of security
+            date: Date of filing
+            form: Type of form, e.g. '10-K'
+            item: Item extracted from filing, e.g. 'mda10K'
+            pathname: Source pathname of document
+        """
+        self._pending.append(({'permno': int(permno),
+                               'date': int(date),
+                               'form': form,
+                               'item': item,
+                               'pathname': pathname},
+                              text.encode('utf-8')))
+        if sum(len(data) for _, data in self._pending) >= self.blocksize:
+            self.flush()
+
+    def flush(self):
+        """Compress and write current block of documents"""
+        if not self._pending:
+            return
+        if self._writer is None:
+            self._writer = open(self.filename, 'ab')
+        block = len(self.blocks) + len(self._written)
+        start = 0
+        for row, data in self._pending:
+            self._added.append(dict(row, block=block, start=start,
+                                    length=len(data)))
+            start += len(data)
+        packed = zlib.compress(b''.join(data for _, data in self._pending),
+                               self.level)
+        self._writer.seek(0, os.SEEK_END)
+        self._written.append({'block': block,
+                              'offset': self._writer.tell(),
+                              'size': len(packed)})
+        self._writer.write(packed)
+        self._pending = []
+
+    def close(self):
+        """Write remaining documents, and save the index if changed"""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            added = DataFrame(self._added)
+            written = DataFrame(self._written).set_index('block')
+            if len(self.index):
+                added = pd.concat([self.index, added], ignore_index=True)
+                written = pd.concat([self.blocks, written])
+            self.index, self.blocks = added, written
+            self._added, self._written = [], []
+            con = sqlite3.connect(self.filename + '.db')
+            try:
+                self.index.to_sql('documents', con, if_exists='replace',
+                                  index=False)
+                self.blocks.to_sql('blocks', con, if_exists='replace',
+                                   index_label='block')
+                con.commit()
+            finally:
+                con.close()
+            self._print(f"(Corpus) {len(self.index)} documents in"
+                        f" {len(self.blocks)} blocks of {self.filename}")
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._cached = (-1, b'')
+
+    def _block(self, block: int) -> bytes:
+        """Helper to read and decompress a block, caching the last one"""
+        if self._cached[0] != block:
+            if self._reader is None:
+                self._reader = open(self.filename, 'rb')
+            self._reader.seek(self.blocks['offset'].iat[block])
+            data = zlib.decompress(
+                self._reader.read(self.blocks['size'].iat[block]))
+            self._cached = (block, data)
+        return self._cached[1]
+
+    def read(self, rows: DataFrame | List[int]) -> List[str]:
+        """Read a batch of documents, decompressing each block once
+
+        Args:
+            rows: Rows of index, e.g. selected by permno, or their positions
+
+        Returns:
+            List of text of documents, in same order as rows
+        """
+        if not isinstance(rows, DataFrame):
+            rows = self.index.iloc[list(rows)]
+        texts = [''] * len(rows)
+        order = np.argsort(rows['block'].values, kind='stable')
+        for i, block, start, length in zip(order,
+                                           rows['block'].values[order],
+                                           rows['start'].values[order],
+                                           rows['length'].values[order]):
+            texts[i] = self._block(block)[start:start + length].decode('utf-8')
+        return texts
+
+    def __getitem__(self, position: int) -> str:
+        """Read a document by its position in the index"""
+        return self.read([position])[0]
+
+    def __iter__(self):
+        """Iterate over rows of index and text of documents in storage order"""
+        for row in self.index.to_dict('records'):
+            data = self._block(row['block'])
+            yield row, data[row['start']:row['start']
+                            + row['length']].decode('utf-8')
+
+
+class TextIndex:
+    """On-disk inverted index of documents for boolean and phrase queries
+
+    Args:
+        filename: Name of SQLite database file of index
+        verbose: Whether to display verbose messages
+
+    Examples:
+
+    >>> index = ed.index_text(form='10-K', item='mda10K')
+    >>> index.search('"going concern" NOT cybersecurity', begdate=20200101)
+
+    Notes:
+
+    - uses SQLite's FTS5 extension: postings of each term list the ids of
+      documents and positions within them, so that a query reads only the
+      postings of its terms
+    - the index is contentless, i.e. text is not stored again; metadata of
+      each document (archive, pathname, cik, form, date, permno) is kept in
+      a documents table, joined with the ids of matches
+    - terms are case-folded with accents removed by the unicode61 tokenizer
+    """
+    def __init__(self, filename: str, verbose: int = _VERBOSE):
+        self.filename = filename
+        self.verbose = verbose
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        self.con = sqlite3.connect(filename)
+        self.con.execute("CREATE TABLE IF NOT EXISTS documents ("
+                         " docid INTEGER PRIMARY KEY, archive TEXT,"
+                         " pathname TEXT, cik INTEGER, form TEXT,"
+                         " date INTEGER, permno INTEGER,"
+                         " UNIQUE (archive, pathname))")
+        self.con.execute("CREATE INDEX IF NOT EXISTS idx_date"
+                         " ON documents (date)")
+        self.con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS postings USING"
+                         " fts5(text, content='', detail=full,"
+                         " tokenize='unicode61 remove_diacritics 2')")
+
+    def _print(self, *args, **kwargs):
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def indexed(self, archive: str) -> set:
+        """Return set of pathnames already indexed from an archive"""
+        return {row[0] for row in self.con.execute(
+            "SELECT pathname FROM documents WHERE archive = ?", (archive,))}
+
+    def add(self, text: str, archive: str, pathname: str, cik: int,
+            form: str, date: int, permno: int | None = None):
+        """Add a document to the index, to be saved by commit()
+
+        Args:
+            text: Text of document
+            archive: Label of archive, e.g. '2021' or '10-K/mda10K'
+            pathname: Pathname of document in archive
+            cik: Identifier of filer
+            form: Type of form, e.g. '10-K'
+            date: Date of filing
+            permno: Identifier of security, if any
+        """
+        cursor = self.con.execute(
+            "INSERT INTO documents (archive, pathname, cik, form, date,"
+            " permno) VALUES (?, ?, ?, ?, ?, ?)",
+            (archive, pathname, int(cik), form, int(date),
+             None if permno is None else int(permno)))
+        self.con.execute("INSERT INTO postings (rowid, text) VALUES (?, ?)",
+                         (cursor.lastrowid, text))
+
+    def commit(self):
+        """Save documents added to the index"""
+        self.con.commit()
+
+    def optimize(self):
+        """Merge postings into one segment, for faster queries"""
+        self.con.execute("INSERT INTO postings (postings) VALUES ('optimize')")
+        self.con.commit()
+
+    def close(self):
+        """Save documents added, and close the index"""
+        self.con.commit()
+        self.con.close()
+
+    def search(self, query: str, forms: List[str] = [], begdate: int = 0,
+               enddate: int = 0, archive: str = '') -> DataFrame:
+        """Return documents matching boolean or phrase query
+
+        Args:
+            query: FTS5 query, e.g. 'cybersecurity OR "going concern"'
+            forms: List of form types of documents to select
+            begdate: Select documents dated on or after this date
+            enddate: Select documents dated on or before this date
+            archive: Select documents from this archive
+
+        Returns:
+            DataFrame of archive, pathname, cik, form, date and permno of
+            matching documents, sorted by date
+
+        Notes:
+
+        - a query combines terms, "quoted phrases" and prefix* terms with
+          AND, OR, NOT and parentheses; adjacent terms are ANDed
+        - NOT is binary, e.g. '"going concern" NOT cybersecurity'
+        - terms with punctuation, e.g. cyber-security, must be quoted, else
+          ValueError is raised
+        """
+        where, params = ["docid IN (SELECT rowid FROM postings"
+                         " WHERE postings MATCH ?)"], [query]
+        if forms:
+            where.append(f"form IN ({', '.join('?' * len(forms))})")
+            params.extend(forms)
+        if begdate:
+            where.append("date >= ?")
+            params.append(int(begdate))
+        if enddate:
+            where.append("date <= ?")
+            params.append(int(enddate))
+        if archive:
+            where.append("archive = ?")
+            params.append(archive)
+        try:
+            return pd.read_sql_query("SELECT archive, pathname, cik, form,"
+                                     " date, permno FROM documents WHERE "
+                                     + " AND ".join(where)
+                                     + " ORDER BY date, docid",
+                                     self.con, params=params)
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            raise ValueError(f"Invalid query {query!r} ({e.__cause__ or e}):"
+                             " quote terms with punctuation, e.g."
+                             " '\"cyber-security\"', and use NOT between"
+                             " terms, e.g. 'a NOT b'") from e
+
+
 class Edgar:
     """Class to retrieve and pre-process Edgar website documents"""
 
@@ -51,6 +390,32 @@ class Edgar:
               '10-Q' : _f10_Q + _f10_QA + _f10_QT,
               '8-K' : ['8-K']}
 
+    # item headings and title phrases: secret sauce separating the sections
+    # (each alternative begins with a literal character, so that the regex
+    #  engine can skip ahead to candidate positions, and is identified by an
+    #  empty named group)
+    _headings = re.compile(
+        r'\n\s*?(?:I\s?T\s?E\s?M.?\s*?(?P<item>\d{1,2}[AB]?)(?![0-9A-Z])'
+        r'|P\s?A\s?R\s?T.?\s*?(?P<part>IV|III|II|I|[1-4])(?!\w)'
+        r'|QUANTITATIVE AND QUALITATIVE DIS(?P<qqd>)'
+        r'|BUSINESS.?\n(?P<business>))'
+        r'|DISCUSSION AND ANALYSIS(?P<mda>)'
+        r'|CONTROLS AND PROCEDURES(?P<controls>)'
+        r'|UNRESOLVED STAFF COMMENTS.?\s*?\n(?P<unresolved>)'
+        r'|SUMMARY OF BUSINESS\.?\n(?P<summary>)'
+        r'|DESCRIPTION OF BUSINESS\.?\n(?P<description>)'
+        r'|BUSINESS SUMMARY\.?\n(?P<busummary>)')
+    _roman = {'I': '1', 'II': '2', 'III': '3', 'IV': '4'}
+
+    # (begin, end, next begin) heading tokens of items, in order of priority
+    _sections = {
+        'mda10K': (['ITEM7', 'MDA'], ['ITEM7A', 'QQD'], ['ITEM8']),
+        'bus10K': (['ITEM1', 'PART1', 'BUSINESS', 'SUMMARY', 'DESCRIPTION',
+                    'BUSUMMARY'],
+                   ['ITEM1A', 'ITEM1B', 'UNRESOLVED'],
+                   ['ITEM2']),
+        'mda10Q': (['MDA', 'PART1'], ['ITEM3', 'CONTROLS', 'QQD'], ['PART2'])}
+
 
     #############################################################
     #
@@ -96,14 +461,54 @@ class Edgar:
         return df.set_index('ticker')['cik'].astype(int)
 
 
+    @staticmethod
+    def read_index(url: str, session: requests.Session | None = None,
+                   limiter: RateLimiter | None = None,
+                   verbose: int = _VERBOSE) -> DataFrame | None:
+        """Fetch and parse a master index file of full-index or daily-index
+
+        Args:
+            url: Full url of master index file, may be gzipped
+            session: Session to reuse connections from
+            limiter: Token bucket to limit rate of requests, instead of delay
+
+        Returns:
+            DataFrame of cik, name, form, date and pathname of filings, or
+            None if not found
+        """
+        r = requests_get(url, delay=0 if limiter else .1, session=session,
+                         limiter=limiter, verbose=verbose)
+        if r is None:
+            return None
+        data = gzip.decompress(r.content) if url.endswith('.gz') else r.content
+        try:    # daily indexes are utf-8, older master indexes may be latin-1
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = data.decode('latin-1')
+        df = pd.read_csv(io.StringIO(text),
+                         sep='|',
+                         quoting=3,
+                         header=None,
+                         low_memory=False,
+                         na_filter=False,
+                         dtype='str',
+                         names=['cik', 'name', 'form', 'date', 'pathname'])
+        df['date'] = df['date'].str.replace('-', '')
+        df = df[df['date'].str.isdigit() & df['cik'].str.isdigit()]
+        df = df.drop_duplicates(['pathname', 'date', 'form', 'cik'])
+        df['cik'] = df['cik'].astype(int)
+        df['date'] = df['date'].astype(int)
+        return df.reset_index(drop=True)
+
     @staticmethod
     def fetch_index(date: int = 0, year: int = 0, quarter: int = 0,
-                    verbose: int = _VERBOSE) -> Dict:
+                    root: str = '', verbose: int = _VERBOSE) -> Dict:
         """Fetch edgar daily index or full index, or all daily dates
 
         Args:
             date: Retrieve daily index for this date (unless 0)
             year, quarter: Retrieve full-index for this year/quarter (unless 0)
+            root: Root prefix of url, default Edgar website
 
         Returns:
             Dict of filings meta data from daily or full index, or daily dates
@@ -112,63 +517,36 @@ class Edgar:
 
             If no arguments, retrieve all dates by walking daily index tree
         """
-
+        root = os.path.join(root or Edgar.edgar_url, 'edgar')
         if year and quarter:    # get full-index by year/quarter
-            root = 'https://www.sec.gov/Archives/edgar/full-index/'
             url = os.path.join(root,
+                               'full-index',
                                str(year),
                                'QTR' + str(quarter),
                                "master.idx")
-            r = requests_get(url, verbose=verbose, delay=.1)
-            if r is None:
+            df = Edgar.read_index(url, verbose=verbose)
+            if df is None:
                 return None
-            df = pd.read_csv(io.BytesIO(r.content),
-                             sep='|',
-                             quoting=3,
-                             encoding='latin-1', 
-                             header=None,
-                             low_memory=False,
-                             na_filter=False, #skiprows=7,
-                             dtype='str',
-                             names=['cik', 'name', 'form', 'date', 'pathname'])
-            df['date'] = df['date'].str.replace('-','')
-            df = df[df['date'].str.isdigit() & df['cik'].str.isdigit()]
-            df = df.drop_duplicates(['pathname', 'date', 'form', 'cik'])
-            df = df[df['date'].str.isdigit() & df['cik'].str.isdigit()]
-            df['cik'] = df['cik'].astype(int)
-            df['date'] = df['date'].astype(int)
-            return df.reset_index(drop=True).to_dict(orient='index')
+            return df.to_dict(orient='index')
         
+        root = os.path.join(root, 'daily-index')
         if date:   # get daily-index
-            root = 'https://www.sec.gov/Archives/edgar/daily-index/'
             q = (((date // 100) % 100) + 2) // 3
             url = os.path.join(root,
                                str(date//10000),
                                'QTR' + str(q),
                                f"master.{date}.idx.gz")
-            r = requests_get(url, verbose=verbose, delay=.1)
-            if r is None:
+            df = Edgar.read_index(url, verbose=verbose)
+            if df is None:
                 d = ((date // 10000) % 100) + ((date % 10000) * 100)
                 url = os.path.join(root,
                                    str(date//10000),
                                    'QTR' + str(q),
                                    f"master.{d:06d}.idx")
-                r = requests_get(url, verbose=verbose, delay=.1)
-            df = pd.read_csv(io.BytesIO(r.content),
-                             compression='gzip',
-                             sep='|',
-                             dtype='str',
-                             quoting=3,
-                             encoding='utf-8', 
-                             low_memory=False,
-                             na_filter=False,
-                             header=None,
-                             #skiprows=7,
-                             names=['cik', 'name', 'form', 'date', 'pathname'])
-            df = df[df['date'].str.isdigit() & df['cik'].str.isdigit()]
-            df['cik'] = df['cik'].astype(int)
-            df['date'] = df['date'].astype(int)
-            return df.reset_index(drop=True).to_dict(orient='index')
+                df = Edgar.read_index(url, verbose=verbose)
+            if df is None:
+                return None
+            return df.to_dict(orient='index')
 
         def get_nodes(url: str) -> List[Dict]:
             """helper to retrieve url directory listing"""
@@ -194,33 +572,199 @@ class Edgar:
                                 if (len(s) > 2
                                     and s[0] == 'company'
                                     and s[2] == 'idx'):
-                                    d = int(s[1]) 
-                                    if d <= 129999:  # 070194->940701
-                                        d = (d%100)*10000 + (d//100) 
-                                    if d <= 129999: # 091231->20011231
-                                        d += 20000000  
-                                    if d <= 999999: # 970102->19970102
-                                        d += 19000000  
-                                    leaf[d] = sub + node['name']
+                                    leaf[_index_date(int(s[1]))] = \
+                                        sub + node['name']
         return leaf
+
+    def update_index(self, years: int | List[int] = 0, index: str = '',
+                     root: str = '', workers: int = 4,
+                     rate: float = 10.) -> DataFrame:
+        """Fetch new full and daily master indexes into local index database
+
+        Args:
+            years: Years to refresh, default from 1993 to current year
+            index: Name of index database, default ~master_index.db
+            root: Root prefix of url, default Edgar website
+            workers: Number of threads requesting concurrently
+            rate: Maximum number of requests per second, across threads
+
+        Returns:
+            DataFrame of index files fetched in this run, with number of rows
+
+        Notes:
+
+        - filings are stored in an SQLite table keyed by accession number
+          and cik (a filing is listed under each of its filers), indexed by
+          form, date and cik for query_index
+        - the full-index of a past quarter is fetched once; the current
+          quarter is listed, and only its daily indexes not yet fetched are
+          requested
+        - threads share one session and token bucket, while the database is
+          updated in this thread
+        """
+        index = index or os.path.join(self.savedir, 'master_index.db')
+        root = os.path.join(root or Edgar.edgar_url, 'edgar')
+        con = Edgar._connect_index(index)
+        done = {row[0] for row in con.execute("SELECT source FROM sources")}
+
+        today = int(time.strftime('%Y%m%d'))
+        now = (today // 10000, (((today // 100) % 100) + 2) // 3)
+        if not years:
+            years = range(1993, now[0] + 1)
+        elif isinstance(years, int):
+            years = [years]
+        session = requests_session(pool=workers)
+        limiter = RateLimiter(rate=rate)
+        sources = []
+        for year in years:
+            for quarter in range(1, 5):
+                if (year, quarter) < now:
+                    source = f"full-index/{year}/QTR{quarter}/master.idx"
+                    if source not in done:
+                        sources.append(source)
+                elif (year, quarter) == now:  # list daily indexes of quarter
+                    folder = f"daily-index/{year}/QTR{quarter}/"
+                    r = requests_get(os.path.join(root, folder, 'index.json'),
+                                     delay=0, session=session,
+                                     limiter=limiter, verbose=self.verbose)
+                    nodes = ([] if r is None else
+                             json.loads(r.content)['directory']['item'])
+                    dates = {}   # prefer uncompressed file of each date
+                    for node in sorted((node['name'] for node in nodes),
+                                       reverse=True):
+                        match = re.match(r'master\.(\d+)\.idx(\.gz)?$', node)
+                        if match:
+                            dates[_index_date(int(match.group(1)))] = node
+                    sources.extend(folder + node for node in dates.values()
+                                   if folder + node not in done)
+        self._print(f"(update_index) {len(sources)} index files to fetch")
+
+        logger = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(Edgar.read_index,
+                                   os.path.join(root, source),
+                                   session=session,
+                                   limiter=limiter,
+                                   verbose=0): source for source in sources}
+            for future in concurrent.futures.as_completed(futures):
+                source = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    self._print("*** (update_index) failed", source, e)
+                    df = None
+                if df is None:
+                    logger.append({'source': source, 'rows': None})
+                    continue
+                df['accession'] = df['pathname'].str.split('/').str[-1]\
+                                                .str.split('.').str[0]
+                con.executemany("INSERT OR REPLACE INTO filings VALUES"
+                                " (?, ?, ?, ?, ?, ?)",
+                                df[['accession', 'cik', 'name', 'form',
+                                    'date', 'pathname']]\
+                                .itertuples(index=False, name=None))
+                con.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                            (source, len(df), time.time()))
+                con.commit()
+                logger.append({'source': source, 'rows': len(df)})
+                self._print(f"(update_index) {len(df)} filings from {source}")
+        con.close()
+        session.close()
+        return DataFrame.from_records(logger, columns=['source', 'rows'])
+
+    def query_index(self, forms: str | List[str] = [], begdate: int = 0,
+                    enddate: int = 0, cik: int | List[int] = 0,
+                    index: str = '') -> DataFrame:
+        """Select filings from local index database
+
+        Args:
+            forms: Form type or types of filings, e.g. Edgar._forms['10-K']
+            begdate: Earliest date of filings, inclusive
+            enddate: Latest date of filings, inclusive
+            cik: CIK or list of CIKs of filers
+            index: Name of index database, default ~master_index.db
+
+        Returns:
+            DataFrame of cik, name, form, date, pathname and accession of
+            filings, sorted by date
+
+        Examples:
+
+        >>> ed.update_index(years=2022)
+        >>> files = ed.query_index(forms=Edgar._forms['10-K'],
+        ...                        begdate=20220101, enddate=20220331)
+        >>> ed.download(files)
+        """
+        index = index or os.path.join(self.savedir, 'master_index.db')
+        where, params = [], []
+        if forms:
+            forms = [forms] if isinstance(forms, str) else list(forms)
+            where.append(f"form IN ({', '.join('?' * len(forms))})")
+            params.extend(forms)
+        if begdate:
+            where.append("date >= ?")
+            params.append(int(begdate))
+        if enddate:
+            where.append("date <= ?")
+            params.append(int(enddate))
+        if cik:
+            ciks = [int(c) for c in ([cik] if isinstance(cik, int) else cik)]
+            where.append(f"cik IN ({', '.join('?' * len(ciks))})")
+            params.extend(ciks)
+        con = Edgar._connect_index(index)
+        try:
+            return pd.read_sql_query("SELECT cik, name, form, date, pathname,"
+                                     " accession FROM filings"
+                                     + (" WHERE " + " AND ".join(where)
+                                        if where else "")
+                                     + " ORDER BY date, accession",
+                                     con, params=params)
+        finally:
+            con.close()
+
+    @staticmethod
+    def _connect_index(index: str) -> sqlite3.Connection:
+        """Helper to open local index database, creating tables if new"""
+        os.makedirs(os.path.dirname(index) or '.', exist_ok=True)
+        con = sqlite3.connect(index)
+        con.execute("CREATE TABLE IF NOT EXISTS filings ("
+                    " accession TEXT, cik INTEGER, name TEXT, form TEXT,"
+                    " date INTEGER, pathname TEXT,"
+                    " PRIMARY KEY (accession, cik))")
+        con.execute("CREATE TABLE IF NOT EXISTS sources ("
+                    " source TEXT PRIMARY KEY, rows INTEGER, updated REAL)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_form_date"
+                    " ON filings (form, date)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_cik_date"
+                    " ON filings (cik, date)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_date ON filings (date)")
+        return con
     
     @staticmethod
     def fetch_detail(pathname: str, root: str = '',
+                     session: requests.Session | None = None,
+                     limiter: RateLimiter | None = None,
                      verbose: int = _VERBOSE) -> bytes:
         """Fetch from HTML filename, containing table of document hyperlinks
         
         Args:
             pathname: Relative pathname to fetch
             root: Root prefix of url
+            session: Session to reuse connections from
+            limiter: Token bucket to limit rate of requests, instead of delay
         """
         url = os.path.join(root or Edgar.edgar_url,
                            Edgar.parse_pathname(pathname)['indexname'])
-        r = requests_get(url, delay=.1, verbose=verbose)
+        r = requests_get(url, delay=0 if limiter else .1, session=session,
+                         limiter=limiter, verbose=verbose)
         return b'' if r is None else r.content
 
     @staticmethod
     def fetch_filing(pathname: str, root: str = '', form: str = '',
-                     features: str = 'lxml', verbose: int = _VERBOSE) -> str:
+                     features: str = 'lxml', fast: bool = True,
+                     session: requests.Session | None = None,
+                     limiter: RateLimiter | None = None,
+                     verbose: int = _VERBOSE) -> str:
         """Fetch and parse filing text from url pathname or local html file
 
         Args:
@@ -228,6 +772,9 @@ class Edgar:
             root: Root prefix of url or local directory
             features: Parser to use e.g. lxml, lxml-xml, html.parser
             form: Additional parsing to remove preamble for form='8-K'
+            fast: If True, extract text with html_to_text, else BeautifulSoup
+            session: Session to reuse connections from
+            limiter: Token bucket to limit rate of requests, instead of delay
 
         Returns:
             Text of body, parsed per Loughran and McDonald "Stage One"
@@ -239,7 +786,9 @@ class Edgar:
             root = ''
         if root.startswith('http'):
             r = requests_get(os.path.join(root, pathname),
-                             delay=0.1,
+                             delay=0 if limiter else 0.1,
+                             session=session,
+                             limiter=limiter,
                              verbose=verbose)
             if r is None:
                 return ''
@@ -250,30 +799,35 @@ class Edgar:
             if not r:
                 return ''
 
-        soup = BeautifulSoup(r, features=features) #lxml-xml lxml html.parser
-        _print('soup: %d' % len(soup.text), verbose=verbose)
-
-        # remove inline xbrl's
-        for x in [re.compile("ix:\S*", re.I), re.compile("xbrli:\S*", re.I)]:
-            tags = soup.find_all(x)    # regex format for soup.find_all
-            for tag in tags: tag.decompose()
-
-        # remove tables, where #alphas is less than 90% of digits+alphas
-        tags = soup.find_all(['table'])
-        for tag in tags:
-            s = tag.get_text()
-            numalpha = sum(c.isalpha() for c in s)
-            numdigit = sum(c.isdigit() for c in s)
-            hasitem = re.search('item.[.]?[.]?7', s, re.IGNORECASE)
-            if not hasitem and numalpha < 0.9*(numdigit+numalpha):
-                tag.decompose()
-
-        for tags in ['u','b','i']:
-            for tag in soup.findAll(tags):
-                tag.replace_with_children()
-
-        text = soup.get_text('\n')
-        _print('table: %d %d' % (len(tags), len(text)), verbose=verbose)
+        if fast:
+            text = Edgar.html_to_text(r)
+            _print('html: %d' % len(text), verbose=verbose)
+        else:
+            soup = BeautifulSoup(r, features=features) #lxml-xml html.parser
+            _print('soup: %d' % len(soup.text), verbose=verbose)
+
+            # remove inline xbrl's
+            for x in [re.compile("ix:\S*", re.I),
+                      re.compile("xbrli:\S*", re.I)]:
+                tags = soup.find_all(x)    # regex format for soup.find_all
+                for tag in tags: tag.decompose()
+
+            # remove tables, where #alphas is less than 90% of digits+alphas
+            tags = soup.find_all(['table'])
+            for tag in tags:
+                s = tag.get_text()
+                numalpha = sum(c.isalpha() for c in s)
+                numdigit = sum(c.isdigit() for c in s)
+                hasitem = re.search('item.[.]?[.]?7', s, re.IGNORECASE)
+                if not hasitem and numalpha < 0.9*(numdigit+numalpha):
+                    tag.decompose()
+
+            for tags in ['u','b','i']:
+                for tag in soup.findAll(tags):
+                    tag.replace_with_children()
+
+            text = soup.get_text('\n')
+            _print('table: %d %d' % (len(tags), len(text)), verbose=verbose)
 
         if form in Edgar._forms['8-K']:
             x = re.search('emerging growth company[\w\W]*? of the Exchange Act',
@@ -285,15 +839,173 @@ class Edgar:
         # clean-up line breaks
         text = unicodedata.normalize("NFKD", text)  # Normalize
         text = '\n'.join(text.splitlines())
-        text = re.sub(r'[ ]+\n', '\n', text)
-        text = re.sub(r'\n[ ]+', '\n', text)
-        text = re.sub(r'\n+', '\n', text)
+        text = re.sub(r'[ ]*\n[ \n]*', '\n', text)  # strip spaces, blank lines
 
         # Completed Stage One
         _print('normalize: %d' % len(text), verbose=verbose)
         return text
 
 
+    @staticmethod
+    def html_to_text(html: bytes) -> str:
+        """Extract text from html in one pass, per Loughran-McDonald rules
+
+        Args:
+            html: Raw contents of html file
+
+        Returns:
+            Text strings of document joined by newlines, before clean-up
+
+        Notes:
+
+        - equivalent to text from BeautifulSoup in fetch_filing, but walks
+          the lxml element tree once without building a soup
+        - drops inline xbrl tags (ix:..., xbrli:...) with their contents
+        - drops tables where #alphas is less than 90% of digits+alphas,
+          unless they contain an item 7 heading
+        - skips comments and strings in script, style and template tags
+        - decodes before parsing, so that invalid bytes are replaced rather
+          than cut off the parse: with its byte-order mark or declared
+          encoding if any, else with the encoding guessed by UnicodeDammit
+        """
+        if not html:
+            return ''
+        data, encoding = EncodingDetector.strip_byte_order_mark(html)
+        encoding = encoding or EncodingDetector.find_declared_encoding(
+            data, is_html=True)
+        try:
+            markup = data.decode(encoding, errors='replace') if encoding else ''
+        except LookupError:
+            markup = ''
+        if not markup:
+            markup = UnicodeDammit(data, is_html=True).unicode_markup or ''
+        parser = etree.HTMLParser(encoding='utf-8', recover=True)
+        try:    # parse as utf-8 bytes, which may have an xml declaration
+            root = etree.fromstring(markup.encode('utf-8', errors='replace'),
+                                    parser)
+        except etree.ParserError:
+            return ''
+        if root is None:
+            return ''
+
+        xbrl = re.compile("ix:\\S*|xbrli:\\S*", re.I)
+        skip = {'script', 'style', 'template', 'rt', 'rp'}
+        strings = []     # all text strings in document order
+        tables = []      # (start, end) string positions of tables to drop
+        stack = [(root, False)]
+        while stack:     # iterative pre-order walk, end markers for tables
+            el, is_end = stack.pop()
+            if is_end:   # end of table: count its text and decide
+                start = el
+                s = "".join(strings[start:])
+                if s.isascii():
+                    chars = np.frombuffer(s.encode('ascii'), dtype=np.uint8)
+                    upper = chars & 0xDF
+                    numalpha = int(np.sum((upper >= 65) & (upper <= 90)))
+                    numdigit = int(np.sum((chars >= 48) & (chars <= 57)))
+                else:
+                    numalpha = sum(c.isalpha() for c in s)
+                    numdigit = sum(c.isdigit() for c in s)
+                hasitem = re.search('item.[.]?[.]?7', s, re.IGNORECASE)
+                if not hasitem and numalpha < 0.9*(numdigit+numalpha):
+                    tables.append((start, len(strings)))
+                continue
+            if isinstance(el, str):   # tail string of element
+                strings.append(el)
+                continue
+            if el.tail and el is not root:
+                stack.append((el.tail, False))
+            tag = el.tag if isinstance(el.tag, str) else ''
+            if not tag or xbrl.search(tag):  # comment, pi, or inline xbrl
+                continue
+            if tag == 'table':            # table text starts at this string
+                stack.append((len(strings), True))
+            if el.text and tag not in skip:
+                strings.append(el.text)
+            if tag in skip:
+                children = []
+            else:
+                children = list(el)
+            for child in reversed(children):
+                stack.append((child, False))
+        for start, end in tables:
+            strings[start:end] = [None] * (end - start)
+        return '\n'.join(s for s in strings if s is not None)
+
+    @staticmethod
+    def parse_detail(detail: bytes | str) -> List[Tuple[int, str, str, int]]:
+        """Parse document table of a filing detail page with lxml XPath
+
+        Args:
+            detail: Text of detail file
+
+        Returns:
+            List of (sequence, type, filename, size) of documents in filing,
+            with sequence and size 0 if blank
+
+        Notes:
+
+        - columns are located by their header cells, e.g. Seq, Document,
+          Type and Size, in each table of the page
+        - filename is the text of the document's hyperlink, else the first
+          word of its cell, e.g. without an appended 'iXBRL' label
+        """
+        if not detail:
+            return []
+        if isinstance(detail, str):
+            detail = detail.encode('utf-8')
+        root = etree.fromstring(detail, etree.HTMLParser())
+        if root is None:
+            return []
+        records = []
+        for table in root.iter('table'):
+            rows = table.xpath('.//tr')
+            if not rows:
+                continue
+            header = [h.xpath('string()').strip().lower()
+                      for h in rows[0].xpath('./th|./td')]
+            col = {}
+            for key in ['seq', 'document', 'type', 'size']:
+                col[key] = next((i for i, h in enumerate(header)
+                                 if h.startswith(key)), -1)
+            if col['document'] < 0:
+                continue
+            for row in rows[1:]:
+                cells = row.xpath('./td')
+                if len(cells) <= col['document']:
+                    continue
+                text = ['' if i < 0 or i >= len(cells)
+                        else cells[i].xpath('string()').strip()
+                        for i in col.values()]
+                link = cells[col['document']].xpath('.//a/text()')
+                filename = (link[0].strip() if link
+                            else (text[1].split() or [''])[0])
+                if filename:
+                    records.append((int(text[0]) if text[0].isdigit() else 0,
+                                    text[2],
+                                    filename,
+                                    int(text[3]) if text[3].isdigit() else 0))
+        return records
+
+    @staticmethod
+    def parse_details(details: Dict[str, bytes] | List[bytes]) -> DataFrame:
+        """Parse document tables of a batch of filing detail pages
+
+        Args:
+            details: Text of detail files, keyed by e.g. pathname, or list
+
+        Returns:
+            DataFrame of page (key or position), seq, type, filename and size
+            of documents, for all pages in batch
+        """
+        if not isinstance(details, dict):
+            details = dict(enumerate(details))
+        records = [(page,) + record
+                   for page, detail in details.items()
+                   for record in Edgar.parse_detail(detail)]
+        return DataFrame.from_records(records, columns=['page', 'seq', 'type',
+                                                        'filename', 'size'])
+
     @staticmethod
     def extract_filenames(detail: str, verbose: int = _VERBOSE) -> List[str]:
         """Extract ordered list of .htm and .txt filenames from filing detail
@@ -302,33 +1014,19 @@ class Edgar:
             detail: Text of detail file
 
         Returns:
-            List of html filenames found in the detail file
+            List of html filenames found in the detail file, starting with
+            the first document whose type is a form, as likely primary
         """
-        dflist = pd.read_html(detail)
-        jdf = -1
-        jrow = -1
-        jcol = -1
-        html_name = ''
-        html_all = []
-        forms = np.ravel(Edgar._forms.values())
-        for idf in range(len(dflist)):
-            for irow in range(len(dflist[idf].index)):
-                for icol in range(len(dflist[idf].columns)):
-                    if jdf < 0 and dflist[idf].iloc[irow, icol] in forms:
-                        jdf, jrow, jcol = idf, irow, icol  # likely row of form
-                for icol in range(len(dflist[idf].columns)):
-                    if (".htm" in str(dflist[idf].iloc[irow, icol]).lower() 
-                        or ".txt" in str(dflist[idf].iloc[irow, icol]).lower()):
-                        for s in str(dflist[idf].iloc[irow, icol]).split():
-                            if '.htm' in s.lower() or '.txt' in s.lower():
-                                name = s
-                        if jdf == idf and jrow == irow:
-                            html_name = name
-                        else:
-                            html_all += [name]
-        _print(f"(extract_filenames) [{jdf} {jrow} {jcol}] {html_all}",
-                   verbose=verbose)
-        return [html_name] + html_all if html_name else html_all
+        forms = {f for v in Edgar._forms.values() for f in v}
+        names = [(doctype, filename)
+                 for _, doctype, filename, _ in Edgar.parse_detail(detail)
+                 if '.htm' in filename.lower() or '.txt' in filename.lower()]
+        primary = next((i for i, (doctype, _) in enumerate(names)
+                        if doctype in forms), -1)
+        html_all = [filename for i, (_, filename) in enumerate(names)
+                    if i != primary]
+        _print(f"(extract_filenames) [{primary}] {html_all}", verbose=verbose)
+        return ([names[primary][1]] if primary >= 0 else []) + html_all
 
 
     @staticmethod
@@ -364,53 +1062,30 @@ class Edgar:
         - Item 1A. Risk Factors.
         - Item 2. Unregistered Sales of Equity Securities and Use of Proceeds.
         """
+        return Edgar.extract_sections(text, [item])[item]
 
-        def parse_helper(text, marker, start=0):
-            """Helper to find all potential items"""
-            # e.g. INTC uses text titles, not  "ITEM", in their 10K:
-            #  "DISCUSSION AND ANALYSIS"
-            # '\nQUANTITATIVE AND QUALITATIVE DISCLOSURE']
-            # Management&#146;s Discussion and Analysis
-
-            mda = ""
-            end = 0
-
-            # Define start and end sentinels for parsing
-            item_beg = marker['item_beg'].copy()
-            item_end = marker['item_end'].copy()
-            if start != 0:
-                next_beg = marker['next_beg'].copy() # if ITEM 7A does not exist
-            else:
-                next_beg = []             # this may helps exception
-            text = text[start:]
-
-            for item7 in item_beg:   # try to find begin
-                begin = item7.search(text)
-                begin = begin.start() if begin else -1
-                _print('item begin?', item7, begin)
-                if begin != -1:
-                    break
-            if begin != -1:          # found begin
-                for item7A in item_end:
-                    end = item7A.search(text, pos=begin + 1)
-                    end = end.start() if end else -1
-                    _print('item end?', item7A, end)
-                    if end != -1:
-                        break
-                if end == -1:        # ITEM 7A end does not exist
-                    for item8 in next_beg:    # often get exception undefined
-                        end = item8.search(text, pos=begin + 1)
-                        end = end.start() if end else -1
-                        _print('next begin?', item8, end)
-                        if end != -1:
-                            break
-                if end > begin:       # extract this found item
-                    mda = text[begin:end].strip()
-                else:
-                    end = 0
-            _print(f"(parse_helper) {len(mda)}, {end}/{len(text)}")
-            return mda, end
+    @staticmethod
+    def extract_sections(text: str, items: List[str]) -> Dict[str, str]:
+        """Extract several items from input text with one scan of headings
+
+        Args:
+            text: Full text of filing, from which to extract passages
+            items: List of items to extract, in {'mda10K', 'bus10K', 'mda10Q'}
 
+        Returns:
+            Dict of extracted passage, or empty string, keyed by item
+
+        Notes:
+
+        - item and part headings, and the title phrases used when a filing
+          has no item headings, are tokenized by one compiled regex
+        - each requested item is a segment from a begin token to the first
+          following end token, else the next part or item heading token
+        - a heading followed by another heading with the same key before
+          its end is a table of contents entry or cross-reference: skipped
+        - when a begin token occurs several times, the longest segment
+          is kept, which discards remaining table of contents entries
+        """
         # clean-up for item headers
         text = text.upper()
         text = text.replace('\n.\n', '.\n')
@@ -422,56 +1097,46 @@ class Edgar:
         text = text.replace('\n%', '%')
         text = text.replace('\n', '\n\n')
 
-        markers = {    # secret sauce: plausible regex separating the sections
-            'mda10K': {
-                'item_beg': [
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?7[^a-z]+', re.I),
-                    re.compile('DISCUSSION AND ANALYSIS', re.I)],
-                'item_end': [
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?7A', re.I),
-                    re.compile('\n\s*?QUANTITATIVE AND QUALITATIVE DIS', re.I)],
-                'next_beg': [re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?8', re.I)]},
-            'bus10K': {
-                'item_beg': [
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?1[^\w]+', re.I),
-                    re.compile('\n\s*?P\s?A\s?R\s?T.?\s*?I[^\w]+', re.I),
-                    re.compile('\n\s*?P\s?A\s?R\s?T.?\s*?1[^\w]+', re.I),
-                    re.compile('\n\s*?BUSINESS.?\n', re.I),
-                    re.compile('SUMMARY OF BUSINESS\.?\n', re.I),
-                    re.compile('DESCRIPTION OF BUSINESS\.?\n', re.I),
-                    re.compile('BUSINESS SUMMARY\.?\n', re.I)],
-                'item_end': [
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?1A', re.I),
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?1B', re.I),
-                    re.compile('UNRESOLVED STAFF COMMENTS.?\s*?\n', re.I)],
-                'next_beg' : [
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?2[^0-9]+', re.I)]},
-            'mda10Q': {
-                'item_beg': [
-                    re.compile('DISCUSSION AND ANALYSIS', re.I),
-                    re.compile('\n\s*?P\s?A\s?R\s?T.?\s*?I[^\w]+', re.I),
-                    re.compile('\n\s*?P\s?A\s?R\s?T.?\s*?1[^\w]+', re.I)],
-                'item_end': [
-                    re.compile('\n\s*?I\s?T\s?E\s?M.?\s*?3', re.I),
-                    re.compile('CONTROLS AND PROCEDURES', re.I),
-                    re.compile('\n\s*?QUANTITATIVE AND QUALITATIVE DIS', re.I)],
-                'next_beg': [
-                    re.compile('\n\s*?P\s?A\s?R\s?T.?\s*?II[^\w]+', re.I),
-                    re.compile('\n\s*?P\s?A\s?R\s?T.?\s*?2[^\w]+', re.I)]}}
-        
-        start=0      # get first passage
-        mda, end = parse_helper(text, markers[item], start=start)
-        if not mda:
-            start = 1
-            mda, end = parse_helper(text, markers[item], start=start)
-
-        best = mda   # return longest passage
-        while mda and end > 0:
-            start += end
-            mda, end = parse_helper(text, markers[item], start=start)
-            if mda and len(mda.encode('utf-8')) > len(best):
-                best = mda
-        return best
+        # segment map: sorted positions of each heading token
+        tokens = {}
+        for match in Edgar._headings.finditer(text):
+            key = match.lastgroup
+            if key in ['item', 'part']:
+                key += Edgar._roman.get(match[key], match[key])
+            key = key.upper()
+            tokens.setdefault(key, []).append(match.start())
+
+        def first_after(keys, pos):
+            """Helper to find position of first token after pos"""
+            for key in keys:   # in order of priority
+                positions = tokens.get(key, [])
+                i = bisect.bisect_right(positions, pos)
+                if i < len(positions):
+                    return positions[i]
+            return -1
+
+        sections = {}
+        for item in items:
+            item_beg, item_end, next_beg = Edgar._sections[item]
+            best = ''
+            for key in item_beg:   # try to find begin
+                positions = tokens.get(key, [])
+                for i, begin in enumerate(positions):
+                    end = first_after(item_end, begin)
+                    if end < 0:      # item end does not exist
+                        end = first_after(next_beg, begin)
+                    if end < 0 or (key[:4] in ['ITEM', 'PART']
+                                   and i + 1 < len(positions)
+                                   and positions[i + 1] < end):
+                        continue
+                    passage = text[begin:end].strip()
+                    if len(passage) > len(best):   # keep longest passage
+                        best = passage
+                if best:
+                    break
+            _print(f"(extract_sections) {item} {len(best)}/{len(text)}")
+            sections[item] = best
+        return sections
 
 
     #############################
@@ -480,12 +1145,18 @@ class Edgar:
     #
     #############################
     @staticmethod
-    def get_detail_filings(pathname: str, form: str = '') -> Tuple[bytes, str]:
+    def get_detail_filings(pathname: str, form: str = '', root: str = '',
+                           session: requests.Session | None = None,
+                           limiter: RateLimiter | None = None,
+                           verbose: int = _VERBOSE) -> Tuple[bytes, str]:
         """Fetch detail and concatenated filings given edgar pathname
 
         Args:
             pathname: Edgar pathname of filing
             form: Special parsing to exclude preamble if form in '8-K'
+            root: Root prefix of url, default Edgar website
+            session: Session to reuse connections from
+            limiter: Token bucket to limit rate of requests, instead of delay
 
         Returns:
             Tuple of detail and concatenated filings text
@@ -499,20 +1170,22 @@ class Edgar:
         """
 
         # Get detail page
+        get = dict(root=root, session=session, limiter=limiter,
+                   verbose=verbose)
         detail, lines = b'', ''
-        detail = Edgar.fetch_detail(pathname=pathname)
+        detail = Edgar.fetch_detail(pathname=pathname, **get)
         if detail:   # filing detail page missing!
-            filenames = Edgar.extract_filenames(detail)  # retrieve filings
+            filenames = Edgar.extract_filenames(detail, verbose=verbose)
             if form in Edgar._forms['8-K'] and ".htm" in filenames[0]:
                 filenames = [Edgar.parse_pathname(pathname, f)
                              for f in filenames if ".htm" in f]
-                lines = "\n".join([Edgar.fetch_filing(f, form=form)
+                lines = "\n".join([Edgar.fetch_filing(f, form=form, **get)
                                    for f in filenames])
             else:
                 filename = Edgar.parse_pathname(pathname, filenames[0])
-                lines = Edgar.fetch_filing(filename, form=form)
+                lines = Edgar.fetch_filing(filename, form=form, **get)
             if not lines:
-                lines = Edgar.fetch_filing(pathname, form=form)
+                lines = Edgar.fetch_filing(pathname, form=form, **get)
         else:
             pass
             _print("***MISSING DETAIL***", pathname)
@@ -544,6 +1217,13 @@ class Edgar:
                         str(date // 10000) if date else '',
                         str(date) if date else '')
        os.makedirs(s, exist_ok=True)    # make directory if not exist
+
+       # remove stale manifest of folder archive, rebuilt when next opened
+       manifest = os.path.normpath(os.path.join(
+           self.savedir, form, str(item),
+           str(date // 10000) if date else '')) + '.manifest.db'
+       if os.path.exists(manifest):
+           os.remove(manifest)
        return s        
 
     def to_localname(self, date: int, form: str, cik: str, pathname: str,
@@ -638,6 +1318,115 @@ class Edgar:
         return s
             
 
+    def download(self, filings: Dict | List[Dict] | DataFrame = [],
+                 forms: List[str] = [],
+                 queue: str = '', root: str = '', workers: int = 10,
+                 rate: float = 10., retry: int = 3) -> DataFrame:
+        """Download and save filings and details with concurrent requests
+
+        Args:
+            filings: Filings meta data, e.g. from query_index, to enqueue
+            forms: Form types to enqueue, e.g. ['10-K'], default all
+            queue: Name of download queue, default ~download_queue.db
+            root: Root prefix of url, default Edgar website
+            workers: Number of threads requesting concurrently
+            rate: Maximum number of requests per second, across threads
+            retry: Number of times a failed or missing filing is retried
+
+        Returns:
+            DataFrame of filings processed in this run, with status
+
+        Notes:
+
+        - https://www.sec.gov/os/accessing-edgar-data: current max request
+          rate is 10 requests/second
+        - filings are enqueued in an SQLite table keyed by accession number,
+          and marked 'done', 'missing' (detail page not found) or 'failed'
+          as each completes, so that a restarted download resumes with the
+          pending and retryable filings
+        - threads share one session and token bucket, while details and
+          filings are saved and the queue is updated in this thread
+        """
+        queue = queue or os.path.join(self.savedir, 'download_queue.db')
+        os.makedirs(os.path.dirname(queue) or '.', exist_ok=True)
+        con = sqlite3.connect(queue)
+        con.execute("CREATE TABLE IF NOT EXISTS queue ("
+                    " accession TEXT PRIMARY KEY, pathname TEXT, cik INTEGER,"
+                    " form TEXT, date INTEGER, status TEXT, tries INTEGER,"
+                    " updated REAL)")
+        if isinstance(filings, DataFrame):
+            filings = filings.to_dict('records')
+        elif isinstance(filings, dict):
+            filings = list(filings.values())
+        con.executemany("INSERT OR IGNORE INTO queue VALUES"
+                        " (?, ?, ?, ?, ?, 'pending', 0, 0)",
+                        [(os.path.basename(r['pathname']).split('.')[0],
+                          r['pathname'], int(r['cik']), r['form'],
+                          int(r['date']))
+                         for r in filings if not forms or r['form'] in forms])
+        con.commit()
+        pending = pd.read_sql_query("SELECT * FROM queue WHERE status ="
+                                    " 'pending' OR (status != 'done' AND"
+                                    " tries < ?) ORDER BY date, accession",
+                                    con, params=[retry])\
+                    .to_dict('records')
+        self._print(f"(download) {len(pending)} filings pending")
+
+        session = requests_session(pool=workers)
+        limiter = RateLimiter(rate=rate)
+        logger = []
+        tic = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = iter(pending)
+            running = {}
+            while True:
+                for row in rows:   # keep a bounded number of requests queued
+                    running[pool.submit(Edgar.get_detail_filings,
+                                        row['pathname'],
+                                        form=row['form'],
+                                        root=root,
+                                        session=session,
+                                        limiter=limiter,
+                                        verbose=0)] = row
+                    if len(running) >= 4 * workers:
+                        break
+                if not running:
+                    break
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    row = running.pop(future)
+                    try:
+                        detail, filing = future.result()
+                        if detail:
+                            self.save_detail(text=detail, **row)
+                            self.save_filing(text=filing, **row)
+                            row['status'] = 'done'
+                        else:
+                            row['status'] = 'missing'
+                    except Exception as e:
+                        self._print("*** (download) failed",
+                                    row['pathname'], e)
+                        row['status'] = 'failed'
+                    row['tries'] += 1
+                    row['updated'] = time.time()
+                    con.execute("UPDATE queue SET status = ?, tries = ?,"
+                                " updated = ? WHERE accession = ?",
+                                (row['status'], row['tries'], row['updated'],
+                                 row['accession']))
+                    con.commit()
+                    logger.append(row)
+                    if len(logger) % 100 == 0:
+                        secs = time.time() - tic
+                        self._print(f"(download) {len(logger)}/{len(pending)}"
+                                    f" filings {len(logger)/secs:.1f} and"
+                                    f" requests {limiter.count/secs:.1f}"
+                                    " per sec")
+        con.close()
+        session.close()
+        return DataFrame.from_records(logger)
+
+
     ###################################
     #
     # Read Locally
@@ -659,15 +1448,22 @@ class Edgar:
         if self.verbose:
             print(*args, **kwargs)
         
-    def open(self, form: str = '', item: str = '', date: int = 0, 
-             permno: int = 0) -> List:
+    def open(self, form: str = '', item: str = '', date: int = 0,
+             permno: int | List[int] = 0, cik: int | List[int] = 0,
+             forms: List[str] = [], begdate: int = 0, enddate: int = 0,
+             refresh: bool = False) -> List:
         """Opens local (zipped or folder) archive and return list of documents
-        
+
         Args:
-            date: Year or daily date 
+            date: Year or daily date
             item: Item in {'mda10K, 'detail', 'bus10K'}
-            form: Filing type in {'10-K', '10-Q', '
-            permno: Identifier of security to retrieve
+            form: Filing type in {'10-K', '10-Q', '8-K'}
+            permno: Identifier, or list of identifiers, of securities
+            cik: Identifier, or list of identifiers, of filers
+            forms: List of form types of filings to select, e.g. ['10-K']
+            begdate: Select filings dated on or after this date
+            enddate: Select filings dated on or before this date
+            refresh: Whether to rebuild the archive's manifest
 
         Returns:
             List filenames in selected archive
@@ -702,17 +1498,11 @@ class Edgar:
           - 10-K/bus10K.zip contains extracted Business Description sections
           - 8-K/2021.zip contains the year's 8-K filings
           - 8-K/detail/2021.zip contains the index details of those 8-K's
-        """
-        
-        def parse_pathname(pathname):
-            """Helper to deconstruct components from archive file name"""
-            items = pathname.split('_')         # components separated by '_'
-            items[0] = items[0].split('/')[-1]  # split last substring on '/'
-            return {'cik': int(items[4]),
-                    'form': items[1].replace('-A', '/A'), # cannot have '/'
-                    'date': int(items[0]),
-                    'pathname': pathname}
 
+        - documents are listed and selected from the archive's manifest
+          (see build_manifest), which is rebuilt only when missing, when a
+          zipped archive has been modified, or when refresh is True
+        """
         self.close()   # only one archive open at a time per instance
 
         date = str(date) if date else ''
@@ -720,64 +1510,115 @@ class Edgar:
         for node in [form, item, date[:4]]:
             if node:
                 localpath = os.path.join(localpath, node)
-
-        if self.zipped:  # if zipped archive, have to retrieve its namelist()
+        if self.zipped:
             localpath = localpath + '.zip'
-            recs = []
-            with zipfile.ZipFile(localpath) as archive:
-                for pathname in archive.namelist():
-                    if pathname.endswith('/'):
-                        self._print(pathname)
-                    else:
-                        recs.append(parse_pathname(pathname=pathname))
-            df = DataFrame(recs).drop_duplicates(['pathname',
-                                                  'date',
-                                                  'form',
-                                                  'cik'])
-            if item and form and form not in self._forms['8-K']:
-                t = DataFrame.from_dict(df['pathname'].str.split('/').to_dict(),
-                                        orient='index')
-                if permno:  # select by permno
-                    df = df[t.iloc[:,1]==str(permno)].assign(permno=permno)
-                else:       # select all, so explicitly assign permno col
-                    df['permno'] = t.iloc[:,1].astype(int).values
-            self.keys_ = df.to_dict('records')
+        permnos = bool(item and form and form not in self._forms['8-K'])
+
+        manifest = localpath + '.manifest.db'
+        if (refresh or not os.path.exists(manifest) or
+            (self.zipped and
+             os.path.getmtime(localpath) > os.path.getmtime(manifest))):
+            self.build_manifest(localpath, permnos=permnos)
+
+        where, params = [], []   # select documents by predicates
+        if len(date) > 4:        # date is specific 8-digit date
+            where.append('date = ?')
+            params.append(int(date))
+        if begdate:
+            where.append('date >= ?')
+            params.append(int(begdate))
+        if enddate:
+            where.append('date <= ?')
+            params.append(int(enddate))
+        for col, values in [('form', forms), ('cik', cik), ('permno', permno)]:
+            if isinstance(values, (int, np.integer, str)):
+                values = [values] if values else []
+            if len(values):      # set of values is passed as a json array
+                where.append(f"{col} IN (SELECT value FROM json_each(?))")
+                params.append(json.dumps([v if isinstance(v, str) else int(v)
+                                          for v in values]))
+        query = "SELECT * FROM manifest"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        con = sqlite3.connect(manifest)
+        try:
+            df = pd.read_sql_query(query, con, params=params)
+        finally:
+            con.close()
+
+        keys = ['cik', 'form', 'date', 'pathname'] + ['permno'] * permnos
+        self.keys_ = df[keys].to_dict('records')
+        if self.zipped:   # read members by offset, not central directory
+            self.members_ = dict(zip(df['pathname'],
+                                     df[['offset', 'size', 'crc', 'method']]\
+                                     .itertuples(index=False, name=None)))
             self.zipped = localpath
-            self.archive = zipfile.ZipFile(localpath)
-            
-        else:   # else list files in folder
-            def list_dir(*args):
-                """helper to list potential document filenames in folder"""
-                r = []
-                for a in glob.glob(os.path.join(*args, '*')):
-                    a = a.replace(self.savedir, '')
-                    r.append({'pathname': a} if '_' not in a else 
-                             parse_pathname(pathname=a))
-                return r
-
-            if date:
-                if len(date) < 5:    # 4) date is year => not leaf
-                    dates = glob.glob(os.path.join(localpath, date + '[01]???'))
-                    df = pd.concat([DataFrame(list_dir(r)) for r in dates],
-                                   ignore_index=True)
-                else:                # 5) date is specific 8-digit date => leaf
-                    q = glob.glob(os.path.join(localpath, date))
-                    df = pd.concat([DataFrame(list_dir(r)) for r in q],
-                                   ignore_index=True)                
-            else:
-                if permno:   # select by permno
-                    q = glob.glob(os.path.join(localpath, str(permno)))
-                    df = pd.concat([DataFrame(list_dir(r)) for r in q],
-                                   ignore_index=True)               
-                else:        # select all permnos
-                    q = glob.glob(os.path.join(localpath, '[0-9]????'))
-                    df = pd.concat([DataFrame(list_dir(r))\
-                                    .assign(permno=int(r.split('/')[-1]))
-                                    for r in q], ignore_index=True)
-            self.keys_= df.to_dict('records')
+            self.manifest_ = manifest
+            self.archive = open(localpath, 'rb')
+        else:
             self.archive = localpath
         return self.keys_
 
+    def build_manifest(self, localpath: str,
+                       permnos: bool = False) -> DataFrame:
+        """Build and persist the manifest of documents in a local archive
+
+        Args:
+            localpath: Path name of zipped archive or folder
+            permnos: Whether archive is of items stored in permno folders
+
+        Returns:
+            DataFrame of pathname, cik, form, date, permno, and member offset,
+            compressed size, CRC and compression method if zipped
+
+        Notes:
+
+        - the manifest is saved in an SQLite database file with name
+          suffixed by '.manifest.db', with one row per document, indexed by
+          pathname, date, cik and permno
+        - a zipped archive's central directory is read only to build its
+          manifest; a folder's manifest is removed when a document is
+          saved to the folder (see to_localdir)
+        """
+        columns = ['pathname', 'offset', 'size', 'file_size', 'crc', 'method']
+        if localpath.endswith('.zip'):
+            with zipfile.ZipFile(localpath) as archive:
+                df = DataFrame([(f.filename, f.header_offset, f.compress_size,
+                                 f.file_size, f.CRC, f.compress_type)
+                                for f in archive.infolist() if not f.is_dir()],
+                               columns=columns)
+        else:   # documents are in date or permno subfolders
+            names = glob.glob(os.path.join(localpath, '*', '*_*'))
+            df = DataFrame({'pathname': [name.replace(self.savedir, '')
+                                         for name in names],
+                            'size': [os.path.getsize(name) for name in names]})
+            df = df.reindex(columns=columns)
+        df = df.drop_duplicates('pathname', keep='last')   # last is current
+
+        # <localname> = YYYYMMDD_FORM__edgar_data_CIK_ADSH.txt
+        parts = df['pathname'].str.extract(
+            r'([^/_]+)_([^/_]+)_[^/_]+_[^/_]+_([^/_]+)[^/]*$')
+        df = df[parts.notna().all(axis=1)]
+        parts = parts[parts.notna().all(axis=1)]
+        df.insert(1, 'cik', parts[2].astype(int))
+        df.insert(2, 'form', parts[1].str.replace('-A', '/A')) # cannot have '/'
+        df.insert(3, 'date', parts[0].astype(int))
+        df.insert(4, 'permno', df['pathname'].str.split('/').str[-2]\
+                  .astype(int) if permnos else None)
+
+        manifest = localpath + '.manifest.db'
+        con = sqlite3.connect(manifest + '.tmp')
+        try:
+            df.to_sql('manifest', con, if_exists='replace', index=False)
+            for col in ['pathname', 'date', 'cik', 'permno']:
+                con.execute(f"CREATE INDEX idx_{col} ON manifest ({col})")
+            con.commit()
+        finally:
+            con.close()
+        os.replace(manifest + '.tmp', manifest)
+        self._print(f"(build_manifest) {len(df)} documents in {manifest}")
+        return df
+
     def close(self):
         """Close the archive"""
         try:
@@ -789,14 +1630,293 @@ class Edgar:
     def __getitem__(self, pathname):
         """Retrieves text of document file by pathname from archive"""
         if self.zipped:
-            with self.archive.open(pathname) as stream:
-                with io.TextIOWrapper(stream, encoding='latin-1') as infile:
-                    text = infile.read()
+            member = self.members_.get(pathname)
+            if member is None:   # not selected by open: look up full manifest
+                con = sqlite3.connect(self.manifest_)
+                try:
+                    member = con.execute(
+                        "SELECT offset, size, crc, method FROM manifest"
+                        " WHERE pathname = ?", (pathname,)).fetchone()
+                finally:
+                    con.close()
+                if member is None:
+                    raise KeyError(pathname)
+            data = _read_member(self.archive, *member)
+            with io.TextIOWrapper(io.BytesIO(data),
+                                  encoding='latin-1') as infile:
+                text = infile.read()
         else:
             with open(os.path.join(self.savedir, pathname)) as infile:
                 text = infile.read()
         return text
 
+    def pack_items(self, form: str, item: str, filename: str = '',
+                   blocksize: int = 2**20) -> Corpus:
+        """Pack extracted items from archive into a compressed corpus
+
+        Args:
+            form: Filing type of items, e.g. '10-K'
+            item: Item to pack, e.g. 'mda10K' or 'bus10K'
+            filename: Name of corpus data file, default ~FORM/ITEM.corpus
+            blocksize: Minimum number of bytes of text in each block
+
+        Returns:
+            Corpus of items, in order of permno and date
+
+        Notes:
+
+        - items already packed in the corpus, by pathname, are skipped, so
+          that only newly extracted items are appended
+        """
+        filename = filename or os.path.join(self.savedir, form,
+                                            item + '.corpus')
+        corpus = Corpus(filename, blocksize=blocksize, verbose=self.verbose)
+        packed = set(corpus.index['pathname'])
+        rows = [row for row in self.open(form=form, item=item)
+                if row['pathname'] not in packed]
+        for row in sorted(rows, key=lambda row: (row['permno'], row['date'])):
+            corpus.add(self[row['pathname']], permno=row['permno'],
+                       date=row['date'], form=row['form'], item=item,
+                       pathname=row['pathname'])
+        corpus.close()
+        self.close()
+        return corpus
+
+    def index_text(self, form: str = '', item: str = '', date: int = 0,
+                   filename: str = '', batch: int = 1000) -> TextIndex:
+        """Add filings or extracted items of an archive to a full-text index
+
+        Args:
+            form: Filing type of archive, e.g. '10-K' or '8-K'
+            item: Extracted item of archive, e.g. 'mda10K'
+            date: Year of archive of filings
+            filename: Name of index database, default ~text_index.db
+            batch: Number of documents indexed between commits
+
+        Returns:
+            TextIndex of documents, to search by boolean and phrase queries
+
+        Notes:
+
+        - documents already indexed from the archive, by pathname, are
+          skipped, so that only newly saved filings or items are read
+        """
+        filename = filename or os.path.join(self.savedir, 'text_index.db')
+        index = TextIndex(filename, verbose=self.verbose)
+        nodes = [form, item, str(date)[:4] if date else '']
+        archive = "/".join(node for node in nodes if node)
+        indexed = index.indexed(archive)
+        rows = [row for row in self.open(form=form, item=item, date=date)
+                if row['pathname'] not in indexed]
+        for i, row in enumerate(rows):
+            index.add(self[row['pathname']], archive=archive,
+                      pathname=row['pathname'], cik=row['cik'],
+                      form=row['form'], date=row['date'],
+                      permno=row.get('permno'))
+            if (i + 1) % batch == 0:
+                index.commit()
+                self._print(f"(index_text) {i+1}/{len(rows)} {archive}")
+        index.commit()
+        self.close()
+        self._print(f"(index_text) {len(rows)} documents from {archive}"
+                    f" added to {filename}")
+        return index
+
+    def extract_items(self, date: int, items: Dict[str, List[str]],
+                      to_permno: Any, zipped: bool = True,
+                      workers: int | None = None, logfile: str = '',
+                      chunksize: int = 8,
+                      checkpoint: int = 1000) -> DataFrame:
+        """Extract items from an archive's filings using worker processes
+
+        Args:
+            date: Year of archive of filings to extract from
+            items: Dict of forms and list of items to extract from each form,
+                   e.g. {'10-K': ['bus10K', 'mda10K']}
+            to_permno: Lookup (callable or dict) of permno from cik
+            zipped: If True, append items to ~FORM/ITEM.zip, else save to
+                    ~FORM/ITEM/PERMNO/ folders
+            workers: Number of worker processes, default number of cpus
+            logfile: Name of progress log, default ~extract_{date}.jsonl
+            chunksize: Number of filings sent to a worker at a time
+            checkpoint: Number of filings between closing the zipped outputs
+                        and logging their completion
+
+        Returns:
+            DataFrame of filings processed in this run, with status and
+            character and word counts of the filing and extracted items
+
+        Notes:
+
+        - each worker process opens its own handle of the zipped archive,
+          reads and extracts items from its filings
+        - all items are written in this process, and completed or failed
+          filings are appended to the progress log only after their zipped
+          outputs are closed at a checkpoint
+        - filings logged as completed are skipped when restarted, and
+          zipped outputs left open by a crashed run are first restored to
+          their last checkpoint
+        """
+        logfile = logfile or os.path.join(self.savedir,
+                                          f"extract_{date}.jsonl")
+        done = set()
+        if os.path.exists(logfile):
+            with open(logfile, 'rt') as f:
+                for line in f:
+                    r = json.loads(line)
+                    if r['status'] == 'ok':
+                        done.add(r['pathname'])
+
+        rows = []     # select filings of the forms and with permno
+        for row in self.open(date=date):
+            if row.get('form') in items and row['pathname'] not in done:
+                permno = to_permno(int(row['cik']))\
+                    if callable(to_permno) else to_permno.get(int(row['cik']))
+                if permno:
+                    rows.append(dict(row, permno=int(permno),
+                                     items=items[row['form']],
+                                     member=self.members_.get(row['pathname'])
+                                     if self.zipped else None))
+        archive = self.zipped or self.savedir
+        self.close()
+        if zipped:
+            for form in items:
+                for item in items[form]:
+                    _restore_zip(os.path.join(self.savedir, form,
+                                              item + '.zip'))
+        self._print(f"(extract_items) {len(rows)} filings, {len(done)} done")
+
+        outputs = {}  # zipped output archives of items, opened when needed
+        pending = []  # log records of filings since last checkpoint
+        logger = []
+        tic = time.time()
+
+        def _checkpoint():
+            """Close zipped outputs, then log their completed filings"""
+            for name in list(outputs):
+                _close_append(outputs.pop(name))
+            for r in pending:
+                log.write(json.dumps(r) + '\n')
+            log.flush()
+            pending.clear()
+
+        with open(logfile, 'at') as log, \
+             concurrent.futures.ProcessPoolExecutor(
+                 max_workers=workers,
+                 initializer=_init_extract,
+                 initargs=(archive,)) as pool:
+            try:
+                for row, result in pool.map(_extract_worker, rows,
+                                            chunksize=chunksize):
+                    r = {'pathname': row['pathname'],
+                         'year': date,
+                         'permno': row['permno']}
+                    if isinstance(result, str):    # worker raised exception
+                        r.update(status='failed', error=result)
+                        self._print("*** (extract_items) failed", r)
+                    else:
+                        r.update(status='ok',
+                                 text_c=result['text_c'],
+                                 text_w=result['text_w'])
+                        for item, extract in result['items'].items():
+                            localname = row['pathname'].split('/')[-1]
+                            if zipped:
+                                name = os.path.join(self.savedir, row['form'],
+                                                    item + '.zip')
+                                if name not in outputs:
+                                    outputs[name] = _open_append(name)
+                                outputs[name].writestr(
+                                    f"{item}/{row['permno']}/{localname}",
+                                    extract)
+                            else:
+                                self.save_item(text=extract,
+                                               form=row['form'],
+                                               permno=row['permno'],
+                                               item=item,
+                                               pathname=row['pathname'])
+                            r[item + '_c'] = len(extract)
+                            r[item + '_w'] = len(extract.split())
+                    pending.append(r)
+                    logger.append(r)
+                    if len(pending) >= checkpoint:
+                        _checkpoint()
+                        self._print(f"(extract_items) {len(logger)}/"
+                                    f"{len(rows)} filings "
+                                    f"{len(logger)/(time.time()-tic):.1f}"
+                                    " per sec")
+            finally:
+                _checkpoint()
+        return DataFrame.from_records(logger)
+
+def _open_append(name: str) -> zipfile.ZipFile:
+    """Open zip file to append, after saving a copy of its central directory
+
+    Notes:
+
+    - appending overwrites the central directory of a zip file, which is only
+      rewritten when closed, so the saved copy of ~NAME.cd lets a zip file
+      left open by a crash be restored by _restore_zip
+    """
+    _restore_zip(name)
+    os.makedirs(os.path.dirname(name), exist_ok=True)
+    saved = b''    # empty if new zip file, to be removed if not closed
+    if os.path.exists(name):
+        with zipfile.ZipFile(name) as z:
+            start = z.start_dir
+        with open(name, 'rb') as f:
+            f.seek(start)
+            saved = start.to_bytes(8, 'little') + f.read()
+    with open(name + '.cd.tmp', 'wb') as f:
+        f.write(saved)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(name + '.cd.tmp', name + '.cd')
+    return zipfile.ZipFile(name, 'a', compression=zipfile.ZIP_DEFLATED)
+
+def _close_append(output: zipfile.ZipFile):
+    """Close zip file opened to append, and discard its saved directory"""
+    name = output.filename
+    output.close()
+    os.remove(name + '.cd')
+
+def _restore_zip(name: str):
+    """Restore zip file to its saved central directory, if left open"""
+    if not os.path.exists(name + '.cd'):
+        return
+    with open(name + '.cd', 'rb') as f:
+        saved = f.read()
+    if saved:
+        start = int.from_bytes(saved[:8], 'little')
+        with open(name, 'r+b') as f:
+            f.truncate(start)
+            f.seek(start)
+            f.write(saved[8:])
+    elif os.path.exists(name):
+        os.remove(name)
+    os.remove(name + '.cd')
+
+_archive = None   # handle of archive opened by each extract worker process
+
+def _init_extract(archive: str):
+    """Open a process-local handle of the archive for extract workers"""
+    global _archive
+    _archive = open(archive, 'rb') if archive.endswith('.zip') else archive
+
+def _extract_worker(row: Dict) -> Tuple[Dict, Dict | str]:
+    """Read filing and extract its items, else return exception message"""
+    try:
+        if row['member']:
+            text = _read_member(_archive, *row['member']).decode('latin-1')
+        else:
+            with open(os.path.join(_archive, row['pathname'])) as infile:
+                text = infile.read()
+        return row, {'text_c': len(text),
+                     'text_w': len(text.split()),
+                     'items': Edgar.extract_sections(text, row['items'])}
+    except Exception as e:
+        return row, repr(e)
+
+
 if __name__ == "__main__":
     from finds.database import SQL
     from finds.structured import PSTAT
@@ -821,33 +1941,56 @@ if __name__ == "__main__":
               for y in np.arange(start_year + (start_quarter - 1) * .25,
                                  end_year + end_quarter * .25,
                                  0.25)]
-        restart = {'year': 2022,
-                   'quarter': 2,
-                   'filenum': 87372}
 
         ed = Edgar(savedir=paths['10X'], zipped=True)
+        ed.update_index(years=list(range(start_year, end_year + 1)))
         forms = [f for c in ['10-K', '10-Q', '8-K'] for f in Edgar._forms[c]]
+        for year, quarter in yq:   # download queue resumes when restarted
+            files = ed.query_index(forms=forms,
+                                   begdate=year*10000 + quarter*300 - 199,
+                                   enddate=year*10000 + quarter*300 + 31)
+            log = ed.download(files)
+            _print("--- Saved Filings ---", year, quarter,
+                   log['status'].value_counts().to_dict())
+
+    def _download_local(savedir: str, n: int = 40):
+        """Sample code to download from a local stand-in of Edgar website"""
+        import http.server, threading, functools, tempfile
+        site = tempfile.mkdtemp()
+        filings = []
+        for i in range(n):    # create detail and filing documents
+            cik, adsh = 1000 + i, f"{1000 + i:010d}-22-{i:06d}"
+            folder = os.path.join(site, 'edgar', 'data', str(cik),
+                                  adsh.replace('-', ''))
+            os.makedirs(folder)
+            with open(os.path.join(folder, adsh + '-index.html'), 'wt') as f:
+                f.write("<table><tr><th>Document</th><th>Type</th></tr>"
+                        f"<tr><td>doc{i}.htm</td><td>10-K</td></tr></table>")
+            with open(os.path.join(folder, f"doc{i}.htm"), 'wt') as f:
+                f.write(f"<p>Item 7. Filing {i}</p>")
+            filings.append({'cik': cik, 'form': '10-K', 'date': 20220301,
+                            'pathname': f"edgar/data/{cik}/{adsh}.txt"})
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(0.2)       # latency of remote server
+                super().do_GET()
+
+        server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), functools.partial(Handler, directory=site))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        ed = Edgar(savedir=savedir, zipped=False)
         tic = time.time()
-        for year, quarter in yq:
-            if year >= restart['year'] and quarter >= restart['quarter']:
-                restart['quarter'] = 0
-                files = Edgar.fetch_index(year=year, quarter=quarter)
-                for filenum in sorted(files.keys()):
-                    if filenum >= restart['filenum']:
-                        r = files[filenum]
-                        restart['filenum'] = 0
-                        if r['form'] in forms:
-                            det, fil = Edgar.get_detail_filings(r['pathname'])
-                            if det:
-                                ed.save_detail(text=det, **r)
-                                ed.save_filing(text=fil, **r)
-                                _print("--- Saved Filing ---", filenum,
-                                       len(files), *r.values())
+        root = f"http://127.0.0.1:{server.server_port}/"
+        log = ed.download(filings, root=root)
+        print(f"{len(log)} filings in {time.time() - tic:.1f} secs",
+              log['status'].value_counts().to_dict())
+        server.shutdown()
+        return log
 
-    
     def _extract_items():
         """Sample code to extract mda10K and bus10K, and store locally""" 
-        ed = Edgar(savedir=paths['10X'], zipped=False)
+        ed = Edgar(savedir=paths['10X'], zipped=True)
         sql = SQL(**credentials['sql'])
         bday = BusDay(sql)
         pstat = PSTAT(sql, bday)
@@ -856,26 +1999,28 @@ if __name__ == "__main__":
         years = [2022]
         items = {'10-K': ['bus10K', 'mda10K']}  # '10-Q': ['mda10Q']}
         logger = []
-        for year in years: 
-            rows = ed.open(date=year)
-            row = rows[0]
-            for i, row in enumerate(rows):
-                permno = to_permno(int(row['cik']))
-                if row['form'] in items and permno:
-                    filing = ed[row['pathname']]
-                    for item in items[row['form']]:
-                        extract = Edgar.extract_item(filing, item)
-                        ed.save_item(text=extract,
-                                     form=row['form'],
-                                     permno=permno,
-                                     item=item,
-                                     pathname=row['pathname'])
-                        r = {'year': year,
-                             'permno': permno,
-                             'item': item,
-                             'text_c': len(filing),
-                             'item_c': len(extract),
-                             'text_w': len(filing.split()),
-                             'item_w': len(extract.split())}
-                        logger.append(r)
+        for year in years:
+            ciks = {int(row['cik']) for row in ed.open(date=year)}
+            permnos = {cik: to_permno(cik) for cik in ciks}  # picklable dict
+            logger.append(ed.extract_items(date=year,
+                                           items=items,
+                                           to_permno=permnos,
+                                           workers=8))
+        logger = pd.concat(logger, ignore_index=True)
+
+    def _benchmark_text(htmldir: str):
+        """Sample code to check html_to_text against BeautifulSoup text"""
+        names = [n for n in os.listdir(htmldir) if n.endswith('.htm')]
+        golden = {}
+        tic = time.time()
+        for n in names:
+            golden[n] = Edgar.fetch_filing(n, root=htmldir, fast=False)
+        soup_rate = len(names) / (time.time() - tic)
+        tic = time.time()
+        mismatch = [n for n in names
+                    if Edgar.fetch_filing(n, root=htmldir) != golden[n]]
+        fast_rate = len(names) / (time.time() - tic)
+        print(f"{len(names)} filings: {len(mismatch)} mismatched,"
+              f" soup {soup_rate:.1f}/sec, fast {fast_rate:.1f}/sec")
+        return mismatch
 
@@ -22,6 +22,7 @@ from pandas.api.types import is_list_like, is_datetime64_any_dtype, \
     is_integer_dtype, is_string_dtype, is_numeric_dtype
 import matplotlib.pyplot as plt
 from scipy.stats import chi2, norm, t
+from scipy.linalg import cho_factor, cho_solve
 from statsmodels.tsa.stattools import adfuller, acf, pacf
 from scipy.fft import fft, ifft, rfft, irfft
 
@@ -132,43 +133,90 @@ class FFT:
 
 
     @staticmethod
-    def neweywest(X: np.ndarray) -> List:
-        """Compute Newey-West weighted cross-correlation of all pairs of columns
+    def _kernel(x: np.ndarray, kernel: str = 'bartlett') -> np.ndarray:
+        """Lag window weights at lags divided by bandwidth"""
+        x = np.abs(x)
+        if kernel == 'bartlett':
+            return np.maximum(1 - x, 0.)
+        if kernel == 'parzen':
+            return np.where(x <= 0.5, 1 - 6 * x**2 + 6 * x**3,
+                            np.where(x <= 1, 2 * (1 - x)**3, 0.))
+        if kernel == 'qs':    # quadratic spectral
+            z = 6 * np.pi * x / 5
+            with np.errstate(divide='ignore', invalid='ignore'):
+                w = 25 * (np.sin(z) / z - np.cos(z)) / (12 * (np.pi * x)**2)
+            return np.where(x == 0, 1., w)
+        raise ValueError(f"kernel {kernel} not in ['bartlett','parzen','qs']")
+
+    @staticmethod
+    def bandwidth(X: np.ndarray, kernel: str = 'bartlett') -> float | np.ndarray:
+        """Andrews (1991) automatic bandwidth from AR(1) fits of each column
 
         Args:
-            X: array with series in columns
+            X: array with series in columns, and optional further dimensions
+            kernel: Name of kernel in {'bartlett', 'parzen', 'qs'}
 
         Returns:
-            List of Newey-west weighted cross-correlations
+            Bandwidth combined over columns, for each further dimension
+        """
+        X = X - np.mean(X, axis=0)
+        N = len(X)
+        rho = np.sum(X[1:] * X[:-1], axis=0) / np.sum(X[:-1]**2, axis=0)
+        rho = np.clip(rho, -0.97, 0.97)
+        s4 = np.mean((X[1:] - rho * X[:-1])**2, axis=0)**2
+        den = np.sum(s4 / (1 - rho)**4, axis=0)
+        if kernel == 'bartlett':
+            alpha = np.sum(4 * rho**2 * s4 / ((1 - rho)**6 * (1 + rho)**2),
+                           axis=0) / den
+            return 1.1447 * (alpha * N)**(1/3)
+        alpha = np.sum(4 * rho**2 * s4 / (1 - rho)**8, axis=0) / den
+        return {'parzen': 2.6614, 'qs': 1.3221}[kernel] * (alpha * N)**(1/5)
 
-        Notes:
+    @staticmethod
+    def _lagwindow(N: int, bandwidth: float | np.ndarray,
+                   kernel: str = 'bartlett') -> np.ndarray:
+        """Transform of lag window, at rfft frequencies of 2N-padded series"""
+        P = 2 * N
+        lags = np.fft.fftfreq(P, 1 / P).reshape(-1, *np.ones(np.ndim(bandwidth),
+                                                            dtype=int))
+        W = fft(FFT._kernel(lags / bandwidth, kernel), axis=0).real
+        W = W[:(P // 2) + 1] * 2     # conjugate frequencies counted twice
+        W[[0, -1]] /= 2
+        return W / P
 
-        - First apply convolution theorem to compute all cross-autocorrelations,
-        - Then for each pair of series, compute Newey-west weighted correlation
-        """
-        N, M = X.shape
-        assert M > 1
-        shift = (N // 2) + 1
-        window = 2 * (N // 2) + 1
-        L = window // 2
+    @staticmethod
+    def neweywest(X: np.ndarray, lags: float | None = None,
+                  kernel: str = 'bartlett', demean: bool = True) -> np.ndarray:
+        """Compute kernel-weighted long-run covariance matrix of all columns
 
-        # Newey-West weights, with peak (1.0) at center of window
-        NW = np.array([1 - abs(l)/(L+1) for l in range(-L, L+1, 1)])\
-               .reshape(1, -1)
+        Args:
+            X: array with series in columns
+            lags: Number of lags, i.e. bandwidth less one, or None for
+                  Andrews (1991) automatic bandwidth
+            kernel: Name of kernel in {'bartlett', 'parzen', 'qs'}
+            demean: Whether to demean columns first
 
-        # Convolution Theorem
-        X = np.pad(FFT._normalize(X), [(0, N), (0,0)])
-        Y = rfft(np.flipud(X), axis=0)
-        X = rfft(X, axis=0)
+        Returns:
+            Long-run covariance matrix, sum over all lags of kernel-weighted
+            autocovariances
 
-        # Accumulate results for each column against remaining columns 
-        result = []
-        for col in range(M-1):
-            conv = irfft(X[:, [col]] * Y[:, col+1:], axis=0)
-            corrs = np.roll(conv, shift, axis=0)[:window]
-            np.mean(np.max(corrs, axis=0))
-            result.extend()
-        return result
+        Notes:
+
+        - with 2N zero-padding, the cross-products at every lag of every pair
+          of columns are the inverse FFT of conj(F_a) F_b, so the weighted
+          sum over lags is the sum over frequencies of conj(F_a) F_b times
+          the transform of the lag window: one FFT per column and one matmul
+        - bartlett kernel with lags L has Newey-West weights 1 - l/(L+1)
+        """
+        X = np.asarray(X, dtype=float)
+        X = X.reshape(len(X), -1)
+        N = len(X)
+        if demean:
+            X = X - np.mean(X, axis=0)
+        b = FFT.bandwidth(X, kernel) if lags is None else lags + 1
+        F = rfft(X, n=2 * N, axis=0)
+        W = FFT._lagwindow(N, b, kernel)
+        return (F.conj().T @ (W[:, None] * F)).real / N
 
 
 ######################
@@ -239,6 +287,7 @@ def weighted_average(df: DataFrame, weights: str = '') -> Series:
     """
     if not weights:
         cols = df.columns
+        weights = None
     else:
         cols = df.columns.difference([weights])
         weights = df[weights].astype(float)
@@ -284,52 +333,250 @@ def winsorize(df, quantiles=[0.025, 0.975]):
         return df.clip(lower=lower, upper=upper)
 
 
+def _segments(groups: Iterable) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """helper to stably sort by group, returning order, labels and starts"""
+    labels, inverse = np.unique(np.asarray(groups), return_inverse=True)
+    order = np.argsort(inverse.reshape(-1), kind='stable')
+    counts = np.bincount(inverse.reshape(-1), minlength=len(labels))
+    return order, labels, np.r_[0, np.cumsum(counts)]
+
+
+def grouped_fractiles(values: Iterable, groups: Iterable, pct: Iterable,
+                      keys: Iterable | None = None,
+                      ascending: bool = False) -> np.ndarray:
+    """Sort and assign values into fractiles, within each group
+
+    Args:
+        values: input array to assign to fractiles
+        groups: group label, e.g. date, of each value
+        pct: list of percentiles 0..100
+        keys: boolean mask of values to determine breakpoints, e.g. NYSE
+              stocks, use all values if None
+        ascending: if True, assign to fractiles in ascending order
+
+    Returns:
+        array of fractile assignments {1,.., len(pct)}, identical to
+        fractiles of each group separately
+
+    Notes:
+
+    - key values are sorted once by group and value, and percentiles of
+      every group are interpolated from its sorted segment as in the
+      'linear' method of np.percentile
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    use = ~np.isnan(values)
+    if keys is not None:
+        use &= np.asarray(keys, dtype=bool)
+    labels, inverse = np.unique(groups, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    v = values[use][np.lexsort((values[use], inverse[use]))]
+    n = np.bincount(inverse[use], minlength=len(labels))[:, None]
+    start = np.r_[0, np.cumsum(n)[:-1]][:, None]
+
+    # interpolate percentiles from each group's sorted segment
+    virtual = (n - 1) * np.true_divide(sorted(pct), 100)
+    prev = np.clip(np.floor(virtual).astype(int), 0, np.maximum(n - 1, 0))
+    gamma = virtual - prev
+    a = v[np.minimum(start + prev, len(v) - 1)]
+    b = v[np.minimum(start + np.minimum(prev + 1, n - 1), len(v) - 1)]
+    bp = np.where(gamma >= 0.5, b - (b - a) * (1 - gamma), a + (b - a) * gamma)
+    bp[n[:, 0] == 0] = np.nan
+
+    # count breakpoints less than each value, as searchsorted(side='left')
+    below = np.sum(bp[inverse] < values[:, None], axis=1)
+    below = np.where(np.isnan(values), len(bp[0]) + 1, below)
+    if ascending:
+        return 1 + below
+    else:
+        return 1 + len(bp[0]) - below
+
+
+def grouped_weighted_average(df: DataFrame, by: str,
+                             weights: str = '') -> DataFrame:
+    """Weighted means of data frame, within each group
+
+    Args:
+        df: DataFrame containing group labels, values, and optional weights,
+            in columns
+        by: Column name of group labels, e.g. date
+        weights: Column name to use as weights
+
+    Returns:
+        DataFrame of weighted means, indexed by group, identical to
+        weighted_average of each group separately
+
+    Notes:
+
+    - ignores NaN's and infs
+    - rows are sorted once by group, and each group's sums are reduced
+      from a contiguous segment of the sorted columns
+    """
+    df = df.drop(columns=[by]).set_axis(df[by].values, axis=0)
+    cols = df.columns.difference([weights]) if weights else df.columns
+    order, labels, bounds = _segments(df.index)
+    X = df[cols].to_numpy(dtype=float)[order]
+    mask = ~np.isfinite(X)    # as masked_invalid
+    if weights:
+        wgt = df[weights].to_numpy(dtype=float)[order, None] * ~mask
+        X = np.where(mask, 0., X * wgt)
+    else:
+        wgt = (~mask).astype(float)
+        X = np.where(mask, 0., X)
+    avg = np.array([X[lo:hi].sum(axis=0) / wgt[lo:hi].sum(axis=0)
+                    for lo, hi in zip(bounds[:-1], bounds[1:])])
+    return DataFrame(avg, index=pd.Index(labels, name=by), columns=cols)
+
+
+def grouped_winsorize(df: DataFrame, by: str,
+                      quantiles: List[float] = [0.025, 0.975]) -> DataFrame:
+    """Winsorise dataframe by column quantiles, within each group
+
+    Args:
+        df: Input DataFrame, with group labels, e.g. date, in a column
+        by: Column name of group labels
+        quantiles: high and low fractions of distribution to truncate
+
+    Returns:
+        DataFrame with values truncated, identical to winsorize of each group
+        separately
+
+    Notes:
+
+    - each column is sorted once by group and value, and quantiles located
+      in each group's segment as with interpolation 'higher' (for lower
+      bound) and 'lower' (for upper bound)
+    """
+    cols = [col for col in df.columns if col != by]
+    labels, inverse = np.unique(df[by].to_numpy(), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    q = np.array([min(quantiles), max(quantiles)]) * 100.0 / 100
+    out = df.copy()
+    for col in cols:
+        x = df[col].to_numpy(dtype=float)
+        use = ~np.isnan(x)
+        if not np.any(use):   # all NaN: nothing to truncate
+            continue
+        v = x[use][np.lexsort((x[use], inverse[use]))]
+        n = np.bincount(inverse[use], minlength=len(labels))
+        start = np.r_[0, np.cumsum(n)[:-1]]
+        lower = v[np.minimum(start + np.ceil((n - 1) * q[0]).astype(int),
+                             len(v) - 1)]
+        upper = v[np.minimum(start + np.floor((n - 1) * q[1]).astype(int),
+                             len(v) - 1)]
+        out[col] = np.clip(x, lower[inverse], upper[inverse])
+    return out
+
+
 def impute_em(X: np.ndarray, add_intercept: bool = True,
-              tol: float = 1e-12, maxiter: int = 200,
-              verbose: int = 1) -> Tuple[np.ndarray, DataFrame]:
-    """Fill missing data with EM Normal distribution"""
-    if add_intercept:
-        X = np.hstack((np.ones((X.shape[0], 1)), X))
+              tol: float = 1e-12, maxiter: int = 200, verbose: int = 1,
+              correction: bool = False) -> np.ndarray:
+    """Fill missing data with EM Normal distribution
+
+    Args:
+        X: Array of observations in rows, with missing values as NaN
+        add_intercept: Whether to center on estimated means, else zero
+        tol: Tolerance to stop, for improvement in negative log-likelihood if
+             correction, else for mean squared change of imputed values
+        maxiter: Maximum number of iterations
+        verbose: Whether to display negative log-likelihood each iteration
+        correction: Whether to add conditional covariances of missing entries
+                    to the sufficient statistics, as in maximum likelihood EM
+
+    Returns:
+        Array of observations with missing values filled in
+
+    Notes:
+
+    - rows are grouped by pattern of missing columns: with precision matrix
+      P = inverse of covariance, the conditional means of missing given
+      observed entries are mu_m - inv(P_mm) P_m. (x - mu) with missing
+      entries of (x - mu) set to zero, so only the small P_mm block is
+      Cholesky factored once per pattern, batched over patterns with the
+      same number of missing entries
+    - each M-step estimates means and covariance from sufficient statistics
+      (sums of x and x x'), which also give the log-likelihood
+    - by default, as in iterative regression imputation, conditional
+      covariances inv(P_mm) of missing entries are not added back to the
+      sufficient statistics; if correction, they are and the negative
+      log-likelihood tracked is that of the observed entries
+    - only maximum likelihood EM (if correction) decreases the negative
+      log-likelihood monotonically, so that it is used to stop; otherwise
+      iterations stop when the imputed values have converged
+    """
+    X = np.array(X, dtype=float)
+    n, p = X.shape
     missing = np.isnan(X)   # identify missing entries
     assert(not np.any(np.all(missing, axis=1)))    # no row all missing
     assert(not np.any(np.all(missing, axis=0)))    # no column all missing
-    cols = np.flatnonzero(np.any(missing, axis=0)) # columns with missing 
 
-    results = []
+    # group rows by missingness pattern, and patterns by number missing
+    patterns, group = np.unique(missing, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    counts = np.bincount(group, minlength=len(patterns))
+    nmiss = patterns.sum(axis=1)
+    groups = []   # (rows, pattern of each row, missing columns of patterns)
+    for k in np.unique(nmiss):
+        pats = np.flatnonzero(nmiss == k)
+        rows = np.flatnonzero(np.isin(group, pats))
+        cols = np.nonzero(patterns[pats])[1].reshape(len(pats), k)
+        groups.append((rows, np.searchsorted(pats, group[rows]), cols,
+                       counts[pats]))
+
+    # Initially, just replace with column means
+    X[missing] = np.take(np.nanmean(X, axis=0), np.nonzero(missing)[1])
+    C = np.zeros((p, p))    # sum of conditional covariances of missing
     for niter in range(maxiter+1):
-        if not niter:
-            # Initially, just replace with column means
-            for col in cols: 
-                X[missing[:, col], col] = np.nanmean(X[:, col])
+        # "M" step: estimate mean and covariance from sufficient statistics
+        mean = X.mean(axis=0)
+        S = (X.T @ X + C) / n - np.outer(mean, mean)
+        factor = cho_factor(S)
+        logdet = 2 * np.sum(np.log(np.diag(factor[0])))
+        if not correction:   # record the current NLL of completed data
+            nll = n * (p * np.log(2 * np.pi) + logdet + p) / 2
+        if add_intercept:
+            mu = mean
         else:
-            XX = X.T @ X
-            inv_XX = inv(XX)
-            for col in cols:  # E, M step for each column with missing values
-                # "M" step: estimate covariance matrix
-                mask = np.ones(X.shape[1], dtype=bool)
-                mask[col] = 0
-                # x = np.delete(X, (col), axis=1)
-                if False:
-                    #xx = np.delete(np.delete(XX, (col), axis=0), (col), axis=1)
-                    M = inv(XX[:, mask][mask, :]) @ X[:, mask].T @ X[:, col]
-                else:
-                    M = -inv_XX[mask, col] / inv_XX[col, col]
-
-                # "E" step: update expected missing values
-                # y = X[:, mask] @ M
-                X[missing[:, col], col] = X[missing[:, col],:][:, mask] @ M
-        x = X[:, add_intercept:]
-        # record the current NLL
-        nll = -sum(multivariate_normal.logpdf(x,
-                                              mean=np.mean(x, axis=0),
-                                              cov=np.cov(x.T, bias=True),
-                                              allow_singular=True))
+            mu, S = np.zeros(p), S + np.outer(mean, mean)
+            factor = cho_factor(S)
+            logdet = 2 * np.sum(np.log(np.diag(factor[0])))
+        P = cho_solve(factor, np.eye(p))
+        Z = np.where(missing, 0., X - mu)
+        W = Z @ P
+
+        # "E" step: update expected missing values, by missingness pattern
+        nll_obs, C, change = np.sum(Z * W), np.zeros((p, p)), 0.
+        for rows, pat, cols, count in groups:
+            if not cols.shape[1]:
+                continue
+            L = np.linalg.cholesky(P[cols[:, :, None], cols[:, None, :]])
+            L_inv = np.linalg.inv(L)
+            cov = np.swapaxes(L_inv, 1, 2) @ L_inv    # inv(P_mm)
+            m = cols[pat]
+            b = np.take_along_axis(W[rows], m, axis=1)
+            delta = np.einsum('rij,rj->ri', cov[pat], b)
+            if correction:   # Schur complements give NLL of observed entries
+                nll_obs += (2 * np.sum(np.log(np.diagonal(L, axis1=1, axis2=2))
+                                       .sum(axis=1) * count)
+                            - np.sum(b * delta))
+            if niter < maxiter:
+                change += np.sum((X[rows[:, None], m] - mu[m] + delta)**2)
+                X[rows[:, None], m] = mu[m] - delta
+                if correction:
+                    np.add.at(C, (cols[:, :, None], cols[:, None, :]),
+                              count[:, None, None] * cov)
+        if correction:
+            nll = (n * logdet + nll_obs
+                   + np.log(2 * np.pi) * (~missing).sum()) / 2
         if verbose:
             print(f"{niter} {nll:.6f}")
-        if niter and prev_nll - nll < tol:
+        if correction and niter and prev_nll - nll < tol:
+            break
+        if not correction and change / missing.sum() < tol:
             break
         prev_nll = nll
-    return x
+    return X
 
 ######################
 #
@@ -405,22 +652,101 @@ def least_squares(data: DataFrame, y: List[str] = ['y'],
     return (DataFrame(b, columns=x, index=y) if len(b) > 1 else
             Series(b[0], x))   # return as Series for groupby.apply
 
-def fstats(x: Series | np.ndarray, tail: float = 0.15) -> np.ndarray:
+def _cumulative(y: np.ndarray, X: np.ndarray | None = None) -> Tuple:
+    """helper to accumulate sums of y, y^2 and cross-products with X"""
+    def cum(a):
+        return np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, 0)])
+    if X is None:   # mean model: SSE is invariant to centering
+        y = y - np.mean(y, axis=0)
+        return cum(y), cum(y**2)
+    return (cum(y**2), cum(X[:, :, None] * X[:, None, :]),
+            cum(X[:, :, None] * y[:, None, :]))
+
+
+def _segment_sse(cums: Tuple, i: Any, j: Any) -> np.ndarray:
+    """helper to compute SSE of segments y[i:j] from cumulative sums"""
+    if len(cums) == 2:   # mean model
+        s1, s2 = cums[0][j] - cums[0][i], cums[1][j] - cums[1][i]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return s2 - s1**2 / np.reshape(np.subtract(j, i), (-1, 1))
+    yy, xx, xy = (c[j] - c[i] for c in cums)
+    return yy - np.sum(xy * np.linalg.solve(xx, xy), axis=-2)
+
+
+def fstats(x: Series | np.ndarray, tail: float = 0.15,
+           X: np.ndarray | None = None) -> np.ndarray:
     """Helper to compute F-stats at all candidate break points
     
     Args:
-        x: Input Series
+        x: Input Series, or 2D array with series in columns
         tail: Tail fractions to skip computations
+        X: Regressors with break in all coefficients, else None for mean
+
+    Returns:
+        Array of f-stats at each candidate break-point, with same shape as x
+
+    Notes:
+
+    - SSE's of the split samples at every break point are differenced from
+      cumulative sums of x and x^2, or of X'X, X'x and x^2 for regressions,
+      in O(n) instead of recomputed from scratch
+    """
+    x = np.asarray(x, dtype=float)
+    y = x.reshape(len(x), -1)
+    n, k = len(y), 1 if X is None else X.shape[1]
+    cums = _cumulative(y, None if X is None else np.asarray(X, dtype=float))
+    rse = _segment_sse(cums, 0, n).reshape(-1) / n
+    sse = np.ones(y.shape) * rse
+    breaks = np.arange(int(n * tail), int((1-tail) * n)+1)
+    sse[breaks] = (_segment_sse(cums, 0, breaks)
+                   + _segment_sse(cums, breaks, n)) / n
+    return (((n - 2*k) / (2*k)) * (rse - sse) / rse).reshape(x.shape)
+
+
+def breakpoints(x: Series | np.ndarray, nbreaks: int = 1, tail: float = 0.15,
+                X: np.ndarray | None = None) -> Tuple[List[int], float]:
+    """Dynamic programming search for multiple structural break points
+
+    Args:
+        x: Input Series
+        nbreaks: Number of break points to locate
+        tail: Minimum fraction of observations in each segment
+        X: Regressors with break in all coefficients, else None for mean
 
     Returns:
-        Array of f-stats at each candidate break-point
+        Tuple of list of break points, each the first index of a new segment,
+        and the minimized sum of squared errors
+
+    Notes:
+
+    - Bai and Perron (2003) dynamic program: the best SSE of m segments
+      ending at j is the minimum over i of the best of m-1 segments ending
+      at i plus the SSE of x[i:j], evaluated for all i at once from
+      cumulative sums
     """
-    n = len(x)
-    rse = np.array(np.var(x, ddof=0))
-    sse = np.ones(n) * rse
-    for i in range(int(n * tail), int((1-tail) * n)+1):
-        sse[i] = (np.var(x[:i], ddof=0)*i + np.var(x[i:], ddof=0)*(n-i))/n
-    return ((n-2)/2) * (rse - sse)/rse
+    y = np.asarray(x, dtype=float).reshape(len(x), 1)
+    n, k = len(y), 1 if X is None else X.shape[1]
+    h = max(int(n * tail), k, 1)     # minimum segment size
+    assert (nbreaks + 1) * h <= n, "too many breaks for minimum segment size"
+    cums = _cumulative(y, None if X is None else np.asarray(X, dtype=float))
+    ends = np.arange(n + 1)
+    best = np.full(n + 1, np.inf)
+    best[h:] = _segment_sse(cums, 0, ends[h:]).reshape(-1)
+    argbest = []
+    for m in range(1, nbreaks + 1):
+        prev, best = best, np.full(n + 1, np.inf)
+        arg = np.zeros(n + 1, dtype=int)
+        for j in range((m + 1) * h, n + 1):
+            i = np.arange(m * h, j - h + 1)
+            total = prev[i] + _segment_sse(cums, i, j).reshape(-1)
+            arg[j] = i[np.argmin(total)]
+            best[j] = np.min(total)
+        argbest.append(arg)
+    breaks, j = [], n
+    for arg in reversed(argbest):    # backtrack from last segment
+        j = arg[j]
+        breaks.insert(0, int(j))
+    return breaks, float(best[n])
 
 
 from collections import namedtuple    
@@ -470,6 +796,137 @@ def lm(x: np.ndarray | DataFrame | Series, y: np.ndarray | DataFrame | Series,
     out['stderr'] = f(np.std(out['residuals'], axis=0))
     return namedtuple('LinearModel', out.keys())(**out)
 
+
+def hac_ols(x: np.ndarray | DataFrame | Series,
+            y: np.ndarray | DataFrame | Series, lags: float | None = None,
+            kernel: str = 'bartlett', add_constant: bool = True) -> NamedTuple:
+    """Regress many series on a common design, with HAC standard errors
+
+    Args:
+        x: RHS independent variables, common to all regressions
+        y: LHS dependent variables, one regression per column
+        lags: Number of lags, i.e. bandwidth less one, or None for
+              Andrews (1991) automatic bandwidth of each regression
+        kernel: Name of kernel in {'bartlett', 'parzen', 'qs'}
+        add_constant: Whether to hstack 'Intercept' column before x variables
+
+    Returns:
+        HACModel named tuple, with key and values (regressors in rows and
+        dependent variables in columns)
+
+        - coefficients: estimated linear regression coefficients
+        - stderr: HAC standard errors of coefficients
+        - tvalue: ratios of coefficients to their standard errors
+
+    Notes:
+
+    - coefficients of all regressions solve one system with shared X'X
+    - kernel-weighted sums of cross-products of scores x * residual are
+      computed for all regressions at once in the frequency domain
+    - bartlett kernel with lags L matches statsmodels OLS fit with
+      cov_type='HAC' and maxlags=L
+    """
+    index = (['Intercept'] if add_constant else []) + (
+        list(x.columns) if isinstance(x, DataFrame) else
+        [x.name] if isinstance(x, Series) else [])
+    columns = (list(y.columns) if isinstance(y, DataFrame) else
+               [y.name] if isinstance(y, Series) else None)
+    X = np.array(x, dtype=float)
+    Y = np.array(y, dtype=float)
+    if len(X.shape) == 1:
+        X = X.reshape((-1, 1))
+    if len(Y.shape) == 1:
+        Y = Y.reshape((-1, 1))
+    if add_constant:
+        X = np.hstack([np.ones((X.shape[0], 1)), X])
+    N = len(X)
+    inv_XX = np.linalg.inv(X.T @ X)
+    b = inv_XX @ (X.T @ Y)
+    G = X[:, :, None] * (Y - X @ b)[:, None, :]   # scores: N x regressors x Y
+    bandwidth = FFT.bandwidth(G, kernel) if lags is None else lags + 1
+    F = rfft(G, n=2 * N, axis=0)
+    W = np.broadcast_to(FFT._lagwindow(N, bandwidth, kernel).reshape(len(F), -1),
+                        (len(F), Y.shape[1]))
+    S = np.einsum('fis,fjs->sij', W[:, None, :] * F.conj(), F).real
+    stderr = np.sqrt(np.einsum('ik,skl,il->is', inv_XX, S, inv_XX))
+    out = {'coefficients': b, 'stderr': stderr, 'tvalue': b / stderr}
+    if len(index) == X.shape[1] and columns is not None:
+        out = {k: DataFrame(v, index=index, columns=columns)
+               for k, v in out.items()}
+    return namedtuple('HACModel', out.keys())(**out)
+
+
+def fama_macbeth(data: DataFrame, y: str, x: List[str], date: str = 'date',
+                 add_constant: bool = True, lags: int = 6,
+                 factors: DataFrame | None = None) -> NamedTuple:
+    """Fama-MacBeth cross-sectional regressions of a stacked panel
+
+    Args:
+        data: DataFrame with date, y and x columns, stacked over all periods
+        y: Name of dependent variable column
+        x: List of independent variable columns
+        date: Name of column identifying periods
+        add_constant: Whether to add intercept as first column
+        lags: Number of Newey-West lags for stderr of mean coefficients
+        factors: Time series of factor returns, in columns named among x
+                 which are estimated betas on them, for Shanken correction
+
+    Returns:
+        FamaMacBeth named tuple, with key and values
+
+        - coefficients: DataFrame of regression coefficients of each period
+        - summary: DataFrame of time-series mean, stderr and tvalue of the
+          coefficients, with Newey-West (and Shanken) corrected stderr and
+          tvalue, std and count
+
+    Notes:
+
+    - panel is sorted by date once (if not already), so that each period is
+      a contiguous block whose cross-products X'X and X'y are one matmul,
+      and the normal equations of all periods are solved in one batched call
+    - periods with no more observations than regressors are skipped
+    - Shanken (1992) errors-in-variables correction: variance of mean
+      premia is ((1 + c) var + factor covariance) / T, where c is the
+      squared Sharpe ratio of the factor premia
+    """
+    x = list(x)
+    Z = np.ones((len(data), len(x) + 1 + add_constant))  # [1, x, y] columns
+    Z[:, int(add_constant):] = data[x + [y]].to_numpy(dtype=float)
+    x = ['Intercept'] * add_constant + x
+    valid = ~np.any(np.isnan(Z), axis=1)
+    periods = data[date].to_numpy()[valid]
+    Z = Z[valid]
+    if np.any(periods[1:] < periods[:-1]):   # sort by date only if needed
+        order = np.argsort(periods, kind='stable')
+        periods, Z = periods[order], Z[order]
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    ends = np.r_[starts[1:], len(periods)]
+    dates, counts = periods[starts], ends - starts
+    k = Z.shape[1] - 1
+    ZZ = np.stack([Z[start:end].T @ Z[start:end]  # X'X and X'y of period
+                   for start, end in zip(starts, ends)])
+    keep = counts > k
+    b = np.linalg.solve(ZZ[keep, :k, :k], ZZ[keep, :k, k:])[..., 0]
+    coef = DataFrame(b, index=pd.Index(dates[keep], name=date), columns=x)
+
+    T = len(coef)
+    summary = DataFrame({'mean': coef.mean(), 'stderr': coef.sem()})
+    summary['tvalue'] = summary['mean'] / summary['stderr']
+    summary['stderr_nw'] = np.sqrt(np.diag(FFT.neweywest(b, lags=lags)) / T)
+    summary['tvalue_nw'] = summary['mean'] / summary['stderr_nw']
+    if factors is not None:
+        cols = [col for col in factors.columns if col in x]
+        sigma = factors[cols].cov()
+        c = summary.loc[cols, 'mean'] @ np.linalg.solve(
+            sigma, summary.loc[cols, 'mean'])
+        var = (1 + c) * coef.var() + Series(np.diag(sigma), index=cols)\
+            .reindex(x, fill_value=0.)
+        summary['stderr_shanken'] = np.sqrt(var / T)
+        summary['tvalue_shanken'] = summary['mean']/summary['stderr_shanken']
+    summary['std'] = coef.std()
+    summary['count'] = T
+    return namedtuple('FamaMacBeth', ['coefficients', 'summary'])(coef, summary)
+
 ######################
 #
 # Finance
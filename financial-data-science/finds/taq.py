@@ -11,13 +11,45 @@ import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series, Timestamp
 import indexed_gzip as igzip
-import gzip, io, pickle, time, re, os
+import gzip, io, pickle, time, re, os, json
+import concurrent.futures
 import matplotlib.pyplot as plt
-from typing import List, Any
+from typing import List, Dict, Tuple, Any
 from finds.display import plot_time
 
 _VERBOSE = 1
 
+_dtypes = {    # define dtypes for each TAQ file
+    'nbbo': {np.uint64: ['Time','Sequence_Number','Participant_Timestamp',
+                         'FINRA_ADF_Timestamp'],
+             np.float32: ['Bid_Price','Bid_Size','Offer_Price',
+                          'Offer_Size','Best_Bid_Price','Best_Bid_Size',
+                          'Best_Offer_Price','Best_Offer_Size']},
+    'trade': {np.uint64: ['Time','Sequence_Number','Participant_Timestamp',
+                          'Trade_Reporting_Facility_TRF_Timestamp'],
+              np.uint8: ['Trade_Correction_Indicator',
+                         'Trade_Through_Exempt_Indicator'],
+              np.float32: ['Trade_Volume','Trade_Price']},
+    'mast': {np.uint8: ['TradedOnNYSEMKT','TradedOnNASDAQBX','TradedOnNSX',
+                        'TradedOnFINRA','TradedOnISE','TradedOnEdgeA',
+                        'TradedOnEdgeX','TradedOnCHX','TradedOnNYSE',
+                        'TradedOnArca','TradedOnNasdaq','TradedOnCBOE',
+                        'TradedOnPSX','TradedOnBATSY','TradedOnBATS',
+                        'TradedOnIEX'],
+             np.uint16: ['Unit_Of_Trade','Round_Lot',
+                         'Specialist_Clearing_Number',
+                         'Specialist_Post_Number'],
+             np.uint32: ['Shares_Outstanding', 'Effective_Date'],
+             np.uint64: ['Unit_Of_Trade','Round_Lot',
+                         'Specialist_Clearing_Number',
+                         'Specialist_Post_Number',
+                         'TradedOnNYSEMKT','TradedOnNASDAQBX','TradedOnNSX',
+                         'TradedOnFINRA','TradedOnISE','TradedOnEdgeA',
+                         'TradedOnEdgeX','TradedOnCHX','TradedOnNYSE',
+                         'TradedOnArca','TradedOnNasdaq','TradedOnCBOE',
+                         'TradedOnPSX','TradedOnBATSY','TradedOnBATS',
+                         'TradedOnIEX','Effective_Date']}}
+
 def taq_from_csv(chunk: str, columns: List[str] = []) -> DataFrame:
     """Convert csv from TAQ to dataframe with correct dtypes
 
@@ -34,37 +66,6 @@ def taq_from_csv(chunk: str, columns: List[str] = []) -> DataFrame:
       the corresponding known list of dtypes for nbbo, trade or mast 
     """
     
-    _dtypes = {    # define dtypes for each TAQ file
-        'nbbo': {np.uint64: ['Time','Sequence_Number','Participant_Timestamp',
-                             'FINRA_ADF_Timestamp'],
-                 np.float32: ['Bid_Price','Bid_Size','Offer_Price',
-                              'Offer_Size','Best_Bid_Price','Best_Bid_Size',
-                              'Best_Offer_Price','Best_Offer_Size']},
-        'trade': {np.uint64: ['Time','Sequence_Number','Participant_Timestamp',
-                              'Trade_Reporting_Facility_TRF_Timestamp'],
-                  np.uint8: ['Trade_Correction_Indicator',
-                             'Trade_Through_Exempt_Indicator'],
-                  np.float32: ['Trade_Volume','Trade_Price']},
-        'mast': {np.uint8: ['TradedOnNYSEMKT','TradedOnNASDAQBX','TradedOnNSX',
-                            'TradedOnFINRA','TradedOnISE','TradedOnEdgeA',
-                            'TradedOnEdgeX','TradedOnCHX','TradedOnNYSE',
-                            'TradedOnArca','TradedOnNasdaq','TradedOnCBOE',
-                            'TradedOnPSX','TradedOnBATSY','TradedOnBATS',
-                            'TradedOnIEX'],
-                 np.uint16: ['Unit_Of_Trade','Round_Lot',
-                             'Specialist_Clearing_Number',
-                             'Specialist_Post_Number'],
-                 np.uint32: ['Shares_Outstanding', 'Effective_Date'],
-                 np.uint64: ['Unit_Of_Trade','Round_Lot',
-                             'Specialist_Clearing_Number',
-                             'Specialist_Post_Number',
-                             'TradedOnNYSEMKT','TradedOnNASDAQBX','TradedOnNSX',
-                             'TradedOnFINRA','TradedOnISE','TradedOnEdgeA',
-                             'TradedOnEdgeX','TradedOnCHX','TradedOnNYSE',
-                             'TradedOnArca','TradedOnNasdaq','TradedOnCBOE',
-                             'TradedOnPSX','TradedOnBATSY','TradedOnBATS',
-                             'TradedOnIEX','Effective_Date']}}
-
     df = pd.read_csv(io.StringIO(chunk),
                      sep='|',
                      na_filter=False,
@@ -96,6 +97,153 @@ def taq_from_csv(chunk: str, columns: List[str] = []) -> DataFrame:
     return df
 
     
+_POW10 = np.uint64(10) ** np.arange(20, dtype=np.uint64)  # uint64 powers
+
+def _digits(buf: np.ndarray, starts: np.ndarray,
+            ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Evaluate decimal text fields arithmetically from their bytes
+
+    Args:
+        buf: Array of uint8 bytes
+        starts: Starting byte offset of each field
+        ends: Ending (exclusive) byte offset of each field
+
+    Returns:
+        Tuple of integer mantissa (uint64) of the digits of each field,
+        number of digits after its decimal point, and whether its text
+        is a valid unsigned decimal number
+
+    Notes:
+
+    - fixed-width digit fields (e.g. timestamps) are evaluated as a product
+      with powers of 10, else by Horner's method over the k'th character
+      of all fields at once
+    """
+    n = len(starts)
+    width = ends - starts
+    if n and np.all(width == width[0]) and 0 < width[0] < 20:
+        digits = buf[starts[:, None] + np.arange(width[0])] - np.uint8(48)
+        if np.all(digits <= 9):
+            mantissa = digits.astype(np.uint64) @ _POW10[width[0] - 1::-1]
+            return mantissa, np.zeros(n, dtype=np.int64), np.ones(n, dtype=bool)
+    mantissa = np.zeros(n, dtype=np.uint64)
+    decimals = np.zeros(n, dtype=np.int64)
+    dot = np.zeros(n, dtype=bool)
+    ok = np.ones(n, dtype=bool)
+    for k in range(int(width.max(initial=0))):
+        valid = starts + k < ends
+        chars = buf[np.minimum(starts + k, len(buf) - 1)]
+        isdigit = valid & (chars >= 48) & (chars <= 57)
+        isdot = valid & (chars == 46)
+        ok &= ~(valid & ~isdigit & ~(isdot & ~dot))
+        mantissa = np.where(isdigit, mantissa * np.uint64(10)
+                            + (chars - 48).astype(np.uint64), mantissa)
+        decimals += isdigit & dot
+        dot |= isdot
+    return np.where(ok, mantissa, 0), np.where(ok, decimals, 0), ok
+
+def taq_from_bytes(chunk: bytes, columns: List[str] = []) -> DataFrame:
+    """Parse raw TAQ bytes to dataframe with correct dtypes, using numpy
+
+    Args:
+        chunk: A chunk of pipe-delimited bytes, as decompressed from TAQ file
+        columns: List of column names, else in first line of chunk
+
+    Returns:
+        DataFrame with correct dtypes and column names, as from taq_from_csv
+
+    Notes:
+
+    - locates all line and field delimiters with vectorized byte comparisons,
+      then slices fields of all rows at once into typed numpy arrays
+    - numeric fields and HHMMSSxxxxxxxxx timestamps are converted
+      arithmetically from their digits, instead of parsing strings
+    - falls back to taq_from_csv if lines have differing number of fields
+    """
+    buf = np.frombuffer(chunk, dtype=np.uint8)
+    if len(buf) and buf[-1] != 10:       # ensure last line is terminated
+        buf = np.append(buf, np.uint8(10))
+    ends = np.flatnonzero(buf == 10)
+    starts = np.append(0, ends[:-1] + 1)
+    if not columns:                      # column names in first line
+        columns = bytes(buf[starts[0]:ends[0]]).decode('latin-1')\
+                                               .replace(' ', '_').split('|')
+        starts, ends = starts[1:], ends[1:]
+    keep = ends > starts                 # drop empty and END terminator lines
+    if len(starts):
+        head = buf[np.minimum(starts[:, None] + np.arange(4), len(buf) - 1)]
+        trailer = (head[:, :3] == np.frombuffer(b'END', dtype=np.uint8))\
+            .all(axis=1)                 # whole first field must be END
+        trailer &= (ends - starts == 3) | np.isin(head[:, 3], [124, 13])
+        keep &= ~trailer
+    starts, ends = starts[keep], ends[keep]
+
+    # locate field delimiters within each kept line
+    pipes = np.flatnonzero(buf == 124)
+    lo, hi = np.searchsorted(pipes, starts), np.searchsorted(pipes, ends)
+    ncols = len(columns)
+    if len(starts) and not np.all(hi - lo == ncols - 1):
+        return taq_from_csv(chunk.decode('latin-1'), columns)
+    pipes = pipes[(lo[:, None] + np.arange(ncols - 1)).ravel()]\
+        .reshape(len(starts), ncols - 1)
+    field_starts = np.column_stack((starts, pipes + 1))
+    field_ends = np.column_stack((pipes, ends))
+
+    dtypes = {}
+    if 'Best_Bid_Price' in columns:  # NBBO file
+        dtypes = _dtypes['nbbo']
+    elif 'Trade_Price' in columns:   # TRADE file
+        dtypes = _dtypes['trade']
+    elif 'Round_Lot' in columns:     # MASTER file
+        dtypes = _dtypes['mast']
+    dtypes = {col: t for t in dtypes for col in dtypes[t]}  # last type wins
+
+    data = {}
+    for j, col in enumerate(columns):
+        s, e = field_starts[:, j], field_ends[:, j]
+        if col in dtypes:            # numeric: evaluate digits
+            mantissa, decimals, ok = _digits(buf, s, e)
+            if np.any(decimals):
+                values = mantissa / (10.0 ** decimals)
+            else:
+                values = mantissa
+            data[col] = values.astype(dtypes[col])
+            if col == 'Time':        # HHMMSS and fraction digits
+                scale = np.uint64(10) ** np.maximum(e - s - 6, 0)\
+                                           .astype(np.uint64)
+                hhmmss, frac = mantissa // scale, mantissa % scale
+                ns = (((hhmmss // 10000) * 3600 + ((hhmmss // 100) % 100) * 60
+                       + hhmmss % 100) * np.uint64(10**9)
+                      + frac * (np.uint64(10**9) // scale))
+                time_index = (np.datetime64('1900-01-01', 'ns')
+                              + ns.astype('timedelta64[ns]'))
+        else:                        # string: fixed-width bytes slices
+            width = int((e - s).max(initial=0))
+            if width:
+                idx = s[:, None] + np.arange(width)
+                chars = np.where(idx < e[:, None],
+                                 buf[np.minimum(idx, e[:, None])], 0)
+                values, inverse = np.unique(
+                    np.ascontiguousarray(chars, dtype=np.uint8)\
+                    .view(f'S{width}').ravel(), return_inverse=True)
+                values = [v.decode('latin-1') for v in values]  # decode once
+                data[col] = np.array(values, dtype=object)[inverse]
+            else:
+                data[col] = np.full(len(s), '', dtype=object)
+    df = DataFrame(data, columns=columns)
+    if 'Time' in dtypes:       # for nbbo and trade: set timestamp as index
+        df.index = pd.DatetimeIndex(time_index, name='Time')
+    elif 'Symbol' in df.columns:  # for master: set symbol field as index
+        df.index = df['Symbol'].values
+    return df
+
+    
+def _is_trailer(line: bytes | str) -> bool:
+    """Whether line is the END terminator, i.e. its whole first field is END"""
+    if isinstance(line, bytes):
+        return line.split(b'|', 1)[0].rstrip() == b'END'
+    return line.split('|', 1)[0].rstrip() == 'END'
+
 class TAQ(object):
     """Base class to manipulate a daily TAQ .csv.gz file
 
@@ -103,6 +251,7 @@ class TAQ(object):
         taq_file: raw .csv.gz input data file name
         index_file: name of new (csv.gz) file to write indexed-gzip index
         symbols_file: name of new (csv.gz) file to write symbols index
+        times_file: name of new (csv.gz) file to write symbol-minutes index
 
     Notes:
 
@@ -114,15 +263,18 @@ class TAQ(object):
       - trade(n) - next n csv lines
       - iter(trade) - iterable, by chunk with same stock symbol
       - trade['AAPL'] - getitem, by symbol
+      - trade.query(['AAPL', 'GS'], start, end) - by symbols and time window
     """
     def __init__(self, taq_file: str, index_file: str = '',
-                 symbols_file: str = ''):
+                 symbols_file: str = '', times_file: str = ''):
         """Initalize interface to daily TAQ file"""
         self.taq_file = taq_file
         self.date = re.findall(r"[12][90]\d\d\d\d\d\d", taq_file)
         self.index_file = index_file
         self.symbols_file = symbols_file
+        self.times_file = times_file
         self.igz_file = None   # indexed gzip stream for getitem read
+        self.times = None      # symbol-minutes index for query read
         
     def close(self):
         """Close getitem file handle"""
@@ -136,9 +288,8 @@ class TAQ(object):
         class File(object):
             """Context manager procotol to open for sequential read"""
             def __init__(self, filename: str, *args, **kwargs):
-                self.gz_file = gzip.open(filename, "rt", encoding='utf-8',
-                                         errors='ignore')
-                self.header = self.gz_file.readline()
+                self.gz_file = gzip.open(filename, "rb")
+                self.header = self.gz_file.readline().replace(b' ', b'_')
 
             def __call__(self, n: int) -> DataFrame:
                 """Read next n lines (-1 for entire file)"""
@@ -149,12 +300,12 @@ class TAQ(object):
                     chunk = [self.header]
                     for _ in range(n):
                         line = self.gz_file.readline()
-                        if len(line) <= 0:
+                        if len(line) <= 0 or _is_trailer(line):
                             self.close()
                             break
                         chunk.append(line)
-                    chunk = "".join(chunk)
-                return taq_from_csv(chunk)
+                    chunk = b"".join(chunk)
+                return taq_from_bytes(chunk)
             
             def __enter__(self):
                 return self
@@ -173,11 +324,9 @@ class TAQ(object):
         
     def __iter__(self):
         """Iterator to access next symbol's chunk of rows"""
-        f = gzip.open(self.taq_file,
-                      "rt",
-                      encoding='utf-8',
-                      errors='ignore')
-        header = f.readline().rstrip('\n').replace(' ','_').split('|')
+        f = gzip.open(self.taq_file, "rb")
+        header = f.readline().decode('latin-1')\
+                             .rstrip('\n').replace(' ','_').split('|')
 
         def line_iterator(f):
             try:
@@ -189,17 +338,18 @@ class TAQ(object):
 
         lines = line_iterator(f)
         line = next(lines)         # keep first line as header columns
-        curr = line.rstrip('\n').split('|')[header.index('Symbol')]
-        while line and not line.startswith('END'): # check end-of-file
+        curr = line.rstrip(b'\n').split(b'|')[header.index('Symbol')]
+        while line and not _is_trailer(line): # check end-of-file
             prev = curr
             chunk = []
             while line and curr == prev:  # read until new symbol
                 chunk += [line]
                 line = next(lines)
                 if line:
-                    curr = line.rstrip('\n').split('|')[header.index('Symbol')]
-            df = taq_from_csv("".join(chunk), header)
-            df.index.name = prev
+                    curr = line.rstrip(b'\n')\
+                               .split(b'|')[header.index('Symbol')]
+            df = taq_from_bytes(b"".join(chunk), header)
+            df.index.name = prev.decode('latin-1')
             yield df
         f.close()
         yield None
@@ -216,6 +366,8 @@ class TAQ(object):
                 self.igz_file = igzip.IndexedGzipFile(self.taq_file)
             line = self.igz_file.readline().decode('latin-1')
             self.columns = line.rstrip('\n').replace(' ','_').split('|')
+            if self.times_file and os.path.exists(self.times_file):
+                self.times = pd.read_csv(self.times_file, index_col=0)
         if symbol in self.pos.index and self.pos.loc[symbol, 'size'] > 0:
             return self.pos.loc[symbol]
         else:
@@ -227,13 +379,67 @@ class TAQ(object):
         if pos is None:
             return None
         self.igz_file.seek(pos['start'])
-        lines = self.igz_file.read(pos['size']).decode('latin-1')
-        df = taq_from_csv(lines, columns=self.columns)
+        lines = self.igz_file.read(pos['size'])
+        df = taq_from_bytes(lines, columns=self.columns)
         df.index.name = symbol
         return df
 
-    def index_symbols(self, index_file: str = '', symbols_file: str = ''):
-        """Generate indexed_gzip and symbols index files"""
+    def query(self, symbols: str | List[str], start: Timestamp | None = None,
+              end: Timestamp | None = None) -> DataFrame | None:
+        """Get rows for symbols within a time window as one data frame
+
+        Args:
+            symbols: Symbol or list of symbols to retrieve
+            start: Earliest time of records to retrieve, inclusive
+            end: Latest time of records to retrieve, inclusive
+
+        Returns:
+            DataFrame of rows of all symbols, in order of symbols list
+
+        Notes:
+
+        - seeks to byte offsets of the first record at or after the start
+          minute and first record after the end minute of each symbol, from
+          the symbol-minutes index if available
+        - else reads all records of each symbol, then filters by time
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        minute = lambda t: t.hour * 100 + t.minute   # TAQ HHMM of timestamp
+        chunks = []
+        for symbol in symbols:
+            pos = self(symbol)
+            if pos is None:
+                continue
+            lo, hi = pos['start'], pos['start'] + pos['size']
+            if self.times is not None and symbol in self.times.index:
+                times = self.times.loc[[symbol]]
+                minutes = times['minute'].values
+                if start is not None:
+                    i = np.searchsorted(minutes, minute(start), side='left')
+                    if i == len(minutes):  # no records after start minute
+                        continue
+                    lo = times['start'].values[i]
+                if end is not None:
+                    i = np.searchsorted(minutes, minute(end), side='right')
+                    if i < len(minutes):
+                        hi = times['start'].values[i]
+            if hi > lo:
+                self.igz_file.seek(lo)
+                chunks.append(self.igz_file.read(hi - lo))
+        if not chunks:
+            return None
+        df = taq_from_bytes(b"".join(chunks), columns=self.columns)
+        f = np.ones(len(df), dtype=bool)
+        if start is not None:
+            f &= (df.index >= start)
+        if end is not None:
+            f &= (df.index <= end)
+        return df[f]
+
+    def index_symbols(self, index_file: str = '', symbols_file: str = '',
+                      times_file: str = ''):
+        """Generate indexed_gzip, symbols and symbol-minutes index files"""
         
         def _create_index(filename, index_file):
             """generate and save an indexed-gzip index file (12 secs)"""
@@ -246,8 +452,8 @@ class TAQ(object):
             except:
                 raise Exception('TAQ _create_index failed')
 
-        def _create_symbols(filename, symbols_file):
-            """generate symbol lookup locations (~100 secs)"""
+        def _create_symbols(filename, symbols_file, times_file):
+            """generate symbol and symbol-minute lookup locations (~100 secs)"""
             tic = time.time()
             try:
                 with igzip.IndexedGzipFile(filename) as f:
@@ -255,25 +461,37 @@ class TAQ(object):
                     line = f.readline().decode('latin-1')
                     header = line.rstrip('\n').split('|') # header in first line
                     symbols = DataFrame(columns=['start','size'],dtype=int)
-                    prev = None
-                    eof = lambda line: (not line) or line.startswith('END')
+                    times = []   # offset of first record of each symbol-minute
+                    prev, prev_minute = None, None
+                    eof = lambda line: (not line) or _is_trailer(line)
                     while not eof(line):     # iterate until reached end-of-file
                         tell = f.tell()                       # current location
                         line = f.readline().decode('latin-1')  # parse next line
                         if not eof(line):
-                            curr = line.rstrip('\n')\
-                                       .split('|')[header.index('Symbol')]
+                            fields = line.rstrip('\n').split('|')
+                            curr = fields[header.index('Symbol')]
+                            minute = (int(fields[header.index('Time')][:4])
+                                      if 'Time' in header else None)
                         else:
-                            curr = None
+                            curr, minute = None, None
                         if curr != prev:           # new symbol: update location
                             if prev:
                                 symbols.loc[prev, 'size']\
                                     = tell - symbols.loc[prev, 'start']
                             if curr:
                                 symbols.loc[curr] = tell, 0
-                            prev = curr
+                            prev, prev_minute = curr, None
+                        if (curr and minute is not None
+                            and minute != prev_minute):
+                            times.append((curr, minute, tell))  # new minute
+                            prev_minute = minute
                 print('%d symbols: %d secs' % (len(symbols), time.time() - tic))
                 symbols.to_csv(symbols_file)
+                if times_file:
+                    DataFrame.from_records(times,
+                                           columns=['symbol','minute','start'])\
+                             .set_index('symbol')\
+                             .to_csv(times_file)
             except:
                 raise Exception('TAQ _create_symbols failed')
 
@@ -281,8 +499,10 @@ class TAQ(object):
             self.index_file = index_file
         if symbols_file:
             self.symbols_file = symbols_file
+        if times_file:
+            self.times_file = times_file
         _create_index(self.taq_file, self.index_file)
-        _create_symbols(self.taq_file, self.symbols_file)
+        _create_symbols(self.taq_file, self.symbols_file, self.times_file)
 
 #
 # tick data transformation methods
@@ -381,15 +601,127 @@ def clean_nbbo(df: DataFrame | None, keep: List[str] = [
     return df
 
 
+def prevailing_quotes(times: np.ndarray, quote_times: np.ndarray,
+                      values: np.ndarray,
+                      lags: List[np.timedelta64] = [np.timedelta64(-1, 'ns')]
+                      ) -> np.ndarray:
+    """Binary search for quote values prevailing at trade times plus lags
+
+    Args:
+        times: Timestamps of trades
+        quote_times: Sorted timestamps of quotes
+        values: Quote values (e.g. midquotes) corresponding to quote_times
+        lags: List of time offsets to add to trade times
+
+    Returns:
+        Array of shape (len(lags), len(times)) of prevailing quote values,
+        NaN where no quote has been posted on or before the lagged time
+
+    Notes:
+
+    - equivalent to merge_asof(direction='backward') for each lag, but
+      runs one np.searchsorted per lag without copying the quotes
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    quote_times = np.asarray(quote_times, dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=float)
+    result = np.full((len(lags), len(times)), np.nan)
+    for i, lag in enumerate(lags):
+        j = np.searchsorted(quote_times,
+                            times + np.timedelta64(lag, 'ns'),
+                            side='right') - 1
+        valid = j >= 0
+        result[i, valid] = values[j[valid]]
+    return result
+
+def tick_test(price: np.ndarray, prev: float = np.nan) -> np.ndarray:
+    """Sign of trade price change from previous trade, 0 if unchanged
+
+    Args:
+        price: Sequence of trade prices
+        prev: Trade price preceding the first element, if known
+    """
+    price = np.asarray(price, dtype=float)
+    return np.nan_to_num(np.sign(np.diff(price, prepend=prev)))
+
+def sign_trades(price: np.ndarray, mid: np.ndarray | None = None,
+                tick: np.ndarray | None = None,
+                method: str = 'leeready', last_tick: float = 0.) -> np.ndarray:
+    """Classify trades as buyer (+1) or seller (-1) initiated
+
+    Args:
+        price: Trade prices
+        mid: Prevailing midquotes, required by quote and leeready methods
+        tick: Tick test signs, else computed from price
+        method: In {'quote', 'tick', 'leeready'}
+        last_tick: Last nonzero tick preceding the first trade, if known
+
+    Returns:
+        Array of trade signs, 0 if not classified
+
+    Notes:
+
+    - quote: sign of trade price relative to prevailing midquote
+    - tick: sign of trade price change from previous trade, or of the last
+      nonzero change if unchanged (zero-uptick and zero-downtick)
+    - leeready: quote rule, then tick test if traded at the midquote
+    """
+    if method not in ['quote', 'tick', 'leeready']:
+        raise Exception(str(method) + " must be in ['quote','tick','leeready']")
+    price = np.asarray(price, dtype=float)
+    if tick is None:
+        tick = tick_test(price)
+    tick = np.append(last_tick, np.asarray(tick, dtype=float))
+    nonzero = np.where(tick != 0, np.arange(len(tick)), 0)
+    tick = tick[np.maximum.accumulate(nonzero)][1:]  # carry last nonzero tick
+    if method == 'tick':
+        return tick
+    quote = np.nan_to_num(np.sign(price - np.asarray(mid, dtype=float)))
+    if method == 'quote':
+        return quote
+    return np.where(quote != 0, quote, tick)
+
+def trade_spreads(price: np.ndarray, sign: np.ndarray,
+                  prevailing: np.ndarray,
+                  forward: np.ndarray | None = None) -> Dict[str, np.ndarray]:
+    """Effective, realized and price impact half-spreads of each trade
+
+    Args:
+        price: Trade prices
+        sign: Trade signs, e.g. from Lee-Ready test
+        prevailing: Prevailing midquote before each trade
+        forward: Midquote prevailing after some lag, e.g. 5 minutes
+
+    Returns:
+        Dict of arrays of half-spreads in $ per share
+
+    Notes:
+
+    - effective: absolute difference of trade price and prevailing midquote
+    - realized: signed difference of trade price and forward midquote
+    - impact: signed difference of forward and prevailing midquotes
+    """
+    price = np.asarray(price, dtype=float)
+    result = {'effective': np.abs(price - prevailing)}
+    if forward is not None:
+        result['realized'] = sign * (price - forward)
+        result['impact'] = sign * (forward - prevailing)
+    return result
+
 def align_trades(ct: DataFrame, cq: DataFrame, open_t: Timestamp = open_t,
-                 inplace: bool = False) -> DataFrame | None:
+                 inplace: bool = False,
+                 lags: Dict[str, np.timedelta64] = {
+                     'Prevailing_Mid': np.timedelta64(-1, 'ns'),
+                     'Forward_Mid': np.timedelta64(5, 'm')}
+                 ) -> DataFrame | None:
     """Align each trade with prevailing and forward quotes
 
     Args:
         ct: Input dataframe of trades
-        cq: Input dataframe of nbbo quotes
+        cq: Input dataframe of nbbo quotes, sorted by time
         open_t: drop quotes prior to open time
         inplace: whether to overwrite trades dataframe or return as new copy
+        lags: Names of new columns and their time offsets from each trade
 
     Returns:
         DataFrame of trades with additional columns, if not inplace. else None
@@ -401,17 +733,21 @@ def align_trades(ct: DataFrame, cq: DataFrame, open_t: Timestamp = open_t,
     - Prevailing\_Mid: midquote prevailing before each trade
     - Forward\_Mid: midquote prevailing 5 minutes after trade
     - Tick\_Test: Whether trade price above, below or equals previous trade
+    - quotes are located by binary search over sorted quote times, see
+      prevailing_quotes, sign_trades and trade_spreads
     """
     if not inplace:
         ct = ct.copy()
     f = cq.index >= (open_t or cq.index.min())
-    midprice = (cq.loc[f, 'Best_Offer_Price'] + cq.loc[f, 'Best_Bid_Price']) / 2
-    ct['Prevailing_Mid'] = midprice.reindex(ct.index - np.timedelta64(1, 'ns'),
-                                            method='pad').values
-    ct['Forward_Mid'] = midprice.reindex(ct.index + np.timedelta64(5, 'm'),
-                                         method='pad').values
-    ct['Tick_Test'] = np.sign((ct['Trade_Price'] -
-                               ct['Trade_Price'].shift(+1))).fillna(0)
+    midprice = (cq['Best_Offer_Price'].values[f]
+                + cq['Best_Bid_Price'].values[f]) / 2
+    mids = prevailing_quotes(ct.index.values,
+                             cq.index.values[f],
+                             midprice,
+                             lags=list(lags.values()))
+    for col, mid in zip(lags.keys(), mids):
+        ct[col] = mid
+    ct['Tick_Test'] = tick_test(ct['Trade_Price'].values)
     if not inplace:
         return ct
 
@@ -677,16 +1013,432 @@ def itertaq(trades: TAQ, quotes: TAQ, master: DataFrame,
         yield ct, cq, master.loc[symbol]
 
     
+def _opentaq(date, taqdir: str) -> Tuple[TAQ, TAQ]:
+    """Helper to initialize trade and quote objects, without master file"""
+    return (TAQ(os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.gz'),
+                os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.gzidx'),
+                os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.csv.gz'),
+                os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.min.csv.gz')),
+            TAQ(os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.gz'),
+                os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.gzidx'),
+                os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.csv.gz'),
+                os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.min.csv.gz')))
+
 def opentaq(date, taqdir: str):
     """Helper to initialize all master dataframe, trade and quote objects"""
     return (TAQ(os.path.join(taqdir,
                              f'EQY_US_ALL_REF_MASTER_{date}.gz')).read(),
-            TAQ(os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.gz'),
-                os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.gzidx'),
-                os.path.join(taqdir, f'EQY_US_ALL_TRADE_{date}.csv.gz')),
-            TAQ(os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.gz'),
-                os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.gzidx'),
-                os.path.join(taqdir, f'EQY_US_ALL_NBBO_{date}.csv.gz')))
+            *_opentaq(date, taqdir))
+
+class DailyLiquidity:
+    """Online accumulator of daily liquidity measures by symbol
+
+    Args:
+        date: Trading date to label the summary rows
+        open_t: Exclude trades on or before this opening time
+        close_t: Exclude trades after this closing time
+        intervals: List of (value, unit) bin widths for realized variances
+        forward: Time lag of forward midquote for realized spreads and impact
+
+    Notes:
+
+    - Consumes blocks of raw trade and nbbo records (which may span several
+      symbols) in file order, and updates per-symbol accumulators, so that
+      full per-symbol DataFrames of ticks are never constructed
+    - Quotes of a symbol must be seen before its trades are, to locate
+      prevailing and forward midquotes: see stream_liquidity
+    - Summary measures of each symbol:
+
+      - counts, volume, dollars: number, shares and dollar value of trades
+      - vwap, first, last, high, low: trade prices
+      - ret: last-to-first trade price return
+      - amihud: absolute return per dollar traded
+      - roll: Roll (1984) spread from serial covariance of price changes
+      - quoted, depth: time-weighted quoted half-spread and average depth
+      - mid: last midquote
+      - effective, realized, impact: volume-weighted half-spreads, over
+        trades with prevailing (and forward) midquotes
+      - tvar{value}{unit}: realized variance of last-trade returns of bins
+    """
+    def __init__(self, date: int = 0, open_t: Timestamp = open_t,
+                 close_t: Timestamp = close_t,
+                 intervals: List = [(1, 's'), (1, 'm'), (5, 'm')],
+                 forward: np.timedelta64 = np.timedelta64(5, 'm')):
+        self.date = date
+        self.open_t = open_t.value
+        self.close_t = close_t.value
+        self.intervals = {f"tvar{v}{u}":
+                          int(np.timedelta64(v, u) // np.timedelta64(1, 'ns'))
+                          for v, u in intervals}
+        self.forward = np.timedelta64(forward, 'ns')
+        self.trades = {}   # per-symbol trade accumulators
+        self.quotes = {}   # per-symbol quote accumulators
+        self.mids = {}     # per-symbol buffers of (time, midquote) arrays
+        self.held = {}     # raw nbbo records held back until next block
+
+    def update_quotes(self, df: DataFrame, last: bool = False):
+        """Update quote accumulators with a block of nbbo records
+
+        Args:
+            df: Block of raw nbbo records, in file order
+            last: Whether this is the last block of the file
+
+        Notes:
+
+        - records at the last timestamp of the block's last symbol are held
+          back until the next block, so that cleaning of same-time and
+          repeated records does not depend on where blocks are split
+        """
+        for symbol in [s for s in self.held if last or s not in
+                       set(df['Symbol'])]:  # flush symbols already completed
+            self._update_quotes(symbol, self.held.pop(symbol))
+        final = None if last or not len(df) else df['Symbol'].iloc[-1]
+        for symbol, q in df.groupby('Symbol', sort=False):
+            if symbol in self.held:
+                q = pd.concat([self.held.pop(symbol), q])
+            if symbol == final:    # hold back records of its last timestamp
+                tail = q['Time'].values == q['Time'].values[-1]
+                self.held[symbol] = q[tail]
+                q = q[~tail]
+            self._update_quotes(symbol, q)
+
+    def _update_quotes(self, symbol: str, q: DataFrame):
+        """Update quote accumulators with nbbo records of a symbol"""
+        q.index.name = symbol
+        q = clean_nbbo(q)
+        acc = self.quotes.setdefault(symbol, dict(
+            counts=0, weight=0., quoted=0., depth=0., record=None,
+            time=None, spread=None, size=None, mid=np.nan))
+        if len(q) and acc['record'] is not None \
+           and np.array_equal(q.iloc[0].values, acc['record']):
+            q = q.iloc[1:]         # repeats last record of previous block
+        if not len(q):
+            return
+        t = q.index.values.astype('datetime64[ns]').astype(np.int64)
+        mid = (q['Best_Offer_Price'].values
+               + q['Best_Bid_Price'].values) / 2
+        spread = (q['Best_Offer_Price'].values
+                  - q['Best_Bid_Price'].values) / 2
+        depth = (q['Best_Offer_Size'].values
+                 + q['Best_Bid_Size'].values) / 2
+        if acc['time'] is not None:  # carry forward prevailing quote
+            t = np.append(acc['time'], t)
+            spread = np.append(acc['spread'], spread)
+            depth = np.append(acc['size'], depth)
+
+        # durations of quotes within the day, ending at next quote
+        begin = np.clip(t[:-1], self.open_t, self.close_t)
+        weight = np.clip(t[1:], self.open_t, self.close_t) - begin
+        acc['weight'] += weight.sum()
+        acc['quoted'] += (weight * spread[:-1]).sum()
+        acc['depth'] += (weight * depth[:-1]).sum()
+        acc['counts'] += len(q)
+        acc['time'], acc['spread'] = t[-1], spread[-1]
+        acc['size'] = depth[-1]
+        acc['mid'] = mid[-1]
+        acc['record'] = q.iloc[-1].values
+
+        # buffer midquotes after open to align with the symbol's trades
+        f = t[-len(q):] >= self.open_t
+        self.mids.setdefault(symbol, []).append((t[-len(q):][f], mid[f]))
+
+    def update_trades(self, df: DataFrame):
+        """Update trade accumulators with a block of trade records"""
+        for symbol, ct in df.groupby('Symbol', sort=False):
+            ct.index.name = symbol
+            ct = clean_trade(ct,
+                             open_t=Timestamp(self.open_t),
+                             close_t=Timestamp(self.close_t))
+            if not len(ct):
+                continue
+            t = ct.index.values.astype('datetime64[ns]')
+            price = ct['Trade_Price'].values.astype(float)
+            volume = ct['Trade_Volume'].values.astype(float)
+            acc = self.trades.setdefault(symbol, dict(
+                counts=0, volume=0., dollars=0., first=price[0],
+                last=np.nan, high=-np.inf, low=np.inf, diff=np.nan, tick=0.,
+                roll=np.zeros(4), effective=0., realized=0., impact=0.,
+                volumes=dict(effective=0., realized=0., impact=0.),
+                bins={k: dict(bin=-1, last=np.nan, prev=np.nan, first=-1,
+                              sum=0., sumsq=0.) for k in self.intervals}))
+            acc['counts'] += len(ct)
+            acc['volume'] += volume.sum()
+            acc['dollars'] += (price * volume).sum()
+            acc['high'] = max(acc['high'], price.max())
+            acc['low'] = min(acc['low'], price.min())
+
+            # Roll: serial cross products of price changes
+            diff = np.diff(price, prepend=acc['last'])
+            lag = np.append(acc['diff'], diff[:-1])
+            f = ~np.isnan(diff) & ~np.isnan(lag)
+            acc['roll'] += [f.sum(), (diff[f] * lag[f]).sum(),
+                            diff[f].sum(), lag[f].sum()]
+
+            # spreads from prevailing and forward midquotes, Lee-Ready signs
+            tick = tick_test(price, prev=acc['last'])
+            if symbol in self.mids:
+                if len(self.mids[symbol]) > 1:
+                    self.mids[symbol] = [tuple(np.concatenate(a) for a in
+                                               zip(*self.mids[symbol]))]
+                qt, mid = self.mids[symbol][0]
+                prevailing, forward = prevailing_quotes(
+                    t, qt.astype('datetime64[ns]'), mid,
+                    lags=[np.timedelta64(-1, 'ns'), self.forward])
+                sign = sign_trades(price, prevailing, tick=tick,
+                                   last_tick=acc['tick'])
+                spreads = trade_spreads(price, sign, prevailing, forward)
+                for k, v in spreads.items():   # over trades with spreads
+                    f = np.isfinite(v)
+                    acc[k] += (v[f] * volume[f]).sum()
+                    acc['volumes'][k] += volume[f].sum()
+
+            # realized variances: last trade price returns between bins
+            t = t.astype(np.int64)
+            for k, width in self.intervals.items():
+                b = acc['bins'][k]
+                bins = (t - self.open_t) // width
+                f = np.append(bins[1:] != bins[:-1], True)  # last in each bin
+                for curr, last in zip(bins[f], price[f]):
+                    if curr != b['bin']:
+                        self._finalize(b)
+                        if b['first'] < 0:
+                            b['first'] = curr
+                        b['bin'] = curr
+                    b['last'] = last
+            acc['last'], acc['diff'] = price[-1], diff[-1]
+            if np.any(tick != 0):
+                acc['tick'] = tick[tick != 0][-1]
+
+    def drop_quotes(self, symbol: str):
+        """Release buffered midquotes of symbols preceding symbol"""
+        for s in [s for s in self.mids if s < symbol]:
+            del self.mids[s]
+
+    @staticmethod
+    def _finalize(b: Dict):
+        """Accumulate return from previous to current bin's last price"""
+        if b['bin'] >= 0:
+            if not np.isnan(b['prev']):
+                r = b['last'] / b['prev'] - 1
+                b['sum'] += r
+                b['sumsq'] += r**2
+            b['prev'] = b['last']
+
+    def summary(self) -> DataFrame:
+        """Return DataFrame of daily measures, one row per symbol"""
+        rows = []
+        for symbol in sorted(set(self.trades).union(self.quotes)):
+            row = {'date': self.date, 'symbol': symbol}
+            if symbol in self.trades:
+                acc = self.trades[symbol]
+                row.update({k: acc[k] for k in ['counts', 'volume', 'dollars',
+                                                 'first', 'last', 'high',
+                                                 'low']})
+                row['vwap'] = acc['dollars'] / acc['volume']
+                row['ret'] = acc['last'] / acc['first'] - 1
+                row['amihud'] = abs(row['ret']) / acc['dollars']
+                n, xy, x, y = acc['roll']
+                cov = (xy - x * y / n) / n if n else np.nan
+                row['roll'] = 2 * np.sqrt(-cov) if cov < 0 else np.nan
+                if symbol in self.mids or acc['effective']:
+                    for k in ['effective', 'realized', 'impact']:
+                        row[k] = (acc[k] / acc['volumes'][k]
+                                  if acc['volumes'][k] else np.nan)
+                for k, width in self.intervals.items():
+                    b = dict(acc['bins'][k])
+                    nbins = (self.close_t - self.open_t) // width
+                    if b['bin'] < nbins:      # exclude bin labelled after close
+                        self._finalize(b)
+                    m = nbins - b['first'] - 1   # number of bins with returns
+                    row[k] = ((b['sumsq'] - b['sum']**2 / m) / m * nbins
+                              if m > 0 else np.nan)
+            if symbol in self.quotes:
+                acc = self.quotes[symbol]
+                weight = acc['weight'] + max(0, self.close_t
+                                             - max(acc['time'], self.open_t))
+                extra = weight - acc['weight']  # last quote until close
+                quoted = acc['quoted'] + extra * acc['spread']
+                depth = acc['depth'] + extra * acc['size']
+                row['quotes'] = acc['counts']
+                row['quoted'] = quoted / weight if weight else np.nan
+                row['depth'] = depth / weight if weight else np.nan
+                row['mid'] = acc['mid']
+            rows.append(row)
+        return DataFrame.from_records(rows)
+
+
+def stream_liquidity(trades: TAQ, quotes: TAQ, date: int = 0,
+                     blocksize: int = 1000000, verbose: int = _VERBOSE,
+                     **kwargs) -> DataFrame:
+    """Compute daily liquidity measures in one sequential pass over TAQ files
+
+    Args:
+        trades: Instance of TAQ trades object
+        quotes: Instance of TAQ nbbo quotes object
+        date: Trading date to label the summary rows
+        blocksize: Number of lines to read and parse in each block
+        verbose: Whether to echo progress messages
+        kwargs: Other arguments passed to DailyLiquidity
+
+    Returns:
+        DataFrame of daily liquidity measures, one row per symbol
+
+    Notes:
+
+    - both files are sorted by symbol: nbbo blocks are read ahead until past
+      the last symbol of the current trades block, and buffered midquotes are
+      released once trades have moved past their symbols
+    """
+    agg = DailyLiquidity(date=date, **kwargs)
+    tic = time.time()
+    with trades.open() as tf, quotes.open() as qf:
+        curr, done = '', False
+        while True:
+            t = tf(blocksize)
+            if len(t):
+                symbol = t['Symbol'].iloc[-1]
+                while not done and curr <= symbol:  # read ahead nbbo
+                    q = qf(blocksize)
+                    done = len(q) < blocksize
+                    agg.update_quotes(q, last=done)
+                    if len(q):
+                        curr = q['Symbol'].iloc[-1]
+                agg.update_trades(t)
+                agg.drop_quotes(symbol)
+                if verbose:
+                    print(f"{symbol}: {len(agg.trades)} symbols"
+                          f" {time.time() - tic:.0f} secs")
+            if len(t) < blocksize:
+                break
+    return agg.summary()
+
+def _taq_stage(date: int, taqdir: str, outdir: str, stage: str,
+               blocksize: int = 1000000) -> Dict:
+    """Index or aggregate one day of TAQ files, returning stage record"""
+    trades, quotes = _opentaq(date, taqdir)  # master file is not needed
+    size = sum(os.path.getsize(f.taq_file) for f in (trades, quotes))
+    tic = time.time()
+    if stage == 'index':
+        for taq in (trades, quotes):
+            taq.index_symbols()
+        return dict(date=date, stage='index', bytes=size,
+                    secs=time.time() - tic)
+    daily = stream_liquidity(trades, quotes, date=date,
+                             blocksize=blocksize, verbose=0)
+    output = os.path.join(outdir, f'taq_daily_{date}.csv.gz')
+    daily.to_csv(output, index=False)
+    return dict(date=date, stage='aggregate', bytes=size,
+                symbols=len(daily), output=output, secs=time.time() - tic)
+
+
+def taq_batch(dates: List[int], taqdir: str, outdir: str,
+              manifest: str = '', workers: int | None = None,
+              index: bool = True, sql: Any = None,
+              table: str = 'taqdaily', blocksize: int = 1000000,
+              verbose: int = _VERBOSE) -> DataFrame:
+    """Batch job to index and aggregate daily TAQ files over a process pool
+
+    Args:
+        dates: List of trading dates of TAQ files to process
+        taqdir: Folder of raw daily TAQ files
+        outdir: Folder to write daily liquidity measures as csv.gz
+        manifest: Name of checkpoint file, default taq_manifest.jsonl in outdir
+        workers: Number of worker processes, default number of cpus
+        index: Whether to (re)generate igzip, symbols and minutes indexes
+        sql: Optional finds.database.SQL instance to load the daily
+             measures into
+        table: Name of sql table to load into
+        blocksize: Number of lines to read in each block
+        verbose: Whether to echo progress and throughput
+
+    Returns:
+        DataFrame of stage records (date, stage, bytes, symbols, secs)
+        completed in this run
+
+    Notes:
+
+    - each completed (date, stage) shard is appended as a json line to the
+      manifest; shards already recorded there are skipped on restart
+    - stages of each date: 'index' and 'aggregate' run in turn as tasks of
+      worker processes, each checkpointed as soon as it completes, then
+      'sql' loads the aggregated output in this process
+    - shards are days rather than (day, symbol): the files of a day are
+      sorted by symbol, so one sequential pass aggregates all its symbols,
+      whereas a shard for each symbol would need a seek and a manifest
+      record for each of thousands of symbols per day
+    """
+    manifest = manifest or os.path.join(outdir, 'taq_manifest.jsonl')
+    done = set()
+    if os.path.exists(manifest):
+        with open(manifest, 'rt') as f:
+            for line in f:
+                record = json.loads(line)
+                done.add((record['date'], record['stage']))
+    stages = (['index'] if index else []) + ['aggregate']
+    pending = {date: [s for s in stages if (date, s) not in done]
+               for date in dates}
+
+    def _checkpoint(record: Dict):
+        """Append completed shard to manifest"""
+        with open(manifest, 'at') as f:
+            f.write(json.dumps(record) + '\n')
+        records.append(record)
+        if verbose:
+            print(record['date'], record['stage'],
+                  f"{record['secs']:.0f} secs",
+                  f"{record['bytes'] / 1e6 / max(record['secs'], 1e-9):.1f}"
+                  " MB/s",
+                  f"{record.get('symbols', 0) / max(record['secs'], 1e-9):.1f}"
+                  " symbols/s")
+
+    def _load(date: int, output: str):
+        """Load daily aggregates of date into sql table"""
+        if sql is not None and (date, 'sql') not in done:
+            tic = time.time()
+            df = pd.read_csv(output)
+            sql.load_dataframe(table, df)
+            _checkpoint(dict(date=date, stage='sql', bytes=0,
+                             symbols=len(df), secs=time.time() - tic))
+
+    records = []
+    tic = time.time()
+    futures = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def _submit(date: int):
+            """Submit next pending stage of date to the pool"""
+            futures[pool.submit(_taq_stage, date, taqdir, outdir,
+                                pending[date].pop(0), blocksize)] = date
+
+        for date, todo in pending.items():
+            if todo:
+                _submit(date)
+            else:
+                _load(date, os.path.join(outdir, f'taq_daily_{date}.csv.gz'))
+        while futures:
+            finished, _ = concurrent.futures.wait(
+                futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                date = futures.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    print(f"*** taq_batch {date} failed:", e)
+                    continue
+                _checkpoint(record)
+                if pending[date]:
+                    _submit(date)
+                elif record['stage'] == 'aggregate':
+                    _load(date, record['output'])
+    records = DataFrame.from_records(records)
+    if verbose and len(records):
+        secs = time.time() - tic
+        print(records.groupby('stage')['secs'].sum().rename('stage secs'))
+        agg = records[records['stage'].eq('aggregate')]
+        print(f"{len(agg)} dates in {secs:.0f} secs:",
+              f"{agg['bytes'].sum() / 1e6 / secs:.1f} MB/s",
+              f"{agg['symbols'].sum() / secs:.1f} symbols/s")
+    return records
 
 if False:  # test access methods
     import os
@@ -777,3 +1529,38 @@ if False:  # test access methods
     m1 = np.timedelta64('5','s')
     d = (t.index >= close_t) & (t.index <= close_t+m1)
     as_print(t.loc[d])
+
+    #
+    # 4. query by symbols and time window (uses symbol-minutes index)
+    #
+    window = trades.query(['AAPL', 'GS'],
+                          start=pd.to_datetime('1900-01-01T09:30'),
+                          end=pd.to_datetime('1900-01-01T10:00'))
+    print(window.groupby('Symbol').size())
+
+    #
+    # 5. daily liquidity measures of all symbols in one sequential pass
+    #
+    daily = stream_liquidity(trades, quotes, date=date)
+    print(daily.set_index('symbol')[['vwap', 'quoted', 'effective', 'roll']])
+
+    #
+    # 6. batch job over many dates, resumable from manifest of completed days
+    #
+    records = taq_batch(dates, taqdir, paths['scratch'], workers=4)
+
+    #
+    # 7. benchmark numpy bytes parser against pandas read_csv parser
+    #
+    with gzip.open(nbbo_file(date), 'rb') as f:
+        header = f.readline().decode('latin-1')\
+                             .rstrip('\n').replace(' ','_').split('|')
+        raw = f.read(100 * 1024 * 1024)
+    raw = raw[:raw.rindex(b'\n') + 1]
+    tic = time.time()
+    old = taq_from_csv(raw.decode('latin-1'), columns=header)
+    toc = time.time()
+    new = taq_from_bytes(raw, columns=header)
+    print(f"taq_from_csv: {len(old)/(toc - tic):.0f} rows/sec,",
+          f"taq_from_bytes: {len(new)/(time.time() - toc):.0f} rows/sec,",
+          f"equal: {old.equals(new)}")
@@ -23,13 +23,15 @@ import random
 import os
 from nltk.tokenize import RegexpTokenizer
 from sklearn.model_selection import train_test_split
+from sklearn.feature_extraction.text import CountVectorizer
+from scipy import sparse
 from collections import Counter, namedtuple
 import torch
 from bs4 import BeautifulSoup
 from functools import reduce
 from pandas.api import types
 from finds.database import MongoDB
-from typing import Dict, Iterable, List, Any, Tuple
+from typing import Dict, Iterable, List, Any, Tuple, Callable
 
 _VERBOSE = 1
 
@@ -650,6 +652,147 @@ class LMReader:
         return words
 
 
+class WordScores:
+    """Sparse document-term counts for word-list scores and similarity
+
+    Args:
+        wordlists: Lists of words keyed by label, e.g. LM 'positive' words
+        regex: Regular expression of tokens
+        batch_size: Number of documents to read and tokenize at a time
+
+    Attributes:
+        vocab: dict {word str: column int} of document-term matrices, which
+               grows as documents are counted; the words in wordlists come
+               first, so that their columns are fixed
+        weights: Sparse matrix of words in each wordlist, by label
+
+    Examples:
+
+    >>> scores = WordScores({'positive': [...], 'negative': [...]})
+    >>> lengths, counts, terms = scores.transform(texts)
+    >>> df = scores.score(rows, read=corpus.read)  # rows with permno, year
+
+    Notes:
+
+    - each document is tokenized once, and only its distinct words are
+      looked up in the vocabulary
+    - word-list counts are one sparse matrix product for all documents, and
+      cosine similarity is a row-aligned sparse dot product
+    """
+    def __init__(self, wordlists: Dict[str, List[str]],
+                 regex: str = r"\b[^\d\W][^\d\W][^\d\W]+\b",
+                 batch_size: int = 1000):
+        self.labels = list(wordlists.keys())
+        self.batch_size = batch_size
+        self.analyzer = CountVectorizer(strip_accents='unicode',
+                                        lowercase=True,
+                                        token_pattern=regex).build_analyzer()
+        self.vocab = {}
+        rows, cols = [], []
+        for col, label in enumerate(self.labels):
+            for word in wordlists[label]:
+                rows.append(self.vocab.setdefault(word, len(self.vocab)))
+                cols.append(col)
+        self.weights = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                         shape=(len(self.vocab),
+                                                len(self.labels)))
+        self.weights.sum_duplicates()
+        self.weights.data[:] = 1      # each word counts once in a wordlist
+
+    def transform(self, texts: List[str]) -> Tuple[np.ndarray, DataFrame,
+                                                   sparse.csr_matrix]:
+        """Count tokens, wordlist words and all terms of a batch of documents
+
+        Args:
+            texts: List of text of documents
+
+        Returns:
+            Number of tokens, DataFrame of counts of wordlist words by label,
+            and sparse document-term matrix, by document
+        """
+        indptr, indices, data = [0], [], []
+        lengths = np.zeros(len(texts), dtype=int)
+        for i, text in enumerate(texts):
+            tokens = self.analyzer(text)
+            lengths[i] = len(tokens)
+            counts = Counter(tokens)
+            indices.extend(self.vocab.setdefault(w, len(self.vocab))
+                           for w in counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        terms = sparse.csr_matrix((np.array(data, dtype=float),
+                                   np.array(indices, dtype=np.int64),
+                                   np.array(indptr, dtype=np.int64)),
+                                  shape=(len(texts), len(self.vocab)))
+        counts = terms[:, :self.weights.shape[0]] @ self.weights
+        return (lengths,
+                DataFrame(counts.toarray(), columns=self.labels),
+                terms)
+
+    @staticmethod
+    def cosine(a: sparse.csr_matrix, b: sparse.csr_matrix) -> np.ndarray:
+        """Cosine similarity of aligned rows of two document-term matrices"""
+        width = max(a.shape[1], b.shape[1])
+        a = a.copy()
+        b = b.copy()
+        a.resize((a.shape[0], width))
+        b.resize((b.shape[0], width))
+        dot = np.asarray(a.multiply(b).sum(axis=1)).ravel()
+        norm = np.sqrt(np.asarray(a.multiply(a).sum(axis=1)).ravel()
+                       * np.asarray(b.multiply(b).sum(axis=1)).ravel())
+        return np.divide(dot, norm, out=np.full(len(dot), np.nan),
+                         where=norm > 0)
+
+    def score(self, rows: DataFrame,
+              read: Callable[[DataFrame], List[str]]) -> DataFrame:
+        """Word-list counts and year-over-year similarity, one year at a time
+
+        Args:
+            rows: Documents to score, with one row per 'permno' and 'year'
+            read: Function to read text of a batch of rows, e.g. Corpus.read
+
+        Returns:
+            DataFrame of rows with counts of words by label, number of tokens
+            in 'currlen' and prior year's document in 'prevlen', and cosine
+            similarity to prior year's document in 'cos'
+
+        Notes:
+
+        - only the document-term matrices of the current and prior years are
+          kept in memory, and texts are read batch_size documents at a time
+        """
+        results = []
+        prev = None      # permnos and document-term matrix of prior year
+        for year, group in rows.groupby('year', sort=True):
+            group = group.sort_values('permno')
+            lengths, counts, terms = [], [], []
+            for i in range(0, len(group), self.batch_size):
+                n, c, t = self.transform(read(group.iloc[i:i+self.batch_size]))
+                lengths.append(n)
+                counts.append(c)
+                terms.append(t)
+            width = len(self.vocab)
+            for t in terms:
+                t.resize((t.shape[0], width))
+            terms = sparse.vstack(terms, format='csr')
+            result = pd.concat([group.reset_index(drop=True),
+                                pd.concat(counts, ignore_index=True)],
+                               axis=1)
+            result['currlen'] = np.concatenate(lengths)
+            result['prevlen'] = np.nan
+            result['cos'] = np.nan
+            if prev is not None and prev[0] == year - 1:
+                loc = prev[1].get_indexer(group['permno'])
+                found = np.flatnonzero(loc >= 0)
+                result.loc[found, 'prevlen'] = prev[3][loc[found]]
+                result.loc[found, 'cos'] = self.cosine(terms[found],
+                                                       prev[2][loc[found]])
+            prev = (year, pd.Index(group['permno']), terms,
+                    result['currlen'].values)
+            results.append(result)
+        return pd.concat(results, ignore_index=True)
+
+
 if __name__ == "__main__":  
     import os
     import time
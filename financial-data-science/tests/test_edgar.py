@@ -0,0 +1,35 @@
+"""Golden-output tests of filing text extraction
+
+Each fixture filing tests/data/edgar/NAME.htm has its expected text, after
+Stage One clean-up by fetch_filing, in tests/data/edgar/NAME.txt
+"""
+import os
+import pytest
+from finds.edgar import Edgar
+
+datadir = os.path.join(os.path.dirname(__file__), 'data', 'edgar')
+names = sorted(n for n in os.listdir(datadir) if n.endswith('.htm'))
+
+
+def expected(name: str) -> str:
+    with open(os.path.join(datadir, name[:-4] + '.txt'), encoding='utf-8',
+              newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('name', names)
+def test_html_to_text(name):
+    assert Edgar.fetch_filing(name, root=datadir, verbose=0) == expected(name)
+
+
+@pytest.mark.parametrize('name', names)
+def test_matches_soup(name):
+    soup = Edgar.fetch_filing(name, root=datadir, fast=False, verbose=0)
+    assert soup.rstrip('\n') == expected(name).rstrip('\n')
+
+
+def test_invalid_bytes_keep_text():
+    with open(os.path.join(datadir, 'invalid_utf8.htm'), 'rb') as f:
+        text = Edgar.html_to_text(f.read())
+    assert 'Café' in text and 'A stray \ufffd byte' in text
+    assert text.rstrip().endswith('Text after the stray byte is kept.')